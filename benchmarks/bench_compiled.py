@@ -0,0 +1,90 @@
+"""
+Benchmark the compiled irregular prism against ``sympy`` substitution.
+
+Run from the top of the repository::
+
+    python -m benchmarks.bench_compiled
+
+This does two things.
+
+1.  Confirms the compiled form produces the same numbers as the exact ``Rational``
+    result from ``subs()`` for a sample of random measurement sets.
+
+2.  Times ``subs()`` one measurement set at a time, and the compiled form
+    over arrays of measurement sets.
+"""
+import argparse
+import random
+import time
+from fractions import Fraction
+
+import numpy as np
+from sympy import Rational
+
+from vberth import compiled, symbolic
+
+
+def random_measurements(rng: random.Random, count: int) -> list[dict[str, Rational]]:
+    """Measurement sets near the actual dimensions, to the nearest sixteenth of an inch."""
+    return [
+        {
+            name: Rational(round(float(value) * 16 * rng.uniform(0.8, 1.2)), 16)
+            for name, value in symbolic.MEASURED.items()
+        }
+        for _ in range(count)
+    ]
+
+
+def as_arrays(samples: list[dict[str, Rational]]) -> dict[str, np.ndarray]:
+    return {
+        name: np.array([float(s[name]) for s in samples])
+        for name in symbolic.MEASURED
+    }
+
+
+def check(samples: list[dict[str, Rational]]) -> float:
+    """The largest relative error of the compiled form against the exact result."""
+    V = symbolic.irregular_prism()
+    exact = [Fraction(int(v.p), int(v.q)) for v in (V.subs(s) for s in samples)]
+    numeric = compiled.irregular_prism(**as_arrays(samples))
+    return max(
+        abs(Fraction(float(n)) - e) / e for n, e in zip(numeric, exact)
+    )
+
+
+def bench(samples: list[dict[str, Rational]], batch: int) -> None:
+    V = symbolic.irregular_prism()
+    start = time.perf_counter()
+    for s in samples:
+        V.subs(s)
+    subs_each = (time.perf_counter() - start) / len(samples)
+
+    rng = np.random.default_rng(42)
+    arrays = {
+        name: float(value) * rng.uniform(0.8, 1.2, batch)
+        for name, value in symbolic.MEASURED.items()
+    }
+    compiled.irregular_prism(**arrays)  # Compile outside the timing.
+    start = time.perf_counter()
+    compiled.irregular_prism(**arrays)
+    compiled_each = (time.perf_counter() - start) / batch
+
+    print(f"subs():   {subs_each*1e6:12.3f} µs per measurement set")
+    print(f"compiled: {compiled_each*1e6:12.3f} µs per measurement set ({batch:,d} per call)")
+    print(f"speedup:  {subs_each/compiled_each:12,.0f}x")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1_000_000)
+    options = parser.parse_args(argv)
+    samples = random_measurements(random.Random(42), options.samples)
+    error = check(samples)
+    print(f"largest relative error vs. exact Rational: {float(error):.3e}")
+    assert error < 1e-12, f"compiled form disagrees with sympy: {float(error)}"
+    bench(samples, options.batch)
+
+
+if __name__ == "__main__":
+    main()
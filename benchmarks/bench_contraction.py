@@ -0,0 +1,66 @@
+"""
+Benchmark the batched contraction against the scalar closed form.
+
+Run from the top of the repository::
+
+    python -m benchmarks.bench_contraction
+
+For a fleet of two-station tanks, this compares :func:`vberth.contraction.two_station`
+with :func:`vberth.formulas.matrix_prism` called once per tank. For a fleet of
+multi-station lofts, it compares :func:`vberth.contraction.volume` and the dense
+:func:`vberth.contraction.contract` with :func:`vberth.loft.volume`.
+It confirms each pair agrees before timing them.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from vberth import contraction, formulas, loft
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fleet", type=int, default=100_000)
+    parser.add_argument("--stations", type=int, default=16)
+    options = parser.parse_args(argv)
+    rng = np.random.default_rng(42)
+    base = np.array([8, 10.5, 27, 48, 46])
+    fleet = base * rng.uniform(0.8, 1.2, (options.fleet, 5))
+    columns = fleet.T
+
+    def scalar(rows):
+        return np.array([formulas.matrix_prism(*row) for row in rows.tolist()])
+
+    expected, scalar_time = timed(scalar, fleet)
+    actual, batch_time = timed(contraction.two_station, *columns)
+    assert np.allclose(actual, expected, rtol=1e-12), "two_station() differs from the closed form"
+    print(
+        f"two stations, {options.fleet:,} tanks: closed form {scalar_time*1e3:8.1f} ms, "
+        f"contraction {batch_time*1e3:6.1f} ms, {scalar_time/batch_time:5.0f}x"
+    )
+
+    n = options.stations
+    z = np.linspace(0, 46, n)
+    h = np.interp(z, [0, 46], [8, 27]) * rng.uniform(0.9, 1.1, (options.fleet, n))
+    w = np.interp(z, [0, 46], [10.5, 48]) * rng.uniform(0.9, 1.1, (options.fleet, n))
+    stations = np.stack([np.broadcast_to(z, h.shape), h, w], axis=-1)
+    expected, loft_time = timed(loft.volume, stations)
+    banded, banded_time = timed(contraction.volume, h, w, z)
+    dense, dense_time = timed(contraction.contract, h, w, contraction.weights(z))
+    assert np.allclose(banded, expected, rtol=1e-12), "volume() differs from loft.volume()"
+    assert np.allclose(dense, expected, rtol=1e-12), "contract() differs from loft.volume()"
+    print(
+        f"{n} stations, {options.fleet:,} tanks: loft {loft_time*1e3:6.1f} ms, "
+        f"banded {banded_time*1e3:6.1f} ms, dense {dense_time*1e3:6.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark the exact integer evaluation against ``sympy`` substitution.
+
+Run from the top of the repository::
+
+    python -m benchmarks.bench_exact
+
+For random measurement sets, to the nearest sixteenth of an inch, this confirms
+:mod:`vberth.exact` computes the same numerator and denominator as ``subs()``
+for each of the polynomial models, and times both.
+"""
+import argparse
+import random
+import time
+
+from vberth import exact, symbolic
+from benchmarks.bench_compiled import random_measurements
+
+MODELS = ("midpoint_prism", "irregular_prism", "matrix_prism")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=200)
+    options = parser.parse_args(argv)
+    samples = random_measurements(random.Random(42), options.samples)
+    for name in MODELS:
+        V = getattr(symbolic, name)()
+        function = exact.kernel(name)
+
+        start = time.perf_counter()
+        expected = [V.subs(s) for s in samples]
+        subs_each = (time.perf_counter() - start) / len(samples)
+
+        start = time.perf_counter()
+        actual = [function(**s) for s in samples]
+        exact_each = (time.perf_counter() - start) / len(samples)
+
+        mismatches = sum(
+            (int(e.p), int(e.q)) != (a.numerator, a.denominator)
+            for e, a in zip(expected, actual)
+        )
+        assert mismatches == 0, f"{name}: {mismatches} results differ from sympy"
+        print(
+            f"{name:16s} subs() {subs_each*1e6:9.1f} µs, exact {exact_each*1e6:7.2f} µs, "
+            f"{subs_each/exact_each:6.0f}x, identical"
+        )
+
+
+if __name__ == "__main__":
+    main()
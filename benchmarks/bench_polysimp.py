@@ -0,0 +1,97 @@
+"""
+Benchmark the polynomial simplification against ``simplify()`` and ``ratsimp()``.
+
+Run from the top of the repository::
+
+    python -m benchmarks.bench_polysimp
+
+For each derivation in the notebooks, this times the notebook's ``sympy`` operation
+and :func:`vberth.polysimp.canonical`, and confirms the results are equal.
+Then it does the same for tapered prisms of more stations, with a height and a width
+at each one: the notebook's derivation, with many more measurements.
+"""
+import argparse
+import time
+
+from sympy import Add, Integral, Rational, expand, factor, radsimp, ratsimp, simplify, symbols
+
+from vberth import polysimp, symbolic
+from vberth.symbolic import GALLON, l_fa, z
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def stations(n: int) -> Integral:
+    """The volume of a prism with ``n`` equally-spaced stations, as a sum of unevaluated integrals."""
+    h = symbols(f"h_0:{n}")
+    w = symbols(f"w_0:{n}")
+    parts = []
+    for i in range(n - 1):
+        a, b = l_fa * Rational(i, n - 1), l_fa * Rational(i + 1, n - 1)
+        t = (z - a) / (b - a)
+        area = (h[i] + (h[i + 1] - h[i]) * t) * (w[i] + (w[i + 1] - w[i]) * t) / 2
+        parts.append(Integral(area, (z, a, b)))
+    return Add(*parts) / GALLON
+
+
+def integrated(volume) -> Add:
+    """The integrals of a :func:`stations` volume, by :func:`vberth.polysimp.integral`."""
+    return volume.replace(lambda e: isinstance(e, Integral), lambda i: polysimp.integral(i.function, *i.limits[0]))
+
+
+def report(name: str, generic: str, generic_time: float, canonical_time: float) -> None:
+    print(
+        f"{name:28s} {generic:16s} {generic_time*1e3:8.1f} ms, "
+        f"polysimp {canonical_time*1e3:7.1f} ms, {generic_time/canonical_time:5.1f}x"
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stations", type=int, nargs="+", default=[2, 3, 4, 6, 8])
+    options = parser.parse_args(argv)
+
+    A_z = symbolic.area()
+    rounded = Integral((A_z / GALLON).evalf(3), (z, 0, l_fa))
+    expected, generic_time = timed(lambda: factor(simplify(rounded)))
+    actual, canonical_time = timed(lambda: polysimp.canonical(integrated(rounded)))
+    # simplify() rounds the coefficients again, so these agree only to about three digits.
+    difference = (expected - actual).subs(symbolic.MEASURED)
+    assert abs(difference) < 0.05, "the rounded volume differs"
+    report("irregular prism, evalf(3)", "factor(simplify)", generic_time, canonical_time)
+
+    exact = Integral(A_z, (z, 0, l_fa)) / GALLON
+    expected, generic_time = timed(lambda: factor(exact.doit()))
+    actual, canonical_time = timed(lambda: polysimp.canonical(integrated(exact)))
+    assert expected == actual, "the exact volume differs"
+    report("irregular prism", "factor(doit)", generic_time, canonical_time)
+
+    V_m = symbolic.midpoint_prism()
+    expected, generic_time = timed(ratsimp, V_m)
+    actual, canonical_time = timed(polysimp.canonical, V_m)
+    assert expand(expected - actual) == 0, "the midpoint volume differs"
+    report("midpoint prism", "ratsimp", generic_time, canonical_time)
+
+    V_r = symbolic.regular_tetrahedron(symbolic.tetrahedron_edges())
+    expected, generic_time = timed(radsimp, V_r)
+    actual, canonical_time = timed(polysimp.canonical, V_r)
+    assert expand(expected - actual) == 0, "the tetrahedron volume differs"
+    report("regular tetrahedron", "radsimp", generic_time, canonical_time)
+
+    for n in options.stations:
+        V = stations(n)
+        expected, simplify_time = timed(lambda: factor(simplify(V)))
+        ratsimp_result, ratsimp_time = timed(lambda: ratsimp(V.doit()))
+        actual, canonical_time = timed(lambda: polysimp.canonical(integrated(V)))
+        assert expected == actual, f"{n} stations: the factored volume differs"
+        assert expand(ratsimp_result - actual) == 0, f"{n} stations: the ratsimp volume differs"
+        report(f"{n} stations", "factor(simplify)", simplify_time, canonical_time)
+        report(f"{n} stations", "ratsimp(doit)", ratsimp_time, canonical_time)
+
+
+if __name__ == "__main__":
+    main()
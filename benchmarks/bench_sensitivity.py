@@ -0,0 +1,59 @@
+"""
+Benchmark the fused volume-and-gradient function against ``sympy`` substitution.
+
+Run from the top of the repository::
+
+    python -m benchmarks.bench_sensitivity
+
+For each model, this confirms :func:`vberth.sensitivity.jacobian` matches ``subs()``
+of the volume and each partial derivative, then times the :math:`N+1` separate
+``subs()`` calls against one call of the fused function over an array of measurement sets.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from vberth import sensitivity
+from vberth.compiled import MODELS
+from benchmarks.bench_compiled import random_measurements
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=100_000)
+    options = parser.parse_args(argv)
+    rng = random.Random(42)
+    samples = random_measurements(rng, options.samples)
+    for name in sensitivity.SENSITIVE:
+        expressions = sensitivity.gradient(name)
+        values = [sensitivity.measured_values(name, s) for s in samples]
+        symbols = MODELS[name].args
+
+        start = time.perf_counter()
+        expected = np.array([
+            [float(e.subs({a: v[a.name] for a in symbols})) for e in expressions]
+            for v in values
+        ])
+        subs_each = (time.perf_counter() - start) / len(samples)
+
+        arrays = {n: np.array([v[n] for v in values]) for n in MODELS[name].names}
+        result = sensitivity.jacobian(name, **arrays)
+        actual = np.column_stack([result.value, result.gradient.T])
+        error = float(np.max(np.abs(actual - expected)))
+        assert error < 1e-9, f"{name}: differs from subs() by {error}"
+
+        batch = {n: np.resize(a, options.batch) for n, a in arrays.items()}
+        start = time.perf_counter()
+        sensitivity.jacobian(name, **batch)
+        fused_each = (time.perf_counter() - start) / options.batch
+        print(
+            f"{name:20s} {len(expressions)} x subs() {subs_each*1e3:8.2f} ms, "
+            f"fused {fused_each*1e9:8.1f} ns per measurement set"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark the start-up cost of the generated formulas against ``sympy``.
+
+Run from the top of the repository::
+
+    python -m benchmarks.bench_startup
+
+Each variant runs in a fresh interpreter, imports what it needs,
+and computes the volume once. The time includes starting Python,
+which is shown separately as the baseline.
+This also confirms the generated module is current and matches the symbolic source.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from vberth import codegen
+
+VARIANTS = {
+    "python": "pass",
+    "vberth.formulas": (
+        "from vberth.formulas import irregular_prism; "
+        "irregular_prism(8, 10.5, 27, 48, 46)"
+    ),
+    "vberth.compiled": (
+        "from vberth.compiled import irregular_prism; "
+        "irregular_prism(8, 10.5, 27, 48, 46)"
+    ),
+    "sympy": (
+        "from vberth.symbolic import irregular_prism, MEASURED; "
+        "irregular_prism().subs(MEASURED)"
+    ),
+}
+
+
+def startup(code: str, repeat: int) -> float:
+    """Median wall time, in seconds, to run ``code`` in a fresh interpreter."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(argv)
+    error = codegen.verify()
+    print(f"largest relative difference from sympy: {error:.2e}")
+    assert error < 1e-12, "generated formulas don't match the symbolic source"
+    for name, code in VARIANTS.items():
+        print(f"{name:16s} {startup(code, options.repeat)*1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Time every model through every evaluation path, and detect regressions.
+
+Run from the top of the repository::
+
+    python -m benchmarks.bench_suite --save
+
+The models are the ones the conclusion compares: the midpoint prism, the regular tetrahedron,
+the least-and-greatest-edge bracket, the irregular prism, and its matrix form.
+Each is evaluated at the notebooks' measurements through each of these paths:
+
+-   ``subs``: ``sympy`` substitution, to an exact ``Rational``, as the notebooks do.
+-   ``evalf``: ``sympy`` numeric evaluation, ``evalf(subs=...)``.
+    ``sympy`` caches results by their arguments, so each call of these two after the first
+    moves the measurements by a different billionth of an inch; otherwise, the repeats
+    would time the cache.
+-   ``exact``: integer arithmetic from :mod:`vberth.exact`, for the polynomial models.
+-   ``compiled``: the ``lambdify``-ed NumPy form, from :mod:`vberth.compiled`, one call at a time.
+-   ``formulas``: the generated plain Python, from :mod:`vberth.formulas`.
+-   ``batched``: the compiled form over arrays of measurement sets; the time is per set.
+
+First, the paths are checked against each other: they have to agree with ``subs()``
+before their times mean anything. The values themselves are pinned to the volumes in
+``conclusion.md`` by ``tests/test_golden.py``.
+
+Then each path is timed with :mod:`timeit`: the median of several repeats, per call,
+and the spread of the repeats, their interquartile range.
+With ``--save``, the times are appended to ``.benchmarks/history.jsonl``, with the commit,
+and whether the tree had uncommitted changes. Each run is compared with the latest saved run
+of a different commit on the same machine. A path is a regression if it's more than ``--threshold``
+slower, and the difference is more than ``--spread`` times the larger of the two runs' spreads.
+Paths faster than ``--floor`` per call aren't compared: at a microsecond or two, the
+difference between two runs of the same code is often more than the threshold.
+The spread within a run doesn't include what changes between runs -- other processes,
+the clock speed -- so a path that looks slower is timed again, ``--confirm`` times,
+and its fastest time is used. With ``--strict``, a regression fails the run.
+"""
+import argparse
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from sympy import Rational
+
+from vberth import compiled, exact, formulas, symbolic
+
+#: Each model, as the mean of one or more of the derived expressions.
+MODELS: dict[str, tuple[str, ...]] = {
+    "midpoint_prism": ("midpoint_prism",),
+    "regular_tetrahedron": ("regular_tetrahedron",),
+    "tetrahedron_bracket": ("tetrahedron_least", "tetrahedron_greatest"),
+    "irregular_prism": ("irregular_prism",),
+    "matrix_prism": ("matrix_prism",),
+}
+
+PATHS = ("subs", "evalf", "exact", "compiled", "formulas", "batched")
+
+HISTORY = Path(".benchmarks") / "history.jsonl"
+
+
+def expression(part: str):
+    """The ``sympy`` expression of one of the parts of :data:`MODELS`, in the measurements."""
+    if part in compiled.MODELS:
+        return compiled.MODELS[part].expression()
+    return getattr(symbolic, part)()
+
+
+def paths(model: str, rows: int) -> dict[str, tuple[Callable[[], Any], Callable[[Any], float], int]]:
+    """
+    For each path that applies to the model: a function to time, a function from its result to gallons,
+    and the number of measurement sets it evaluates.
+    """
+    parts = MODELS[model]
+    measured = symbolic.MEASURED
+    values = [float(measured[s.name]) for s in symbolic.MEASUREMENTS]
+    arrays = [np.full(rows, v) for v in values]
+    exprs = [expression(p) for p in parts]
+    kernels = [compiled.compile_model(e) for e in exprs]
+    functions = [getattr(formulas, p) for p in parts]
+
+    calls = itertools.count()
+
+    def mean(results) -> float:
+        return sum(float(r) for r in results) / len(results)
+
+    def fresh() -> dict[str, Any]:
+        """The measurements, the first time; then moved by a different amount each time."""
+        offset = Rational(next(calls), 10**9)
+        return {name: value + offset for name, value in measured.items()}
+
+    def substituted() -> list[Any]:
+        values = fresh()
+        return [e.subs(values) for e in exprs]
+
+    def evaluated() -> list[Any]:
+        values = fresh()
+        return [e.evalf(subs=values) for e in exprs]
+
+    result = {
+        "subs": (substituted, mean, 1),
+        "evalf": (evaluated, mean, 1),
+        "compiled": (lambda: [k(*values) for k in kernels], mean, 1),
+        "formulas": (lambda: [f(*values) for f in functions], mean, 1),
+        "batched": (lambda: [k(*arrays) for k in kernels], lambda r: mean([np.asarray(a)[0] for a in r]), rows),
+    }
+    try:
+        exacts = [exact.kernel(p) for p in parts]
+    except KeyError:
+        pass
+    else:
+        result["exact"] = (lambda: [k(**measured) for k in exacts], mean, 1)
+    return {path: result[path] for path in PATHS if path in result}
+
+
+def check(rows: int = 16, tolerance: float = 1e-9) -> list[str]:
+    """Every path's value against ``subs()``; the disagreements, described."""
+    failures = []
+    for model in MODELS:
+        by_path = {path: gallons(function()) for path, (function, gallons, _) in paths(model, rows).items()}
+        expected = by_path["subs"]
+        for path, value in by_path.items():
+            if not abs(value - expected) <= tolerance * abs(expected):
+                failures.append(f"{model} by {path}: {value!r}, but by subs: {expected!r}")
+    return failures
+
+
+def measure(function: Callable[[], Any], repeat: int = 7) -> tuple[float, float]:
+    """
+    Seconds per call: the median of ``repeat`` runs of enough calls to take about 0.2 seconds,
+    and the interquartile range of the runs.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    q1, median, q3 = np.percentile(np.array(timer.repeat(repeat, number)) / number, [25, 50, 75])
+    return float(median), float(q3 - q1)
+
+
+def run(rows: int, repeat: int) -> dict[str, dict[str, dict[str, float]]]:
+    """
+    By model and path: ``seconds`` and ``spread`` per measurement set,
+    and ``call``, the seconds per call, for the ``--floor``.
+    """
+    times = {}
+    for model in MODELS:
+        times[model] = {}
+        for path, (function, _, count) in paths(model, rows).items():
+            median, spread = measure(function, repeat)
+            times[model][path] = {"seconds": median / count, "spread": spread / count, "call": median}
+    return times
+
+
+def commit() -> str:
+    """The current commit, with ``+`` if the tree has uncommitted changes."""
+    try:
+        head = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return head.stdout.strip() + ("+" if status.stdout.strip() else "")
+
+
+def machine() -> str:
+    return f"{platform.node()} {platform.machine()} {platform.python_version()}"
+
+
+def baseline(history: Path, current: str) -> dict[str, Any] | None:
+    """The latest saved run of a different commit on this machine."""
+    if not history.exists():
+        return None
+    records = [json.loads(line) for line in history.read_text().splitlines() if line.strip()]
+    for record in reversed(records):
+        if record["machine"] == machine() and record["commit"] != current:
+            return record
+    return None
+
+
+def previous(before: dict[str, Any] | None, model: str, path: str) -> dict[str, float] | None:
+    """A path's time in an earlier run, if it was timed, and saved with its spread."""
+    entry = before["times"].get(model, {}).get(path) if before else None
+    return entry if isinstance(entry, dict) else None
+
+
+def regressions(
+    times: dict[str, dict[str, dict[str, float]]], before: dict[str, Any],
+    threshold: float, spread: float = 3.0, floor: float = 2e-6,
+) -> list[tuple[str, str, str]]:
+    """
+    The model and path more than ``threshold`` slower than ``before``, by more than ``spread`` times
+    the larger of the two spreads, and a description. Paths faster than ``floor`` seconds per call are left out.
+
+    >>> before = {"times": {"m": {"fast": {"seconds": 1e-6, "spread": 1e-8, "call": 1e-6},
+    ...                           "noisy": {"seconds": 1e-4, "spread": 2e-5, "call": 1e-4},
+    ...                           "slow": {"seconds": 1e-4, "spread": 1e-6, "call": 1e-4}}}}
+    >>> now = {"m": {"fast": {"seconds": 2e-6, "spread": 1e-8, "call": 2e-6},
+    ...              "noisy": {"seconds": 1.5e-4, "spread": 1e-6, "call": 1.5e-4},
+    ...              "slow": {"seconds": 1.5e-4, "spread": 1e-6, "call": 1.5e-4}}}
+    >>> regressions(now, before, 0.25)
+    [('m', 'slow', 'm by slow: 150.000 µs, was 100.000 µs, 1.50x')]
+    """
+    found = []
+    for model, by_path in times.items():
+        for path, now in by_path.items():
+            then = previous(before, model, path)
+            if then is None or min(now["call"], then["call"]) < floor:
+                continue
+            slower = now["seconds"] - then["seconds"]
+            if (
+                now["seconds"] > then["seconds"] * (1 + threshold)
+                and slower > spread * max(now["spread"], then["spread"])
+            ):
+                found.append((
+                    model, path,
+                    f"{model} by {path}: {now['seconds']*1e6:.3f} µs, was {then['seconds']*1e6:.3f} µs, "
+                    f"{now['seconds']/then['seconds']:.2f}x"
+                ))
+    return found
+
+
+def confirm(
+    times: dict[str, dict[str, dict[str, float]]], found: list[tuple[str, str, str]], rows: int, repeat: int
+) -> None:
+    """Time the paths in ``found`` again, keeping the faster of the times."""
+    for model, path, _ in found:
+        function, _, count = paths(model, rows)[path]
+        median, spread = measure(function, repeat)
+        if median / count < times[model][path]["seconds"]:
+            times[model][path] = {"seconds": median / count, "spread": spread / count, "call": median}
+
+
+def report(times: dict[str, dict[str, dict[str, float]]], before: dict[str, Any] | None) -> None:
+    """A table of the times, in microseconds, with the ratio to ``before``."""
+    width = 18 if before else 12
+    print(f"{'µs per measurement set':24s}" + "".join(f"{p:>{width}s}" for p in PATHS))
+    for model, by_path in times.items():
+        cells = []
+        for path in PATHS:
+            text = f"{by_path[path]['seconds']*1e6:.3f}" if path in by_path else ""
+            then = previous(before, model, path)
+            if text and then:
+                text += f" {by_path[path]['seconds']/then['seconds']:4.2f}x"
+            cells.append(f"{text:>{width}s}")
+        print(f"{model:24s}" + "".join(cells))
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000, help="measurement sets in a batch")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--save", action="store_true", help="append the times to the history")
+    parser.add_argument("--history", type=Path, default=HISTORY)
+    parser.add_argument("--threshold", type=float, default=0.25, help="slowdown that counts as a regression")
+    parser.add_argument("--spread", type=float, default=3.0, help="interquartile ranges a slowdown must exceed")
+    parser.add_argument("--floor", type=float, default=2e-6, help="seconds per call below which paths aren't compared")
+    parser.add_argument("--confirm", type=int, default=2, help="times to re-time a path that looks slower")
+    parser.add_argument("--strict", action="store_true", help="exit with an error on a regression")
+    options = parser.parse_args(argv)
+
+    failures = check()
+    if failures:
+        sys.exit("paths disagree:\n" + "\n".join(failures))
+
+    current = commit()
+    times = run(options.rows, options.repeat)
+    before = baseline(options.history, current)
+    found = []
+    if before:
+        found = regressions(times, before, options.threshold, options.spread, options.floor)
+        for _ in range(options.confirm):
+            if not found:
+                break
+            confirm(times, found, options.rows, options.repeat)
+            found = regressions(times, before, options.threshold, options.spread, options.floor)
+        print(f"compared with {before['commit']} of {before['date']}")
+    report(times, before)
+    if options.save:
+        options.history.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "commit": current, "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "machine": machine(), "rows": options.rows, "times": times,
+        }
+        with options.history.open("a") as target:
+            target.write(json.dumps(record) + "\n")
+        print(f"saved to {options.history}")
+    if found:
+        print(f"{len(found)} regressions, more than {options.threshold:.0%} slower:")
+        for *_, description in found:
+            print(f"  {description}")
+        if options.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+The volumes in ``conclusion.md``, from every model, by every evaluation path.
+
+The conclusion rounds: the midpoint prism is 50.97 gallons, the regular tetrahedron 50.4,
+the bracket from the least and greatest edges 50.74, and the irregular prism 56.9.
+Each path has to agree with those to the precision they're quoted at.
+The bracket is exactly 50.7349; the notebook's 50.74 is the mean of ``V_l`` and ``V_g``
+after ``evalf(4)``, so it's checked to 0.01.
+"""
+import numpy as np
+import pytest
+from sympy import Rational
+
+from vberth import compiled, exact, formulas, symbolic
+
+#: The conclusion's volumes, in gallons, and how close each path must be.
+GOLDEN = {
+    "midpoint_prism": (50.97, 0.005),
+    "regular_tetrahedron": (50.4, 0.05),
+    "tetrahedron_bracket": (50.74, 0.01),
+    "irregular_prism": (56.9, 0.05),
+    "matrix_prism": (56.9, 0.05),
+}
+
+#: Each model, as the mean of one or more of the derived expressions.
+MODELS = {
+    "midpoint_prism": ("midpoint_prism",),
+    "regular_tetrahedron": ("regular_tetrahedron",),
+    "tetrahedron_bracket": ("tetrahedron_least", "tetrahedron_greatest"),
+    "irregular_prism": ("irregular_prism",),
+    "matrix_prism": ("matrix_prism",),
+}
+
+#: The models :mod:`vberth.exact` computes: the polynomial ones.
+EXACT = ("midpoint_prism", "irregular_prism", "matrix_prism")
+
+MEASURED = symbolic.MEASURED
+VALUES = [float(MEASURED[s.name]) for s in symbolic.MEASUREMENTS]
+
+
+def expression(part):
+    if part in compiled.MODELS:
+        return compiled.MODELS[part].expression()
+    return getattr(symbolic, part)()
+
+
+def batched(part):
+    gallons = compiled.compile_model(expression(part))(*(np.full(4, v) for v in VALUES))
+    assert np.all(gallons == gallons[0])
+    return float(gallons[0])
+
+
+PATHS = {
+    "subs": lambda part: float(expression(part).subs(MEASURED)),
+    "evalf": lambda part: float(expression(part).evalf(subs=MEASURED)),
+    "exact": lambda part: float(exact.kernel(part)(**MEASURED)),
+    "compiled": lambda part: float(compiled.compile_model(expression(part))(*VALUES)),
+    "formulas": lambda part: float(getattr(formulas, part)(*VALUES)),
+    "batched": batched,
+}
+
+
+@pytest.mark.parametrize("path", PATHS)
+@pytest.mark.parametrize("model", GOLDEN)
+def test_conclusion(model, path):
+    if path == "exact" and model not in EXACT:
+        pytest.skip(f"{model} isn't a polynomial")
+    expected, tolerance = GOLDEN[model]
+    parts = MODELS[model]
+    gallons = sum(PATHS[path](part) for part in parts) / len(parts)
+    assert gallons == pytest.approx(expected, abs=tolerance)
+
+
+def test_irregular_prism_exactly():
+    assert exact.kernel("irregular_prism")(**MEASURED) == Rational(52555, 924)
+    assert exact.kernel("matrix_prism")(**MEASURED) == Rational(52555, 924)
+    assert expression("irregular_prism").subs(MEASURED) == Rational(52555, 924)
+
+
+def test_bracket_unrounded():
+    least, greatest = (float(expression(p).subs(MEASURED)) for p in MODELS["tetrahedron_bracket"])
+    assert (least + greatest) / 2 == pytest.approx(50.7349, abs=5e-5)
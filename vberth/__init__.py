@@ -0,0 +1,84 @@
+"""
+V-Berth Volume
+
+The notebooks derive three models for the volume of the V-berth tank.
+This package collects those derivations so they can be reused outside
+of Jupyter.
+
+-   :mod:`vberth.symbolic` has the ``sympy`` forms of the models,
+    written the way the notebooks write them.
+
+-   :mod:`vberth.compiled` has numeric forms of the same models, compiled
+    once from the symbolic forms, that work on NumPy arrays of measurements.
+
+-   :mod:`vberth.formulas` has the closed forms as plain Python functions,
+    generated by :mod:`vberth.codegen`, for use where ``sympy`` is too slow to import.
+
+-   :mod:`vberth.exact` computes the prism models as exact fractions, shown
+    as mixed numbers, with integer arithmetic instead of ``subs()``.
+
+-   :mod:`vberth.sensitivity` compiles each model's gradient with its volume,
+    and ranks the measurements by their effect on the volume.
+
+-   :mod:`vberth.montecarlo` estimates how the uncertainty in the
+    tape measurements carries through to the volumes.
+
+-   :mod:`vberth.cache` saves the results of slow symbolic operations on disk
+    so later notebook runs can load them.
+
+-   :mod:`vberth.polysimp` simplifies the derivations by polynomial arithmetic,
+    to the factored form, much faster than ``simplify()``.
+
+-   :mod:`vberth.monitor` is an ``asyncio`` service that converts a level sender's
+    depths to gallons, smooths them, and publishes them over HTTP.
+
+-   :mod:`vberth.execute` executes the book's notebooks, in parallel, only when
+    their code or environment has changed.
+
+-   :mod:`vberth.instrument` profiles the ``sympy`` operations in each
+    notebook cell, for a report and a flame graph.
+
+-   :mod:`vberth.panel` has sliders for the measurements, and a table of
+    the models' volumes that follows them as they're dragged.
+
+-   :mod:`vberth.reactive` is a dependency graph of cells, so changing a
+    measurement recomputes only the cells that depend on it.
+
+-   :mod:`vberth.loft` computes the volume from any number of cross-sections
+    measured along the keel.
+
+-   :mod:`vberth.fleet` stores the measurements of a fleet's tanks in memory-mapped
+    columns, re-evaluates only the rows that change, and totals the volumes by boat.
+
+-   :mod:`vberth.contraction` computes the same volumes as a tensor
+    contraction with a banded weight matrix, for a whole fleet at once.
+
+-   :mod:`vberth.quadrature` integrates :math:`A(z)` for curved tapers, with
+    adaptive Gauss-Legendre quadrature, or exactly for polynomials.
+
+-   :mod:`vberth.mesh` builds a triangle mesh of the tank, for its volume
+    and for binary STL.
+
+-   :mod:`vberth.hull` computes the convex hull of a cloud of measured points,
+    and its volume.
+
+-   :mod:`vberth.tetrahedron` computes the exact volume of an irregular
+    tetrahedron from its six edges.
+
+-   :mod:`vberth.sounding` converts between liquid depth and gallons.
+
+-   :mod:`vberth.attitude` does the same when the boat is trimmed or heeled,
+    from a memory-mapped grid over depth, pitch, and roll.
+
+-   :mod:`vberth.calibrate` fits the dimensions to observations of
+    gallons pumped in at measured depths.
+
+-   :mod:`vberth.design` searches for the largest replacement tank or bladder
+    that fits inside the old one, given the clearance and the access hole.
+
+-   :mod:`vberth.batch` is a command-line tool that streams measurement
+    sets in and every model's volume out.
+
+Importing the package itself is cheap: nothing here imports ``sympy``
+until one of the modules that needs it is imported.
+"""
@@ -0,0 +1,212 @@
+"""
+Partial volumes when the boat is trimmed or heeled.
+
+A sounding table assumes the liquid surface is parallel to the top of the tank.
+Underway, the boat pitches and rolls, and the same fuel shows a different depth
+at the sounding point. This module precomputes a grid of gallons over
+(depth, pitch, roll), stores it in a memory-mapped file, and looks up
+values with trilinear interpolation.
+
+Coordinates are the tank's: :math:`x` is athwartships, positive to starboard;
+:math:`y` is up, zero at the lowest point of the keel; :math:`z` is aft from the
+forward end. The section at :math:`z` is the triangle with its apex on the keel,
+:math:`(0, H - h(z))`, and its top corners at :math:`(\\pm w(z)/2, H)`, where
+:math:`H = \\max(h_f, h_a)`.
+
+Pitch is positive bow up, roll is positive starboard down, both in degrees.
+The depth is read at the sounding point, on the centerline at the aft end.
+The liquid surface in tank coordinates is the plane
+
+.. math::
+
+    y = d + (z - l_{fa}) \\tan \\theta + x \\tan \\phi
+
+Each section is clipped by this plane, and the wet areas are integrated along :math:`z`
+with composite Gauss-Legendre quadrature. Building the grid is spread over processes,
+one pitch at a time.
+
+The file is a fixed-size header followed by the grid of ``float32`` gallons,
+in C order, shape (depths, pitches, rolls). The header has a magic number, a version,
+the three axis lengths, and the first and last value of each axis.
+
+>>> import tempfile, os
+>>> m = dict(h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46)
+>>> with tempfile.TemporaryDirectory() as directory:
+...     path = os.path.join(directory, "vberth.grid")
+...     build_grid(m, path, depths=(0, 27, 28), pitches=(-5, 5, 3), rolls=(-10, 10, 5), workers=1)
+...     grid = VolumeGrid.open(path)
+...     level = round(float(grid.gallons(27, 0, 0)), 2)
+...     shape = grid.volumes.shape
+...     del grid
+>>> level, shape
+(56.88, (28, 3, 5))
+"""
+import os
+import struct
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+MAGIC = b"VBGRID\x00\x00"
+VERSION = 1
+#: magic, version, three axis lengths, (first, last) of each axis.
+HEADER = struct.Struct("<8sI3I6d")
+#: The grid starts on a 64-byte boundary, after the header.
+OFFSET = 128
+assert HEADER.size <= OFFSET
+
+#: Gauss-Legendre nodes and weights on [-1, 1], used on each panel.
+NODES, WEIGHTS = np.polynomial.legendre.leggauss(4)
+
+
+def wet_fraction(s: np.ndarray) -> np.ndarray:
+    """
+    The fraction of a triangle's area below a plane, given the signed height
+    of the plane above each of its three vertices: ``s`` has shape ``(..., 3)``.
+
+    When one vertex is on the other side of the plane from the other two, it's the apex of a
+    similar-ish corner triangle with area ratio :math:`s_v^2 / ((s_v - s_j)(s_v - s_k))`.
+    """
+    wet = s > 0
+    count = wet.sum(axis=-1)
+    ratios = []
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for v, j, k in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+            ratios.append(s[..., v]**2 / ((s[..., v] - s[..., j]) * (s[..., v] - s[..., k])))
+    ratio = np.stack(ratios, axis=-1)
+    # The odd vertex: the only wet one, or the only dry one.
+    odd = np.where(count[..., np.newaxis] == 1, wet, ~wet)
+    corner = np.where(odd, ratio, 0.0).sum(axis=-1)
+    return np.select([count == 3, count == 2, count == 1], [1.0, 1.0 - corner, corner], 0.0)
+
+
+def partial_volume(
+    depth: ArrayLike, pitch: ArrayLike, roll: ArrayLike,
+    measured: Mapping[str, float], panels: int = 64,
+) -> np.ndarray:
+    """Gallons below the liquid surface, for broadcastable arrays of depth, pitch, and roll."""
+    h_f, w_f, h_a, w_a, l_fa = (float(measured[n]) for n in ("h_f", "w_f", "h_a", "w_a", "l_fa"))
+    H = max(h_f, h_a)
+    d, tan_p, tan_r = np.broadcast_arrays(
+        np.asarray(depth, dtype=float),
+        np.tan(np.radians(np.asarray(pitch, dtype=float))),
+        np.tan(np.radians(np.asarray(roll, dtype=float))),
+    )
+    edges = np.linspace(0.0, l_fa, panels + 1)
+    half = (edges[1] - edges[0]) / 2
+    z = ((edges[:-1] + edges[1:]) / 2)[:, np.newaxis] + half * NODES
+    z = z.ravel()
+    weights = np.tile(WEIGHTS, panels) * half
+    h = h_f + (h_a - h_f) / l_fa * z
+    w = w_f + (w_a - w_f) / l_fa * z
+    # The three vertices of each section: (x, y).
+    x = np.stack([np.zeros_like(z), -w / 2, w / 2], axis=-1)
+    y = np.stack([H - h, np.full_like(z, H), np.full_like(z, H)], axis=-1)
+    surface = (
+        d[..., np.newaxis, np.newaxis]
+        + ((z - l_fa)[:, np.newaxis] * tan_p[..., np.newaxis, np.newaxis])
+        + x * tan_r[..., np.newaxis, np.newaxis]
+    )
+    area = wet_fraction(surface - y) * (h * w / 2)
+    return area @ weights / GALLON
+
+
+def _pitch_slice(
+    args: tuple[float, np.ndarray, np.ndarray, Mapping[str, float]]
+) -> np.ndarray:
+    pitch, depths, rolls, measured = args
+    return partial_volume(depths[:, np.newaxis], pitch, rolls[np.newaxis, :], measured)
+
+
+def build_grid(
+    measured: Mapping[str, float],
+    path: Path | str,
+    depths: tuple[float, float, int] | None = None,
+    pitches: tuple[float, float, int] = (-10.0, 10.0, 41),
+    rolls: tuple[float, float, int] = (-30.0, 30.0, 61),
+    workers: int | None = None,
+) -> None:
+    """
+    Compute the grid and write it to ``path``.
+
+    Each axis is ``(first, last, count)``. The depths default to the
+    height of the tank, in quarter inches.
+    """
+    if depths is None:
+        height = max(float(measured["h_f"]), float(measured["h_a"]))
+        depths = (0.0, height, int(height * 4) + 1)
+    axes = [np.linspace(first, last, count) for first, last, count in (depths, pitches, rolls)]
+    shape = tuple(len(a) for a in axes)
+    header = HEADER.pack(
+        MAGIC, VERSION, *shape,
+        *(float(v) for a in axes for v in (a[0], a[-1])),
+    )
+    with open(path, "wb") as target:
+        target.write(header.ljust(OFFSET, b"\x00"))
+        target.truncate(OFFSET + 4 * int(np.prod(shape)))
+    grid = np.memmap(path, dtype="<f4", mode="r+", offset=OFFSET, shape=shape)
+    measured = {k: float(v) for k, v in measured.items()}
+    work = [(p, axes[0], axes[2], measured) for p in axes[1]]
+    if workers == 1:
+        slices = map(_pitch_slice, work)
+        for i, volumes in enumerate(slices):
+            grid[:, i, :] = volumes
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for i, volumes in enumerate(pool.map(_pitch_slice, work)):
+                grid[:, i, :] = volumes
+    grid.flush()
+    del grid
+
+
+@dataclass
+class VolumeGrid:
+    """A memory-mapped grid of gallons over (depth, pitch, roll)."""
+    volumes: np.ndarray
+    axes: tuple[np.ndarray, np.ndarray, np.ndarray]
+
+    @classmethod
+    def open(cls, path: Path | str) -> "VolumeGrid":
+        with open(path, "rb") as source:
+            magic, version, *values = HEADER.unpack(source.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} volume grid")
+        shape = tuple(values[:3])
+        limits = values[3:]
+        axes = tuple(
+            np.linspace(limits[2*i], limits[2*i + 1], n) for i, n in enumerate(shape)
+        )
+        volumes = np.memmap(path, dtype="<f4", mode="r", offset=OFFSET, shape=shape)
+        return cls(volumes, axes)
+
+    def gallons(self, depth: ArrayLike, pitch: ArrayLike, roll: ArrayLike) -> np.ndarray:
+        """Trilinear interpolation. Values outside the grid are clipped to its edges."""
+        index = []
+        fraction = []
+        for value, axis in zip(np.broadcast_arrays(
+            np.asarray(depth, dtype=float), np.asarray(pitch, dtype=float), np.asarray(roll, dtype=float)
+        ), self.axes):
+            if len(axis) == 1:
+                index.append(np.zeros(value.shape, dtype=int))
+                fraction.append(np.zeros(value.shape))
+                continue
+            position = (np.clip(value, axis[0], axis[-1]) - axis[0]) / (axis[1] - axis[0])
+            i = np.minimum(position.astype(int), len(axis) - 2)
+            index.append(i)
+            fraction.append(position - i)
+        result = np.zeros(index[0].shape)
+        for corner in np.ndindex(2, 2, 2):
+            weight = np.ones(index[0].shape)
+            at = []
+            for bit, i, f, axis in zip(corner, index, fraction, self.axes):
+                weight = weight * (f if bit else 1 - f)
+                at.append(np.minimum(i + bit, len(axis) - 1))
+            result += weight * self.volumes[tuple(at)]
+        return result
@@ -0,0 +1,288 @@
+"""
+Batch volumes: measurement sets in, every model's volume out.
+
+Each input record has the same keys as the notebooks' ``measured`` dictionary:
+``h_f``, ``w_f``, ``h_a``, ``w_a``, and ``l_fa``, in inches. Values can be decimals or
+fractions, like ``21/2``. Any other fields, like an identifier, are copied to the output.
+
+The input is CSV, with a heading row, or JSON Lines, one object per line.
+The output is the same format, with a column for each of the volumes, in gallons.
+
+-   ``midpoint_prism``, from ``prism.ipynb``,
+
+-   ``regular_tetrahedron``, and the bracket from the least and greatest
+    edges, ``tetrahedron_least``, ``tetrahedron_greatest``, and their midpoint,
+    ``tetrahedron_bracket``, from ``tetrahedron.ipynb``,
+
+-   ``irregular_prism``, from ``prism-irregular.ipynb``.
+
+Records are read, evaluated, and written in chunks, so memory use doesn't depend
+on the size of the input. Each chunk is evaluated with the compiled models from
+:mod:`vberth.compiled`. With ``--workers``, chunks are spread over a pool of
+processes; a bounded number of chunks are in flight, and output stays in input order.
+(CSV values are expected to be numbers and identifiers, without quoted newlines.)
+
+A record that can't be evaluated -- a CSV row without a value for every column,
+a line that isn't a JSON object, or a measurement that's missing or isn't a number,
+like ``true`` or ``[8]`` -- is written without volumes, and described, with its line number,
+on standard error. A JSON line that isn't an object is copied as it is.
+The exit status is 1 if any were. A blank line is copied as a blank line,
+so the output has a line for each input line.
+
+::
+
+    python -m vberth.batch measurements.csv > volumes.csv
+    python -m vberth.batch --format jsonl --workers 8 < measurements.jsonl
+
+>>> print(evaluate_chunk("csv", ["id", "h_f", "w_f", "h_a", "w_a", "l_fa"], ["A,8,21/2,27,48,46\\n"])[0], end="")
+A,8,21/2,27,48,46,50.9659,50.3948,24.0512,77.4186,50.7349,56.8777
+"""
+import argparse
+import csv
+import json
+import sys
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from fractions import Fraction
+from itertools import islice
+from typing import Any, TextIO, TypeVar
+
+import numpy as np
+
+from vberth import compiled
+
+MEASUREMENTS = ("h_f", "w_f", "h_a", "w_a", "l_fa")
+
+#: The output columns, in order.
+VOLUMES = (
+    "midpoint_prism",
+    "regular_tetrahedron",
+    "tetrahedron_least",
+    "tetrahedron_greatest",
+    "tetrahedron_bracket",
+    "irregular_prism",
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def number(text: Any) -> float:
+    """A measurement: a number, or a string that's a decimal or a fraction. ``True`` isn't a number."""
+    if isinstance(text, bool) or not isinstance(text, (int, float, str)):
+        raise TypeError(f"{text!r} isn't a number")
+    try:
+        return float(text)
+    except ValueError:
+        return float(Fraction(text.strip()))
+
+
+def column(values: Iterable[Any]) -> np.ndarray:
+    """
+    An array of measurements. Decimals are converted in bulk; fractions, and values
+    that NumPy would take but :func:`number` wouldn't, like ``True``, one at a time.
+    """
+    values = list(values)
+    if set(map(type, values)) <= {int, float, str}:
+        try:
+            return np.array(values, dtype=float)
+        except ValueError:
+            pass
+    return np.array([number(v) for v in values], dtype=float)
+
+
+def volumes(measurements: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Every model's volume for arrays of the five measurements."""
+    result = {
+        name: compiled.evaluate(name, **measurements)
+        for name in VOLUMES if name in compiled.MODELS
+    }
+    result["tetrahedron_bracket"] = (result["tetrahedron_least"] + result["tetrahedron_greatest"]) / 2
+    return result
+
+
+def measurements(
+    records: list[dict[str, Any]], numbers: list[int], rejected: np.ndarray, errors: dict[int, str]
+) -> dict[str, np.ndarray]:
+    """
+    Arrays of the measurements from parsed records. A record with a missing or unreadable measurement
+    is described in ``errors``, by its line number, and marked in ``rejected``.
+    The measurements of rejected records are NaN.
+    """
+    result = {}
+    for name in MEASUREMENTS:
+        values = [record.get(name) for record in records]
+        try:
+            if None in values:
+                raise ValueError("missing")
+            result[name] = column(values)
+        except (ValueError, TypeError, ZeroDivisionError):
+            # Find the values that aren't numbers.
+            result[name] = np.full(len(values), np.nan)
+            for i, value in enumerate(values):
+                try:
+                    result[name][i] = number(value)
+                except (ValueError, TypeError, AttributeError, ZeroDivisionError):
+                    if not rejected[i]:
+                        problem = "is missing" if value in (None, "") else f"{value!r} isn't a number"
+                        errors[numbers[i]] = f"{name} {problem}"
+                    rejected[i] = True
+    for values in result.values():
+        values[rejected] = np.nan
+    return result
+
+
+def evaluate_chunk(format: str, fields: list[str], lines: list[str], first: int = 1) -> tuple[str, list[str]]:
+    """
+    Parse a chunk of input lines, evaluate all the models, and format the output lines.
+    ``first`` is the line number of the first line.
+
+    Returns the output, and a description of each rejected record. A rejected record
+    is in the output, without volumes, and a blank line is blank,
+    so the output has a line for each input line.
+
+    >>> fields = ["id", "h_f", "w_f", "h_a", "w_a", "l_fa"]
+    >>> text, errors = evaluate_chunk("csv", fields, ["B,8,x,27,48,46", "", "C,8,27,48,46"], 2)
+    >>> print(text, end="")
+    B,8,x,27,48,46,,,,,,
+    <BLANKLINE>
+    C,8,27,48,46,,,,,,
+    >>> for error in errors:
+    ...     print(error)
+    line 2: w_f 'x' isn't a number
+    line 4: 5 fields, the heading has 6
+
+    >>> lines = ['[1]', '{"h_f": true, "w_f": 10.5, "h_a": 27, "w_a": 48, "l_fa": 46}']
+    >>> text, errors = evaluate_chunk("jsonl", [], lines)
+    >>> print(text, end="")  # doctest: +ELLIPSIS
+    [1]
+    {"h_f": true, "w_f": 10.5, ..., "midpoint_prism": null, ...}
+    >>> for error in errors:
+    ...     print(error)
+    line 1: not a JSON object
+    line 2: h_f True isn't a number
+    """
+    text = [line.rstrip("\r\n") for line in lines]
+    kept = [i for i, line in enumerate(text) if line.strip()]
+    numbers = [first + i for i in kept]
+    lines = [text[i] for i in kept]
+    rejected = np.zeros(len(lines), dtype=bool)
+    errors: dict[int, str] = {}
+    records: list[dict[str, Any]] = []
+    objects = np.ones(len(lines), dtype=bool)
+    if format == "csv":
+        for i, row in enumerate(csv.reader(lines)):
+            if len(row) != len(fields):
+                # Rather than misalign the values with the heading.
+                errors[numbers[i]] = f"{len(row)} fields, the heading has {len(fields)}"
+                rejected[i] = True
+                row = []
+            records.append(dict(zip(fields, row)))
+    else:
+        for i, line in enumerate(lines):
+            try:
+                row = json.loads(line)
+            except ValueError as ex:
+                row = None
+                errors[numbers[i]] = f"not JSON: {ex}"
+            else:
+                if not isinstance(row, dict):
+                    errors[numbers[i]] = "not a JSON object"
+            if not isinstance(row, dict):
+                rejected[i] = True
+                objects[i] = False
+                row = {}
+            records.append(row)
+    results = volumes(measurements(records, numbers, rejected, errors))
+    if format == "csv":
+        # The input line is copied as-is, so quoting is preserved.
+        formatted = [
+            ["" if bad else f"{v:.4f}" for v, bad in zip(results[name].tolist(), rejected.tolist())]
+            for name in VOLUMES
+        ]
+        output = (",".join((line, *values)) for line, values in zip(lines, zip(*formatted)))
+    else:
+        rounded = [
+            [None if bad else v for v, bad in zip(results[name].round(4).tolist(), rejected.tolist())]
+            for name in VOLUMES
+        ]
+        output = (
+            json.dumps(row | dict(zip(VOLUMES, values))) if whole else line
+            for row, line, whole, values in zip(records, lines, objects.tolist(), zip(*rounded))
+        )
+    for i, line in zip(kept, output):
+        text[i] = line
+    return "".join(f"{line}\n" for line in text), [f"line {n}: {errors[n]}" for n in sorted(errors)]
+
+
+def chunks(lines: Iterable[str], size: int) -> Iterator[list[str]]:
+    iterator = iter(lines)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def bounded_map(executor: Executor, function: Callable[..., R], items: Iterable[T], window: int) -> Iterator[R]:
+    """Like ``executor.map()``, but with at most ``window`` items submitted and not yet consumed."""
+    pending: deque[Future[R]] = deque()
+    for item in items:
+        pending.append(executor.submit(function, *item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def process(
+    source: TextIO, target: TextIO, format: str, chunk: int = 10_000, workers: int = 0, errors: TextIO = sys.stderr
+) -> int:
+    """
+    Stream the records from ``source`` to ``target``. Each rejected record is described on ``errors``,
+    with its line number. Returns the number rejected.
+    """
+    fields: list[str] = []
+    first = 1
+    if format == "csv":
+        fields = next(csv.reader([source.readline()]))
+        missing = [m for m in MEASUREMENTS if m not in fields]
+        if missing:
+            raise ValueError(f"heading row is missing {missing}")
+        csv.writer(target, lineterminator="\n").writerow(fields + list(VOLUMES))
+        first = 2
+    work = ((format, fields, lines, first + i * chunk) for i, lines in enumerate(chunks(source, chunk)))
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = bounded_map(pool, evaluate_chunk, work, 2 * workers)
+            return _write(results, target, errors)
+    return _write((evaluate_chunk(*args) for args in work), target, errors)
+
+
+def _write(results: Iterable[tuple[str, list[str]]], target: TextIO, errors: TextIO) -> int:
+    rejected = 0
+    for text, problems in results:
+        target.write(text)
+        for problem in problems:
+            print(problem, file=errors)
+        rejected += len(problems)
+    return rejected
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Volumes for every model from a file of measurement sets")
+    parser.add_argument("input", nargs="?", type=argparse.FileType("r"), default=sys.stdin)
+    parser.add_argument("-o", "--output", type=argparse.FileType("w"), default=sys.stdout)
+    parser.add_argument("-f", "--format", choices=("csv", "jsonl"))
+    parser.add_argument("--chunk", type=int, default=10_000, help="records per chunk")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="processes; 0 evaluates in this process")
+    options = parser.parse_args(argv)
+    format = options.format or ("jsonl" if options.input.name.endswith((".jsonl", ".json")) else "csv")
+    try:
+        rejected = process(options.input, options.output, format, options.chunk, options.workers)
+    except ValueError as ex:
+        parser.exit(2, f"{parser.prog}: {ex}\n")
+    if rejected:
+        parser.exit(1, f"{parser.prog}: {rejected:,} records rejected\n")
+
+
+if __name__ == "__main__":
+    main()
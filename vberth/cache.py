@@ -0,0 +1,212 @@
+"""
+A persistent cache for the expensive ``sympy`` derivations.
+
+Each run of a notebook repeats the same symbolic work: integrating :math:`A(z)`,
+``factor(simplify(...))``, ``radsimp()``, ``ratsimp()``. None of this depends on anything
+but the input expression, so the results can be saved on disk and loaded by later runs.
+
+An entry's key is a hash of the ``sympy`` version, the operation name, and the ``srepr()``
+of the input expression and any other arguments.
+``srepr()`` is a canonical form: ``sympy`` sorts the arguments of sums and products,
+so equal expressions have equal keys no matter how they were built.
+A new version of ``sympy`` may simplify differently, or pickle differently, so it starts a new set of entries.
+Arguments with no stable ``srepr()``, like a ``measure`` function, make a new key each run: they're always misses.
+
+The values are pickled ``sympy`` expressions, along with the time it took to compute them.
+An entry that can't be loaded, for any reason, is a miss, and is replaced.
+When the total size of the cache goes over a limit, the least-recently-used entries are removed.
+
+The cached forms of the operations have the same names and arguments as the ``sympy`` functions,
+so a notebook can replace the originals after ``from sympy import *``::
+
+    from vberth.cache import doit, factor, simplify, radsimp, ratsimp, canonical, derivations
+
+At the end of the notebook, ``print(derivations.report())`` shows the hit rate and time saved.
+
+The cache is in ``.sympy-cache`` in the current working directory,
+unless the ``VBERTH_CACHE`` environment variable names another directory.
+
+>>> import tempfile
+>>> from sympy import symbols, expand
+>>> x = symbols("x")
+>>> with tempfile.TemporaryDirectory() as directory:
+...     first = DerivationCache(directory)
+...     _ = first.apply("factor", expand((x + 1)**2))
+...     second = DerivationCache(directory)
+...     result = second.apply("factor", expand((x + 1)**2))
+>>> result
+(x + 1)**2
+>>> (first.misses, second.hits)
+(1, 1)
+
+Other arguments are passed to the ``sympy`` function, and are part of the key.
+
+>>> DerivationCache.key("factor", x**2 - 2) == DerivationCache.key("factor", x**2 - 2, extension=sympy.sqrt(2))
+False
+"""
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from collections import Counter
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import sympy
+from sympy import Basic, srepr
+
+from vberth import polysimp
+
+#: The operations the cache knows how to perform.
+#: The ``sympy`` functions are looked up when they're called, so :mod:`vberth.instrument` can wrap them.
+OPERATIONS: dict[str, Callable[..., Basic]] = {
+    "doit": lambda expr, **hints: expr.doit(**hints),
+    "factor": lambda expr, *args, **kwargs: sympy.factor(expr, *args, **kwargs),
+    "simplify": lambda expr, *args, **kwargs: sympy.simplify(expr, *args, **kwargs),
+    "radsimp": lambda expr, *args, **kwargs: sympy.radsimp(expr, *args, **kwargs),
+    "ratsimp": lambda expr, *args, **kwargs: sympy.ratsimp(expr, *args, **kwargs),
+    "expand": lambda expr, *args, **kwargs: sympy.expand(expr, *args, **kwargs),
+    "canonical": lambda expr: polysimp.canonical(expr),
+}
+
+#: Default limit on the size of the cache directory.
+MAX_BYTES = 64 * 2**20
+
+
+class DerivationCache:
+    """
+    A content-addressed, size-limited, on-disk cache of symbolic operations.
+
+    Each instance counts its own hits and misses, and the
+    compute time that hits avoided. A notebook run is one instance,
+    or :meth:`reset` starts the counts again.
+
+    When ``enabled`` is false, every operation is computed, and nothing is read, written, or counted.
+    :mod:`vberth.instrument` does this, so the profile is of ``sympy``, not of unpickling.
+    """
+    def __init__(self, directory: Path | str | None = None, max_bytes: int = MAX_BYTES) -> None:
+        self.directory = Path(directory or os.environ.get("VBERTH_CACHE", ".sympy-cache"))
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+        self.operations: Counter[tuple[str, bool]] = Counter()
+
+    @staticmethod
+    def key(operation: str, expr: Basic, *args: Any, **kwargs: Any) -> str:
+        text = f"{sympy.__version__}:{operation}:{srepr(expr)}"
+        if args or kwargs:
+            text += f":{srepr(args)}:{srepr(sorted(kwargs.items()))}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pickle"
+
+    def apply(self, operation: str, expr: Basic, *args: Any, **kwargs: Any) -> Basic:
+        """The result of ``operation`` applied to ``expr`` and any other arguments, from the cache if possible."""
+        if not self.enabled:
+            return OPERATIONS[operation](expr, *args, **kwargs)
+        path = self.path(self.key(operation, expr, *args, **kwargs))
+        start = time.perf_counter()
+        try:
+            with path.open("rb") as source:
+                result, elapsed = pickle.load(source)
+        except Exception:
+            # Missing, truncated, or pickled by an incompatible version: compute it again.
+            pass
+        else:
+            os.utime(path)  # Most recently used.
+            self.hits += 1
+            self.saved += max(elapsed - (time.perf_counter() - start), 0.0)
+            self.operations[operation, True] += 1
+            return result
+        start = time.perf_counter()
+        result = OPERATIONS[operation](expr, *args, **kwargs)
+        elapsed = time.perf_counter() - start
+        self.misses += 1
+        self.operations[operation, False] += 1
+        self.save(path, (result, elapsed))
+        return result
+
+    def save(self, path: Path, entry: tuple[Basic, float]) -> None:
+        """Write an entry atomically, then evict old entries if the cache is too big."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=path.parent, delete=False) as target:
+            pickle.dump(entry, target, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(target.name, path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove the least-recently-used entries until the cache fits in ``max_bytes``."""
+        entries = [(p.stat(), p) for p in self.directory.glob("*/*.pickle")]
+        total = sum(s.st_size for s, _ in entries)
+        for stat, path in sorted(entries, key=lambda e: e[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*/*.pickle"):
+            path.unlink(missing_ok=True)
+
+    def reset(self) -> None:
+        """Start counting again, for another notebook run."""
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0
+        self.operations.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / max(self.hits + self.misses, 1)
+
+    def report(self) -> str:
+        if not self.enabled:
+            return f"sympy cache {self.directory}: disabled"
+        lines = [
+            f"sympy cache {self.directory}: {self.hits} hits, {self.misses} misses"
+            f" ({self.hit_rate:.0%}), {self.saved:.2f} s saved"
+        ]
+        for operation in OPERATIONS:
+            hit, miss = self.operations[operation, True], self.operations[operation, False]
+            if hit or miss:
+                lines.append(f"  {operation:8s} {hit:3d} hits {miss:3d} misses")
+        return "\n".join(lines)
+
+
+#: The cache used by the module-level functions.
+derivations = DerivationCache()
+
+
+def doit(expr: Basic, **hints: Any) -> Basic:
+    """Cached ``expr.doit(**hints)``."""
+    return derivations.apply("doit", expr, **hints)
+
+
+def factor(expr: Any, *args: Any, **kwargs: Any) -> Any:
+    """Cached :func:`sympy.factor`."""
+    return derivations.apply("factor", sympy.sympify(expr), *args, **kwargs)
+
+
+def simplify(expr: Any, *args: Any, **kwargs: Any) -> Any:
+    """Cached :func:`sympy.simplify`."""
+    return derivations.apply("simplify", sympy.sympify(expr), *args, **kwargs)
+
+
+def radsimp(expr: Any, *args: Any, **kwargs: Any) -> Any:
+    """Cached :func:`sympy.radsimp`."""
+    return derivations.apply("radsimp", sympy.sympify(expr), *args, **kwargs)
+
+
+def ratsimp(expr: Any, *args: Any, **kwargs: Any) -> Any:
+    """Cached :func:`sympy.ratsimp`."""
+    return derivations.apply("ratsimp", sympy.sympify(expr), *args, **kwargs)
+
+
+def canonical(expr: Any) -> Any:
+    """Cached :func:`vberth.polysimp.canonical`."""
+    return derivations.apply("canonical", sympy.sympify(expr))
@@ -0,0 +1,243 @@
+"""
+Calibrate the tank dimensions from fill events.
+
+A calibration is a series of observations: a known number of gallons pumped into
+the tank, and the depth measured afterwards. This fits the dimensions of the irregular
+prism, ``h_f``, ``w_f``, ``h_a``, ``w_a``, and ``l_fa``, so the gallons predicted
+at each depth by :func:`vberth.sounding.partial_volume` match the observations,
+in the least-squares sense.
+
+The fit is Levenberg-Marquardt. Each iteration needs the predicted gallons and their
+derivatives with respect to the dimensions. With :math:`z = l_{fa} t`, the partial volume is
+
+..  math::
+
+    V(d) = \\frac{l_{fa}}{231} \\int_{\\text{wet}} w(t) \\frac{(h(t) - c)^2}{2 h(t)} \\, dt
+
+where :math:`c = \\max(h_f, h_a) - d` is the height of the surface above the keel at each
+section. The integrand and its derivatives are derived with ``sympy`` and compiled
+into one NumPy function with shared subexpressions; the integrand is zero where the wet
+interval starts, so the derivative of the integral is the integral of the derivative.
+All of the observations are evaluated at once, with the same Gauss-Legendre quadrature as
+:mod:`vberth.sounding`.
+
+The volume depends on the widths and the length only through their products:
+doubling both widths and halving the length changes nothing. They can't all be fit at once.
+By default ``l_fa`` -- the easiest to measure with a tape -- is held at its measured value
+and the other four are fit. The confidence intervals use the normal approximation,
+which is appropriate for the hundreds or thousands of observations a level sender provides.
+Even so, the remaining dimensions are strongly correlated -- one curve of gallons against depth
+only weakly separates a taller, narrower tank from a shorter, wider one -- so expect wide
+intervals unless the observations are precise. The report shows the largest correlation.
+
+>>> truth = dict(h_f=8.5, w_f=10.0, h_a=26.5, w_a=49.0, l_fa=46.0)
+>>> rng = np.random.default_rng(42)
+>>> depths = rng.uniform(0, 26.5, 2000)
+>>> exact = calibrate(depths, partial_volume(depths, truth)[0])
+>>> {n: round(v, 4) for n, v in exact.measured.items()}
+{'h_f': 8.5, 'w_f': 10.0, 'h_a': 26.5, 'w_a': 49.0, 'l_fa': 46.0}
+>>> gallons = partial_volume(depths, truth)[0] + rng.normal(0, 0.01, depths.size)
+>>> fit = calibrate(depths, gallons)
+>>> all(lo < truth[n] < hi for n, (lo, hi) in fit.interval().items())
+True
+>>> round(fit.rms, 2)
+0.01
+"""
+import argparse
+import csv
+from collections.abc import Callable, Mapping, Sequence
+from dataclasses import dataclass
+from functools import cache
+from statistics import NormalDist
+
+import numpy as np
+from numpy.typing import ArrayLike
+from sympy import Expr, Symbol, diff, lambdify, symbols
+
+from vberth import symbolic
+from vberth.sounding import NODES, WEIGHTS
+
+#: The dimensions of the irregular prism, in the order of the parameter vector.
+PARAMETERS = tuple(m.name for m in symbolic.MEASUREMENTS)
+
+#: The dimensions fit by default; ``l_fa`` trades off exactly against the widths.
+FREE = ("h_f", "w_f", "h_a", "w_a")
+
+t, c = symbols("t c")
+
+
+def integrand() -> Expr:
+    """The wetted area at :math:`z = l_{fa} t`, times :math:`l_{fa}`, in gallons."""
+    h = symbolic.h_f + (symbolic.h_a - symbolic.h_f) * t
+    w = symbolic.w_f + (symbolic.w_a - symbolic.w_f) * t
+    return symbolic.l_fa * w * (h - c)**2 / (2 * h) / symbolic.GALLON
+
+
+@cache
+def kernel() -> Callable[..., list[np.ndarray]]:
+    """The integrand, its derivatives with respect to each dimension, and to :math:`c`."""
+    f = integrand()
+    wrt: tuple[Symbol, ...] = (*symbolic.MEASUREMENTS, c)
+    return lambdify((t, c, *symbolic.MEASUREMENTS), [f, *(diff(f, x) for x in wrt)], modules="numpy", cse=True)
+
+
+def partial_volume(depth: ArrayLike, measured: Mapping[str, float]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gallons below each depth, and the Jacobian: their derivatives with respect to the
+    dimensions, one column for each of the :data:`PARAMETERS`.
+
+    >>> V, J = partial_volume([13.5, 27], symbolic.MEASURED)
+    >>> V.round(3)
+    array([ 7.507, 56.878])
+    >>> J.shape
+    (2, 5)
+    """
+    h_f, w_f, h_a, w_a, l_fa = (float(measured[n]) for n in PARAMETERS)
+    depth = np.asarray(depth, dtype=float)
+    H = max(h_f, h_a)
+    c_ = H - np.clip(depth, 0.0, H)
+    # c is H - d until the tank is full; then it no longer depends on the heights.
+    dc_dH = (depth < H).astype(float)
+    slope = h_a - h_f
+    if slope == 0:
+        lo = np.zeros_like(c_)
+        hi = np.where(h_f > c_, 1.0, 0.0)
+    else:
+        t_0 = np.clip((c_ - h_f) / slope, 0.0, 1.0)
+        lo, hi = (t_0, np.ones_like(c_)) if slope > 0 else (np.zeros_like(c_), t_0)
+    half = (hi - lo) / 2
+    t_ = ((hi + lo) / 2)[..., np.newaxis] + half[..., np.newaxis] * NODES
+    values = kernel()(t_, c_[..., np.newaxis], h_f, w_f, h_a, w_a, l_fa)
+    f, *partials, df_dc = (
+        np.broadcast_to(v, t_.shape) @ WEIGHTS * half for v in values
+    )
+    partials[0] = partials[0] + df_dc * dc_dH * (h_f >= h_a)
+    partials[2] = partials[2] + df_dc * dc_dH * (h_a > h_f)
+    return f, np.stack(partials, axis=-1)
+
+
+@dataclass(frozen=True)
+class Calibration:
+    """
+    The fitted dimensions, and their uncertainty.
+
+    ``covariance`` is for the ``free`` dimensions, in that order.
+    ``rms`` is the root-mean-square residual, in gallons.
+    """
+    measured: dict[str, float]
+    free: tuple[str, ...]
+    covariance: np.ndarray
+    rms: float
+    observations: int
+    iterations: int
+
+    @property
+    def standard_error(self) -> dict[str, float]:
+        return dict(zip(self.free, np.sqrt(np.diag(self.covariance)).tolist()))
+
+    @property
+    def correlation(self) -> np.ndarray:
+        se = np.sqrt(np.diag(self.covariance))
+        return self.covariance / np.outer(se, se)
+
+    def interval(self, confidence: float = 0.95) -> dict[str, tuple[float, float]]:
+        """Confidence intervals for the free dimensions."""
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return {
+            n: (self.measured[n] - z * se, self.measured[n] + z * se)
+            for n, se in self.standard_error.items()
+        }
+
+    def report(self, confidence: float = 0.95) -> str:
+        intervals = self.interval(confidence)
+        lines = [
+            f"{self.observations} observations, {self.iterations} iterations, "
+            f"RMS residual {self.rms:.4f} gallons"
+        ]
+        for name, value in self.measured.items():
+            if name in intervals:
+                lo, hi = intervals[name]
+                lines.append(f"  {name:5s} {value:9.4f}  {confidence:.0%} interval [{lo:.4f}, {hi:.4f}]")
+            else:
+                lines.append(f"  {name:5s} {value:9.4f}  (fixed)")
+        if len(self.free) > 1:
+            off = np.abs(self.correlation - np.eye(len(self.free)))
+            i, j = np.unravel_index(np.argmax(off), off.shape)
+            lines.append(f"largest correlation {self.correlation[i, j]:+.3f}, {self.free[i]} and {self.free[j]}")
+        return "\n".join(lines)
+
+
+def calibrate(
+    depths: ArrayLike,
+    gallons: ArrayLike,
+    start: Mapping[str, float] = symbolic.MEASURED,
+    free: Sequence[str] = FREE,
+    tolerance: float = 1e-10,
+    max_iterations: int = 100,
+) -> Calibration:
+    """
+    Fit the ``free`` dimensions to observations of gallons at measured depths,
+    starting from the ``start`` dimensions, usually the notebooks' ``measured`` dictionary.
+    """
+    depths = np.asarray(depths, dtype=float)
+    gallons = np.asarray(gallons, dtype=float)
+    index = [PARAMETERS.index(n) for n in free]
+    theta = np.array([float(start[n]) for n in PARAMETERS])
+
+    def evaluate(theta: np.ndarray) -> tuple[np.ndarray, np.ndarray, float]:
+        V, J = partial_volume(depths, dict(zip(PARAMETERS, theta)))
+        r = V - gallons
+        return r, J[:, index], float(r @ r)
+
+    r, J, sse = evaluate(theta)
+    damping = 1e-3
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        A = J.T @ J
+        g = J.T @ r
+        step = np.linalg.solve(A + damping * np.diag(np.diag(A)), -g)
+        candidate = theta.copy()
+        candidate[index] += step
+        if np.all(candidate > 0):
+            r_c, J_c, sse_c = evaluate(candidate)
+        else:
+            sse_c = np.inf
+        if sse_c < sse:
+            improvement = (sse - sse_c) / max(sse, np.finfo(float).tiny)
+            theta, r, J, sse = candidate, r_c, J_c, sse_c
+            damping = max(damping / 10, 1e-12)
+            if improvement < tolerance or np.max(np.abs(step) / theta[index]) < tolerance:
+                break
+        else:
+            damping *= 10
+            if damping > 1e12:
+                break
+    dof = max(depths.size - len(index), 1)
+    covariance = sse / dof * np.linalg.pinv(J.T @ J)
+    return Calibration(
+        measured=dict(zip(PARAMETERS, theta.tolist())),
+        free=tuple(free),
+        covariance=covariance,
+        rms=float(np.sqrt(sse / depths.size)),
+        observations=depths.size,
+        iterations=iteration,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Fit the tank dimensions to observed depths and gallons")
+    parser.add_argument("observations", type=argparse.FileType("r"), help="CSV with depth and gallons columns")
+    for name, value in symbolic.MEASURED.items():
+        parser.add_argument(f"--{name}", type=float, default=float(value), help="starting value")
+    parser.add_argument("--free", nargs="+", choices=PARAMETERS, default=FREE, help="dimensions to fit")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    options = parser.parse_args(argv)
+    rows = list(csv.DictReader(options.observations))
+    depths = np.array([float(row["depth"]) for row in rows])
+    gallons = np.array([float(row["gallons"]) for row in rows])
+    start = {name: getattr(options, name) for name in PARAMETERS}
+    print(calibrate(depths, gallons, start, options.free).report(options.confidence))
+
+
+if __name__ == "__main__":
+    main()
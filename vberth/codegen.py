@@ -0,0 +1,191 @@
+"""
+Generate :mod:`vberth.formulas`, a plain Python module of the closed forms.
+
+Importing ``sympy`` takes most of a second and a lot of memory. That's fine in a notebook,
+but too much for short-lived processes, or a small computer on the boat,
+where all we need are the final formulas.
+
+This writes each of the derived closed forms as an ordinary Python function.
+Common subexpressions are assigned to local variables. Square roots, minimums,
+and maximums go through small helpers that use :mod:`math` for numbers and
+switch to NumPy -- imported only then -- for arrays.
+The generated module needs nothing but the standard library.
+
+Regenerate the module after changing a derivation, and confirm it matches::
+
+    python -m vberth.codegen
+    python -m vberth.codegen --check
+"""
+import argparse
+import importlib
+import random
+import sys
+from collections.abc import Callable
+from pathlib import Path
+from typing import NamedTuple
+
+from sympy import Expr, Rational, Symbol, cse
+from sympy.printing.pycode import PythonCodePrinter
+
+from vberth import symbolic
+
+TARGET = Path(__file__).parent / "formulas.py"
+
+
+class Formula(NamedTuple):
+    name: str
+    doc: str
+    expression: Callable[[], Expr]
+    args: tuple[Symbol, ...] = symbolic.MEASUREMENTS
+
+
+FORMULAS = [
+    Formula(
+        "midpoint_prism",
+        "Regular prism from the midpoint height and width, ``V_m`` from ``prism.ipynb``.",
+        symbolic.midpoint_prism,
+    ),
+    Formula(
+        "irregular_prism",
+        "Tapered prism, ``V_c`` from ``prism-irregular.ipynb``, without the ``evalf(3)`` rounding.",
+        symbolic.irregular_prism,
+    ),
+    Formula(
+        "matrix_prism",
+        "Tapered prism from the outer product of heights and widths, ``V_m`` from ``prism-irregular.ipynb``.",
+        symbolic.matrix_prism,
+    ),
+    Formula(
+        "regular_tetrahedron",
+        "Regular tetrahedron with the mean of the six edges, ``V_r`` from ``tetrahedron.ipynb``.",
+        lambda: symbolic.regular_tetrahedron(symbolic.tetrahedron_edges()),
+    ),
+    Formula(
+        "tetrahedron_least",
+        "Regular tetrahedron with the least edge, ``V_l`` from ``tetrahedron.ipynb``.",
+        lambda: symbolic.bracket_tetrahedron(symbolic.tetrahedron_edges())[0],
+    ),
+    Formula(
+        "tetrahedron_greatest",
+        "Regular tetrahedron with the greatest edge, ``V_g`` from ``tetrahedron.ipynb``.",
+        lambda: symbolic.bracket_tetrahedron(symbolic.tetrahedron_edges())[1],
+    ),
+    Formula(
+        "tetrahedron_edges",
+        "Regular tetrahedron with the mean of six given edges, :math:`a_1, \\\\ldots, a_6`.",
+        symbolic.regular_tetrahedron,
+        symbolic.EDGES,
+    ),
+]
+
+
+class RuntimePrinter(PythonCodePrinter):
+    """Print the helpers of the generated module in place of ``math`` functions."""
+    def _print_Pow(self, expr: Expr, rational: bool = False) -> str:
+        return self._hprint_Pow(expr, rational=rational, sqrt="_sqrt")
+
+    def _print_Min(self, expr: Expr) -> str:
+        return f"_minimum({', '.join(self._print(a) for a in expr.args)})"
+
+    def _print_Max(self, expr: Expr) -> str:
+        return f"_maximum({', '.join(self._print(a) for a in expr.args)})"
+
+
+HEADER = '''"""
+Closed-form volumes, in gallons, from the derivations in :mod:`vberth.symbolic`.
+
+Generated by ``python -m vberth.codegen``. Don't edit this file.
+
+Each function accepts numbers, or NumPy arrays, of the measurements, in inches.
+This module imports nothing but :mod:`math`; NumPy is imported only when
+a square root, minimum, or maximum of an array is needed.
+"""
+import math
+
+#: Cubic inches per US gallon.
+GALLON = {gallon}
+
+
+def _sqrt(x):
+    try:
+        return math.sqrt(x)
+    except TypeError:
+        import numpy
+        return numpy.sqrt(x)
+
+
+def _minimum(*args):
+    try:
+        return min(args)
+    except (TypeError, ValueError):
+        import numpy
+        return numpy.minimum.reduce(numpy.broadcast_arrays(*args))
+
+
+def _maximum(*args):
+    try:
+        return max(args)
+    except (TypeError, ValueError):
+        import numpy
+        return numpy.maximum.reduce(numpy.broadcast_arrays(*args))
+'''
+
+
+def function(formula: Formula, printer: PythonCodePrinter) -> str:
+    temporaries, (result,) = cse(formula.expression())
+    args = ", ".join(a.name for a in formula.args)
+    lines = [f"def {formula.name}({args}):", f'    """{formula.doc}"""']
+    lines.extend(f"    {name} = {printer.doprint(value)}" for name, value in temporaries)
+    lines.append(f"    return {printer.doprint(result)}")
+    return "\n".join(lines)
+
+
+def generate() -> str:
+    printer = RuntimePrinter({"fully_qualified_modules": False})
+    parts = [HEADER.format(gallon=symbolic.GALLON).rstrip()]
+    parts.extend(function(f, printer) for f in FORMULAS)
+    return "\n\n\n".join(parts) + "\n"
+
+
+def verify(samples: int = 20, seed: int = 42) -> float:
+    """
+    The largest relative difference between the generated functions and ``subs()``
+    into the symbolic source, at the notebook's measurements and random ones near them.
+    """
+    from vberth import formulas
+    importlib.reload(formulas)
+    rng = random.Random(seed)
+    base = dict(symbolic.MEASURED)
+    edges = dict(zip((e.name for e in symbolic.EDGES), symbolic.tetrahedron_edges()))
+    worst = 0.0
+    for i in range(samples):
+        measured = base if i == 0 else {
+            k: Rational(round(float(v) * 16 * rng.uniform(0.8, 1.2)), 16) for k, v in base.items()
+        }
+        values = measured | {k: e.subs(measured) for k, e in edges.items()}
+        for formula in FORMULAS:
+            expected = float(formula.expression().subs(values).evalf(30))
+            actual = getattr(formulas, formula.name)(*(float(values[a.name]) for a in formula.args))
+            worst = max(worst, abs(actual - expected) / abs(expected))
+    return worst
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate vberth/formulas.py")
+    parser.add_argument("--check", action="store_true", help="confirm the module is current and correct")
+    options = parser.parse_args(argv)
+    text = generate()
+    if options.check:
+        if TARGET.read_text() != text:
+            sys.exit(f"{TARGET} is out of date; run python -m vberth.codegen")
+        worst = verify()
+        print(f"{TARGET.name} is current; largest relative difference from sympy {worst:.2e}")
+        if worst > 1e-12:
+            sys.exit("generated formulas don't match the symbolic source")
+    else:
+        TARGET.write_text(text)
+        print(f"wrote {TARGET}")
+
+
+if __name__ == "__main__":
+    main()
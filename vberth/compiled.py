@@ -0,0 +1,125 @@
+"""
+Compiled numeric forms of the symbolic models.
+
+Substituting measurements into a ``sympy`` expression with ``subs()`` or ``evalf()``
+takes milliseconds. That's fine for one set of measurements in a notebook,
+but it's painfully slow for thousands of candidate measurement sets.
+
+Each model is compiled -- once -- from the expression in :mod:`vberth.symbolic`
+into a NumPy function. The function accepts arrays of measurements and returns
+an array of gallons.
+
+>>> import numpy as np
+>>> round(float(irregular_prism(h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46)), 3)
+56.878
+>>> irregular_prism(
+...     h_f=np.array([8, 8]), w_f=10.5, h_a=np.array([27, 30]), w_a=48, l_fa=46
+... ).round(3)
+array([56.878, 62.18 ])
+
+The :data:`MODELS` mapping names every model and the measurements it needs.
+
+>>> m = {k: float(v) for k, v in symbolic.MEASURED.items()}
+>>> {name: round(float(evaluate(name, **m)), 1) for name in MODELS if name != "tetrahedron_edges"}
+{'midpoint_prism': 51.0, 'regular_tetrahedron': 50.4, 'tetrahedron_least': 24.1, 'tetrahedron_greatest': 77.4, 'irregular_prism': 56.9}
+"""
+from collections.abc import Callable
+from functools import cache
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+from sympy import Expr, Symbol, lambdify
+
+from vberth import symbolic
+
+Kernel = Callable[..., np.ndarray]
+
+
+class Model(NamedTuple):
+    """A symbolic model and the symbols it's a function of."""
+    expression: Callable[[], Expr]
+    args: tuple[Symbol, ...]
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        return tuple(a.name for a in self.args)
+
+
+def _tetrahedron_from_measurements() -> Expr:
+    return symbolic.regular_tetrahedron(symbolic.tetrahedron_edges())
+
+
+def _least_tetrahedron() -> Expr:
+    return symbolic.bracket_tetrahedron(symbolic.tetrahedron_edges())[0]
+
+
+def _greatest_tetrahedron() -> Expr:
+    return symbolic.bracket_tetrahedron(symbolic.tetrahedron_edges())[1]
+
+
+#: The models, by name.
+MODELS: dict[str, Model] = {
+    "midpoint_prism": Model(symbolic.midpoint_prism, symbolic.MEASUREMENTS),
+    "regular_tetrahedron": Model(_tetrahedron_from_measurements, symbolic.MEASUREMENTS),
+    "tetrahedron_edges": Model(symbolic.regular_tetrahedron, symbolic.EDGES),
+    "tetrahedron_least": Model(_least_tetrahedron, symbolic.MEASUREMENTS),
+    "tetrahedron_greatest": Model(_greatest_tetrahedron, symbolic.MEASUREMENTS),
+    "irregular_prism": Model(symbolic.irregular_prism, symbolic.MEASUREMENTS),
+}
+
+
+def compile_model(expr: Expr, args: tuple[Symbol, ...] = symbolic.MEASUREMENTS) -> Kernel:
+    """
+    Compile an expression into a NumPy function of the given arguments.
+
+    Common subexpressions are computed once.
+    """
+    return lambdify(args, expr, modules="numpy", cse=True)
+
+
+@cache
+def kernel(name: str) -> Kernel:
+    """The compiled form of one of the :data:`MODELS`."""
+    model = MODELS[name]
+    return compile_model(model.expression(), model.args)
+
+
+def evaluate(name: str, **measurements: ArrayLike) -> np.ndarray:
+    """
+    Gallons from one of the :data:`MODELS` for arrays of measurements.
+
+    The arrays are broadcast against each other, so a scalar
+    can be mixed with an array of candidate values.
+    Measurements the model doesn't use are ignored.
+    """
+    arrays = np.broadcast_arrays(
+        *(np.asarray(measurements[n], dtype=float) for n in MODELS[name].names)
+    )
+    return np.asarray(kernel(name)(*arrays))
+
+
+def irregular_prism_kernel() -> Kernel:
+    """The compiled form of :func:`vberth.symbolic.irregular_prism`."""
+    return kernel("irregular_prism")
+
+
+def irregular_prism(
+    h_f: ArrayLike, w_f: ArrayLike, h_a: ArrayLike, w_a: ArrayLike, l_fa: ArrayLike
+) -> np.ndarray:
+    """Gallons in the tapered prism for arrays of measurements."""
+    return evaluate("irregular_prism", h_f=h_f, w_f=w_f, h_a=h_a, w_a=w_a, l_fa=l_fa)
+
+
+def midpoint_prism(
+    h_f: ArrayLike, w_f: ArrayLike, h_a: ArrayLike, w_a: ArrayLike, l_fa: ArrayLike
+) -> np.ndarray:
+    """Gallons in the midpoint prism for arrays of measurements."""
+    return evaluate("midpoint_prism", h_f=h_f, w_f=w_f, h_a=h_a, w_a=w_a, l_fa=l_fa)
+
+
+def regular_tetrahedron(
+    h_f: ArrayLike, w_f: ArrayLike, h_a: ArrayLike, w_a: ArrayLike, l_fa: ArrayLike
+) -> np.ndarray:
+    """Gallons in the mean-edge regular tetrahedron for arrays of measurements."""
+    return evaluate("regular_tetrahedron", h_f=h_f, w_f=w_f, h_a=h_a, w_a=w_a, l_fa=l_fa)
@@ -0,0 +1,106 @@
+"""
+The matrix form of the volume, as a batched tensor contraction.
+
+``prism-irregular.ipynb`` ends with the volume from the outer product of the heights and widths,
+
+..  math::
+
+    V = \\frac{l_{fa}}{2 \\cdot 231} \\operatorname{vec}(M_h M_w^T) \\cdot
+        \\left[\\tfrac{1}{3}, \\tfrac{1}{6}, \\tfrac{1}{6}, \\tfrac{1}{3}\\right]
+
+That's a bilinear form, :math:`V = h^T W w`, with a constant weight matrix.
+For a loft with :math:`n` stations, from :mod:`vberth.loft`, the weight matrix depends only
+on the station positions. Each segment of length :math:`l_k` contributes
+:math:`\\frac{l_k}{12 \\cdot 231}\\left[\\begin{smallmatrix}2 & 1\\\\ 1 & 2\\end{smallmatrix}\\right]`
+to the block for stations :math:`k` and :math:`k+1`, so :math:`W` is tridiagonal:
+
+..  math::
+
+    W_{ii} = \\frac{2 (l_{i-1} + l_i)}{12 \\cdot 231}, \\qquad
+    W_{i,i+1} = W_{i+1,i} = \\frac{l_i}{12 \\cdot 231}
+
+with :math:`l_{-1} = l_{n-1} = 0`.
+A fleet of tanks is an array of heights and an array of widths, shape ``(..., n)``;
+the volumes are one contraction, :func:`contract`, with :func:`numpy.einsum`.
+When the stations are at the same positions for the whole fleet, one weight matrix
+serves them all. :func:`volume` uses the two bands instead of the full matrix,
+so the work is linear in the number of stations.
+
+>>> round(float(two_station(h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46)), 3)
+56.878
+>>> weights([0, 46]) * 12 * GALLON
+array([[92., 46.],
+       [46., 92.]])
+>>> h = np.array([[8, 17.5, 27], [8, 17.5, 27]])
+>>> w = np.array([[10.5, 29.25, 48], [21, 58.5, 96]])
+>>> contract(h, w, weights([0, 23, 46])).round(3)
+array([ 56.878, 113.755])
+>>> volume(h, w, [0, 23, 46]).round(3)
+array([ 56.878, 113.755])
+"""
+import numpy as np
+from numpy.typing import ArrayLike
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+#: The notebook's weights for :math:`\\operatorname{vec}(M_h M_w^T)`, as a matrix.
+TWO_STATION = np.array([[1/3, 1/6], [1/6, 1/3]])
+
+
+def two_station(h_f: ArrayLike, w_f: ArrayLike, h_a: ArrayLike, w_a: ArrayLike, l_fa: ArrayLike) -> np.ndarray:
+    """
+    The notebook's matrix form, ``V_m``, for arrays of measurement sets.
+
+    The outer product of :math:`[h_a, h_f]` and :math:`[w_a, w_f]` is contracted with
+    :data:`TWO_STATION` for every measurement set at once.
+    """
+    M_h = np.stack(np.broadcast_arrays(h_a, h_f), axis=-1).astype(float)
+    M_w = np.stack(np.broadcast_arrays(w_a, w_f), axis=-1).astype(float)
+    return np.asarray(l_fa) * np.einsum("...i,ij,...j->...", M_h, TWO_STATION, M_w) / (2 * GALLON)
+
+
+def bands(z: ArrayLike) -> tuple[np.ndarray, np.ndarray]:
+    """
+    The diagonal, shape ``(..., n)``, and the off-diagonal, shape ``(..., n-1)``,
+    of the weight matrix for stations at positions ``z``.
+    """
+    z = np.asarray(z, dtype=float)
+    l = np.diff(z, axis=-1)
+    pad = np.zeros(l.shape[:-1] + (1,))
+    diagonal = 2 * (np.concatenate([pad, l], axis=-1) + np.concatenate([l, pad], axis=-1))
+    return diagonal / (12 * GALLON), l / (12 * GALLON)
+
+
+def weights(z: ArrayLike) -> np.ndarray:
+    """The full, tridiagonal, weight matrix, shape ``(..., n, n)``, for stations at positions ``z``."""
+    diagonal, off = bands(z)
+    n = diagonal.shape[-1]
+    W = np.zeros(diagonal.shape + (n,))
+    i = np.arange(n)
+    W[..., i, i] = diagonal
+    W[..., i[:-1], i[1:]] = off
+    W[..., i[1:], i[:-1]] = off
+    return W
+
+
+def contract(h: ArrayLike, w: ArrayLike, W: ArrayLike) -> np.ndarray:
+    """Gallons, :math:`h^T W w`, for a batch of heights and widths, shape ``(..., n)``."""
+    return np.einsum("...i,...ij,...j->...", h, W, w, optimize=True)
+
+
+def volume(h: ArrayLike, w: ArrayLike, z: ArrayLike) -> np.ndarray:
+    """Gallons, :math:`h^T W w`, from the bands of :math:`W`, without forming the matrix."""
+    h = np.asarray(h, dtype=float)
+    w = np.asarray(w, dtype=float)
+    diagonal, off = bands(z)
+    return (
+        np.einsum("...i,...i,...i->...", diagonal, h, w)
+        + np.einsum("...i,...i->...", off, h[..., :-1] * w[..., 1:] + h[..., 1:] * w[..., :-1])
+    )
+
+
+def from_stations(stations: ArrayLike) -> np.ndarray:
+    """Gallons for lofts in the ``(..., n, 3)`` form of :mod:`vberth.loft`."""
+    s = np.asarray(stations, dtype=float)
+    return volume(s[..., 1], s[..., 2], s[..., 0])
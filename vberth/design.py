@@ -0,0 +1,308 @@
+"""
+Design a replacement tank, or a bladder, to fit inside the old tank.
+
+The old aluminum tank is the envelope: a loft of triangular sections, from
+:func:`vberth.loft.from_measured` or from more stations measured along the keel.
+A new tank has to fit inside it with some clearance, and -- unless it's a
+flexible bladder -- it has to go in through an access hole cut in the top.
+
+A candidate is a loft of its own, with ``segments`` tapered pieces. Its stations are at
+positions :math:`z_0 < z_1 < \\cdots < z_n` along the envelope. At each one, the section is
+the envelope's section, inset by the ``clearance`` on every side -- a similar triangle,
+scaled by :math:`1 - c/r`, where :math:`r` is the inradius -- and no wider than the ``access`` hole.
+A narrower triangle, with its apex on the keel and its top on the top of the tank,
+is still inside the V.
+
+The inset isn't concave along the keel, in general: near the bow, where the inradius
+approaches the clearance, and where the access width starts to limit it, a straight segment
+between two stations can cross it. So each segment is compared with the inset at points
+along it, and where it crosses, the stations at its ends are scaled down until it doesn't.
+:func:`feasible` checks the result at many more points, and :func:`optimize` only returns
+a design that passes.
+
+The access hole is modelled only as a limit on the width. Whether a rigid tank of that
+length, and that height, can actually be maneuvered through the hole isn't considered.
+
+The only free choices, then, are the station positions. The volume is largest
+where the stations follow the corner where the section goes from
+the full inset width to the access-hole width. The search has two steps:
+
+1.  Evaluate a large set of random station positions as one batch of lofts, with
+    :func:`vberth.loft.volume`.
+
+2.  Refine the best few with gradient ascent. The gradient with respect to every
+    station position comes from one batch of central differences.
+
+:func:`survey` optimizes every combination of the constraints, using a pool of processes,
+and :func:`pareto` keeps the designs that aren't dominated: no other design holds as much,
+or more, with fewer segments, a narrower access hole, and at least as much clearance.
+
+>>> envelope = loft.from_measured(symbolic.MEASURED)
+>>> bladder = optimize(envelope, segments=1, clearance=0.0)
+>>> round(bladder.volume, 3)
+56.878
+>>> tank = optimize(envelope, segments=3, clearance=0.5, access=24.0)
+>>> round(tank.volume, 1)
+35.0
+>>> bool(np.all(tank.stations[:, 2] <= 24.0)), feasible(envelope, tank.stations, 0.5, 24.0)
+(True, True)
+"""
+import argparse
+from collections.abc import Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from vberth import loft, symbolic
+
+#: No access-hole limit: a flexible bladder.
+BLADDER = float("inf")
+
+#: Points along each segment where it's compared with the inset, during the search.
+SAMPLES = 33
+
+#: Points along each segment of the optimized design.
+FINAL_SAMPLES = 4097
+
+
+class Design(NamedTuple):
+    """An optimized candidate tank, and the constraints it satisfies."""
+    segments: int
+    clearance: float
+    access: float
+    volume: float
+    stations: np.ndarray
+
+    def describe(self) -> str:
+        access = "bladder" if self.access == BLADDER else f"{self.access:6.2f} in"
+        z = ", ".join(f"{v:.1f}" for v in self.stations[:, 0])
+        return (
+            f"{self.volume:7.2f} gal  {self.segments} segment(s)  clearance {self.clearance:4.2f} in  "
+            f"access {access:>9s}  stations at {z}"
+        )
+
+
+def inset(envelope: ArrayLike, z: ArrayLike, clearance: float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Height and width of the envelope's section at each ``z``, inset by ``clearance``.
+
+    >>> envelope = loft.from_measured(symbolic.MEASURED)
+    >>> h, w = inset(envelope, [46.0], 1.0)
+    >>> round(float(h[0]), 3), round(float(w[0]), 3)
+    (24.495, 43.546)
+    """
+    stations = loft.as_stations(envelope)
+    z = np.asarray(z, dtype=float)
+    h = np.interp(z, stations[:, 0], stations[:, 1])
+    w = np.interp(z, stations[:, 0], stations[:, 2])
+    side = np.sqrt(h**2 + (w / 2)**2)
+    r = np.divide(h * w, w + 2 * side, out=np.zeros_like(h), where=h > 0)
+    scale = np.clip(np.divide(r - clearance, r, out=np.zeros_like(r), where=r > 0), 0.0, 1.0)
+    return h * scale, w * scale
+
+
+def candidates(
+    envelope: ArrayLike, z: ArrayLike, clearance: float, access: float = BLADDER, samples: int = SAMPLES
+) -> np.ndarray:
+    """
+    Stations, shape ``(..., n, 3)``, of the largest candidates with stations at ``z``, shape ``(..., n)``.
+
+    Each station starts as the inset section, no wider than ``access``. The inset isn't concave
+    along the keel, in general, so a straight segment between two stations can cross it.
+    Each segment's height and width are compared with the inset at ``samples`` points;
+    where they cross it, the stations at both ends are scaled down by the smallest ratio
+    of the inset to the segment, which brings the whole segment inside.
+    """
+    z = np.asarray(z, dtype=float)
+    h, w = inset(envelope, z, clearance)
+    w = np.minimum(w, access)
+    if z.shape[-1] > 1:
+        t = np.linspace(0.0, 1.0, samples)[1:-1]
+        between = z[..., :-1, np.newaxis] + (z[..., 1:, np.newaxis] - z[..., :-1, np.newaxis]) * t
+        h_limit, w_limit = inset(envelope, between, clearance)
+        for values, limit in ((h, h_limit), (w, np.minimum(w_limit, access))):
+            chord = values[..., :-1, np.newaxis] * (1 - t) + values[..., 1:, np.newaxis] * t
+            ratio = np.divide(limit, chord, out=np.ones_like(chord), where=chord > limit)
+            fit = ratio.min(axis=-1)
+            scale = np.ones_like(values)
+            scale[..., :-1] = fit
+            scale[..., 1:] = np.minimum(scale[..., 1:], fit)
+            values *= scale
+    return np.stack([z, h, w], axis=-1)
+
+
+def feasible(
+    envelope: ArrayLike, stations: ArrayLike, clearance: float, access: float = BLADDER,
+    resolution: int = 4096, tolerance: float = 1e-6,
+) -> bool:
+    """
+    Does a candidate, shape ``(n, 3)``, fit inside the envelope, with the clearance, and through the access hole?
+
+    Its height and width are compared with the inset at ``resolution`` points along it,
+    and at each of the envelope's stations. A section no taller and no wider than the inset,
+    with its top on the inset's top, is inside it.
+    """
+    stations = loft.as_stations(stations)
+    outer = loft.as_stations(envelope)[:, 0]
+    start, end = extent(envelope, clearance)
+    z0, z1 = stations[0, 0], stations[-1, 0]
+    if z0 < start - tolerance or z1 > end + tolerance:
+        return False
+    z = np.union1d(np.linspace(z0, z1, resolution), outer[(outer >= z0) & (outer <= z1)])
+    h_limit, w_limit = inset(envelope, z, clearance)
+    h = np.interp(z, stations[:, 0], stations[:, 1])
+    w = np.interp(z, stations[:, 0], stations[:, 2])
+    return bool(np.all(h <= h_limit + tolerance) and np.all(w <= np.minimum(w_limit, access) + tolerance))
+
+
+def extent(envelope: ArrayLike, clearance: float) -> tuple[float, float]:
+    """The first and last positions along the keel a candidate can reach."""
+    stations = loft.as_stations(envelope)
+    return float(stations[0, 0] + clearance), float(stations[-1, 0] - clearance)
+
+
+def refine(
+    envelope: ArrayLike, z: np.ndarray, clearance: float, access: float,
+    iterations: int = 50, delta: float = 1e-4,
+) -> np.ndarray:
+    """
+    Gradient ascent on the interior station positions of a batch of candidates, shape ``(m, n)``.
+
+    The ends stay at the limits of the envelope. Steps that lose volume, or put stations
+    out of order, are halved.
+    """
+    z = np.array(z, dtype=float)
+    m, n = z.shape
+    if n <= 2:
+        return z
+    interior = np.arange(1, n - 1)
+    step = np.full(m, (z[:, -1] - z[:, 0]).max() / n / 4)
+    volume = loft.volume(candidates(envelope, z, clearance, access))
+    for _ in range(iterations):
+        # Central differences for every interior station of every candidate, as one batch.
+        shifts = np.zeros((2 * len(interior), n))
+        shifts[np.arange(len(interior)), interior] = delta
+        shifts[len(interior) + np.arange(len(interior)), interior] = -delta
+        # A probe can only swap stations closer together than ``delta``; sorting leaves the volume unchanged.
+        probes = np.sort(z[:, np.newaxis, :] + shifts, axis=-1)
+        v = loft.volume(candidates(envelope, probes, clearance, access))
+        gradient = np.zeros_like(z)
+        gradient[:, interior] = (v[:, :len(interior)] - v[:, len(interior):]) / (2 * delta)
+        norm = np.linalg.norm(gradient, axis=1, keepdims=True)
+        direction = np.divide(gradient, norm, out=np.zeros_like(gradient), where=norm > 0)
+        trial = z + step[:, np.newaxis] * direction
+        ordered = np.all(np.diff(trial, axis=1) > 0, axis=1)
+        trial[~ordered] = z[~ordered]
+        trial_volume = loft.volume(candidates(envelope, trial, clearance, access))
+        better = ordered & (trial_volume > volume)
+        z[better] = trial[better]
+        volume[better] = trial_volume[better]
+        step = np.where(better, step * 1.5, step / 2)
+    return z
+
+
+def optimize(
+    envelope: ArrayLike, segments: int, clearance: float, access: float = BLADDER,
+    samples: int = 20_000, keep: int = 8, seed: int = 42,
+) -> Design:
+    """
+    The candidate with the most volume, given the constraints. It's checked with :func:`feasible`;
+    if none of the refined candidates fit, this raises :exc:`ValueError`.
+    """
+    start, end = extent(envelope, clearance)
+    rng = np.random.default_rng(seed)
+    interior = np.sort(rng.uniform(start, end, (samples, segments - 1)), axis=1)
+    even = np.linspace(start, end, segments + 1)[1:-1]
+    z = np.column_stack([
+        np.full(samples + 1, start), np.vstack([even, interior]), np.full(samples + 1, end)
+    ])
+    volumes = loft.volume(candidates(envelope, z, clearance, access))
+    best = np.argsort(volumes)[::-1][:keep]
+    refined = refine(envelope, z[best], clearance, access)
+    # The search compares segments with the inset at a few points; the result, at many.
+    stations = candidates(envelope, refined, clearance, access, samples=FINAL_SAMPLES)
+    fits = np.array([feasible(envelope, s, clearance, access) for s in stations])
+    if not fits.any():
+        raise ValueError(f"no design with {segments} segments fits, with clearance {clearance} and access {access}")
+    volumes = np.where(fits, loft.volume(stations), -np.inf)
+    i = int(np.argmax(volumes))
+    return Design(segments, clearance, access, float(volumes[i]), stations[i])
+
+
+def _optimize(args: tuple[np.ndarray, int, float, float, int]) -> Design:
+    envelope, segments, clearance, access, samples = args
+    return optimize(envelope, segments, clearance, access, samples)
+
+
+def survey(
+    envelope: ArrayLike,
+    segments: Iterable[int] = (1, 2, 3, 4),
+    clearances: Iterable[float] = (0.25, 0.5, 1.0),
+    accesses: Iterable[float] = (12.0, 18.0, 24.0, 36.0, BLADDER),
+    samples: int = 20_000,
+    workers: int = 0,
+) -> list[Design]:
+    """Optimize every combination of the constraints; with ``workers``, in a pool of processes."""
+    envelope = loft.as_stations(envelope)
+    work = [
+        (envelope, s, c, a, samples)
+        for s, c, a in product(segments, clearances, accesses)
+    ]
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_optimize, work))
+    return [_optimize(w) for w in work]
+
+
+def pareto(designs: Sequence[Design], tolerance: float = 0.01) -> list[Design]:
+    """
+    The designs that aren't dominated, largest volume first.
+
+    One design dominates another if it holds at least as much with no more segments,
+    no wider an access hole, and no less clearance, and is better in at least one of these.
+    Volumes within ``tolerance`` gallons are the same, so an extra segment that adds
+    nothing but rounding doesn't make the front.
+    """
+    def dominates(a: Design, b: Design) -> bool:
+        no_worse = (
+            a.volume >= b.volume - tolerance and a.segments <= b.segments
+            and a.access <= b.access and a.clearance >= b.clearance
+        )
+        better = (
+            a.volume > b.volume + tolerance or a.segments < b.segments
+            or a.access < b.access or a.clearance > b.clearance
+        )
+        return no_worse and better
+
+    front = [d for d in designs if not any(dominates(o, d) for o in designs)]
+    return sorted(front, key=lambda d: -d.volume)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Search for the largest tank that fits in the old one")
+    for name, value in symbolic.MEASURED.items():
+        parser.add_argument(f"--{name}", type=float, default=float(value))
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 2, 3, 4])
+    parser.add_argument("--clearance", type=float, nargs="+", default=[0.25, 0.5, 1.0])
+    parser.add_argument(
+        "--access", type=float, nargs="+", default=[12.0, 18.0, 24.0, 36.0, BLADDER],
+        help="access-hole widths, in inches; inf is a bladder"
+    )
+    parser.add_argument("--samples", type=int, default=20_000, help="random candidates for each combination")
+    parser.add_argument("-w", "--workers", type=int, default=0, help="processes; 0 runs in this process")
+    options = parser.parse_args(argv)
+    envelope = loft.from_measured({name: getattr(options, name) for name in symbolic.MEASURED})
+    designs = survey(
+        envelope, options.segments, options.clearance, options.access, options.samples, options.workers
+    )
+    print(f"Envelope: {float(loft.volume(envelope)):.2f} gallons")
+    print("Pareto front:")
+    for d in pareto(designs):
+        print(f"  {d.describe()}")
+
+
+if __name__ == "__main__":
+    main()
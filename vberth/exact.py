@@ -0,0 +1,170 @@
+"""
+Exact rational volumes, without ``sympy``'s ``subs()``.
+
+The notebooks report volumes like ``f"{floor(V_r)} {frac(V_r)} gallons"``, and
+use ``limit_denominator(100)``: exact mixed numbers are the preferred output.
+The prism models are polynomials with rational coefficients, so the exact value
+only needs integer arithmetic.
+
+:func:`compile_exact` turns a polynomial into a function of :class:`fractions.Fraction`
+(or :class:`int`, or decimal string) measurements. The coefficients are put over a
+common denominator, :math:`D`, and the measurements over theirs, :math:`q`.
+Each term of degree :math:`k` is scaled by :math:`q^{n-k}`, where :math:`n` is the
+degree of the polynomial, so the numerator is a sum of products of integers and the result
+is ``Fraction(numerator, D * q**n)``. The result is exactly what ``subs()`` computes.
+
+:class:`Mixed` is a :class:`fractions.Fraction` that displays as a mixed number,
+in text and in LaTeX, so it can be given to ``glue()`` directly.
+
+>>> from fractions import Fraction
+>>> V = irregular_prism(h_f=8, w_f=Fraction(21, 2), h_a=27, w_a=48, l_fa=46)
+>>> V
+Mixed(52555, 924)
+>>> print(V)
+56 811/924
+>>> V.latex()
+'56 \\\\tfrac{811}{924}'
+>>> V.latex(proper=False)
+'\\\\tfrac{52555}{924}'
+>>> print(V.limit_denominator(100))
+56 79/90
+>>> print(midpoint_prism(h_f=8, w_f="10.5", h_a=27, w_a=48, l_fa=46))
+50 85/88
+"""
+from collections.abc import Callable, Mapping
+from fractions import Fraction
+from functools import cache
+from math import floor, lcm
+from numbers import Rational
+from typing import Any
+
+from sympy import Expr, Poly, Symbol
+
+from vberth import symbolic
+
+
+class Mixed(Fraction):
+    """
+    A fraction shown as a proper, mixed number: a whole part and a fraction less than one.
+
+    The whole part and fractional part are ``floor(V)`` and ``frac(V)``,
+    as in the notebooks, so a negative value is shown as, for example, ``-3 1/4``
+    meaning :math:`-3 + \\frac{1}{4}`.
+    """
+    @property
+    def whole(self) -> int:
+        return floor(self)
+
+    @property
+    def part(self) -> Fraction:
+        return Fraction(self) - self.whole
+
+    def __repr__(self) -> str:
+        return f"Mixed({self.numerator}, {self.denominator})"
+
+    def __str__(self) -> str:
+        if self.denominator == 1 or self.whole == 0:
+            return Fraction.__str__(self)
+        return f"{self.whole} {self.part}"
+
+    def improper(self) -> str:
+        return Fraction.__str__(self)
+
+    def latex(self, proper: bool = True) -> str:
+        if self.denominator == 1:
+            return str(self.numerator)
+        if not proper or self.whole == 0:
+            sign = "-" if self < 0 else ""
+            return f"{sign}\\tfrac{{{abs(self.numerator)}}}{{{self.denominator}}}"
+        part = self.part
+        return f"{self.whole} \\tfrac{{{part.numerator}}}{{{part.denominator}}}"
+
+    def _repr_latex_(self) -> str:
+        return f"${self.latex()}$"
+
+    def limit_denominator(self, max_denominator: int = 1_000_000) -> "Mixed":
+        return Mixed(Fraction.limit_denominator(self, max_denominator))
+
+
+def exact(value: Any) -> Fraction:
+    """A measurement as a :class:`Fraction`. Floats are converted exactly, not rounded."""
+    if isinstance(value, Rational):
+        return Fraction(value.numerator, value.denominator)
+    if hasattr(value, "p") and hasattr(value, "q"):  # A sympy Rational.
+        return Fraction(int(value.p), int(value.q))
+    return Fraction(value)
+
+
+def ratio(value: Any) -> tuple[int, int]:
+    """A measurement as a ``(numerator, denominator)`` pair, quickly for ints and fractions."""
+    if type(value) is int:
+        return value, 1
+    if not isinstance(value, Fraction):
+        value = exact(value)
+    return value.numerator, value.denominator
+
+
+def compile_exact(expr: Expr, args: tuple[Symbol, ...] = symbolic.MEASUREMENTS) -> Callable[..., Mixed]:
+    """
+    A function computing a polynomial exactly, with integer arithmetic.
+
+    Raises :exc:`sympy.PolynomialError` if ``expr`` isn't a polynomial in ``args``.
+    """
+    poly = Poly(expr, *args)
+    coefficients = [(monomial, exact(c)) for monomial, c in poly.terms()]
+    D = lcm(*(c.denominator for _, c in coefficients))
+    n = poly.total_degree()
+    terms = [
+        (tuple(monomial), c.numerator * (D // c.denominator), n - sum(monomial))
+        for monomial, c in coefficients
+    ]
+    names = tuple(a.name for a in args)
+
+    def evaluate(*values: Any, **measured: Any) -> Mixed:
+        if measured:
+            values = tuple(measured[name] for name in names)
+        xs = [ratio(v) for v in values]
+        q = lcm(*(d for _, d in xs))
+        ns = [n * (q // d) for n, d in xs]
+        numerator = 0
+        for monomial, c, scale in terms:
+            term = c * q**scale
+            for x, e in zip(ns, monomial):
+                if e:
+                    term *= x**e
+            numerator += term
+        return Mixed(numerator, D * q**n)
+
+    evaluate.__doc__ = f"Exact value of {expr} for {', '.join(names)}."
+    return evaluate
+
+
+@cache
+def kernel(name: str) -> Callable[..., Mixed]:
+    """The exact form of one of the polynomial models."""
+    expression = {
+        "midpoint_prism": symbolic.midpoint_prism,
+        "irregular_prism": symbolic.irregular_prism,
+        "matrix_prism": symbolic.matrix_prism,
+    }[name]
+    return compile_exact(expression())
+
+
+def midpoint_prism(**measured: Any) -> Mixed:
+    """Exact gallons in the midpoint prism."""
+    return kernel("midpoint_prism")(**measured)
+
+
+def irregular_prism(**measured: Any) -> Mixed:
+    """Exact gallons in the tapered prism."""
+    return kernel("irregular_prism")(**measured)
+
+
+def matrix_prism(**measured: Any) -> Mixed:
+    """Exact gallons in the tapered prism, from the matrix form."""
+    return kernel("matrix_prism")(**measured)
+
+
+def from_measured(name: str, measured: Mapping[str, Any] = symbolic.MEASURED) -> Mixed:
+    """Exact gallons from a notebook-style ``measured`` dictionary."""
+    return kernel(name)(**measured)
@@ -0,0 +1,273 @@
+"""
+Execute the book's notebooks only when they've changed, and in parallel.
+
+``_config.yml`` has ``execute_notebooks: "off"``: ``jupyter-book build`` renders the outputs
+saved in each notebook. This keeps those outputs current. It's run before the build.
+
+Each notebook has a key: a hash of the source of its code cells, and of the environment
+they run in -- the Python version, the versions of the packages they use, and the source of
+:mod:`vberth`. Markdown cells aren't part of the key; changing the prose doesn't change the outputs.
+
+The outputs of each executed notebook are saved in ``.execution-cache``, by its path in the book, with its key,
+along with the values it ``glue()``-ed into the text. Then, for each notebook,
+
+-   If the key matches the saved key, and the notebook has the saved outputs,
+    it's **cached**, and there's nothing to do.
+
+-   If the key matches, but the outputs were cleared, or came from somewhere else,
+    the saved outputs are **restored** into the notebook.
+
+-   Otherwise, it's **executed**. All the notebooks that need it are executed
+    at the same time, each in a worker process with its own kernel.
+
+A rebuild after changing ``conclusion.md``, or the text of a notebook, runs no kernels at all.
+
+The notebooks are executed with ``nbclient``, which is installed with ``jupyter-book``::
+
+    python -m vberth.execute --build
+
+>>> import tempfile
+>>> document = {"cells": [
+...     {"cell_type": "markdown", "metadata": {}, "source": ["# A notebook"]},
+...     {"cell_type": "code", "metadata": {}, "source": ["1 + 1"], "outputs": [], "execution_count": None},
+... ], "metadata": {}, "nbformat": 4, "nbformat_minor": 4}
+>>> outputs = [[{"output_type": "execute_result", "execution_count": 1, "metadata": {}, "data": {"text/plain": ["2"]}}]]
+>>> with tempfile.TemporaryDirectory() as directory:
+...     notebook = Path(directory) / "example.ipynb"
+...     _ = notebook.write_text(json.dumps(document))
+...     cache = ExecutionCache(Path(directory) / "cache")
+...     cache.save(notebook, Entry(key(document), outputs, [1], 0.5, []))
+...     first = cache.status(notebook)
+...     cache.restore(notebook)
+...     second = cache.status(notebook)
+>>> first, second
+('restored', 'cached')
+
+Notebooks with the same name, in different directories, have different entries:
+
+>>> cache = ExecutionCache("cache", root=Path("book"))
+>>> [str(cache.path(Path("book") / d / "example.ipynb")) for d in ("one", "two")]
+['cache/one/example.json', 'cache/two/example.json']
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+#: The distributions whose versions are part of the environment.
+PACKAGES = ("sympy", "numpy", "matplotlib", "ipython", "ipykernel", "myst-nb")
+
+#: The top of the repository: where the notebooks, ``_toc.yml``, and ``vberth`` are.
+ROOT = Path(__file__).resolve().parent.parent
+
+#: Seconds allowed for one cell.
+TIMEOUT = 600
+
+
+def environment() -> str:
+    """A description of everything outside the notebook that its outputs depend on."""
+    versions = []
+    for name in PACKAGES:
+        try:
+            versions.append(f"{name}=={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{name} missing")
+    source = hashlib.sha256()
+    for path in sorted((ROOT / "vberth").glob("*.py")):
+        source.update(path.name.encode("utf-8"))
+        source.update(path.read_bytes())
+    return "\n".join([sys.version, *versions, f"vberth {source.hexdigest()}"])
+
+
+def code_cells(document: dict[str, Any]) -> list[dict[str, Any]]:
+    return [cell for cell in document["cells"] if cell["cell_type"] == "code"]
+
+
+def source(cell: dict[str, Any]) -> str:
+    return "".join(cell["source"]) if isinstance(cell["source"], list) else cell["source"]
+
+
+def key(document: dict[str, Any], env: str | None = None) -> str:
+    """The hash of a notebook's code cells, its kernel, and the environment."""
+    digest = hashlib.sha256()
+    digest.update((environment() if env is None else env).encode("utf-8"))
+    kernel = document.get("metadata", {}).get("kernelspec", {}).get("name", "")
+    digest.update(kernel.encode("utf-8"))
+    for cell in code_cells(document):
+        digest.update(b"\0")
+        digest.update(source(cell).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def glued(outputs: Iterable[list[dict[str, Any]]]) -> list[str]:
+    """The names of the values a notebook ``glue()``-ed, from its outputs."""
+    return [
+        output["metadata"]["scrapbook"]["name"]
+        for cell in outputs for output in cell
+        if "scrapbook" in output.get("metadata", {})
+    ]
+
+
+@dataclass
+class Entry:
+    """A notebook's saved outputs: one list of outputs, and one execution count, for each code cell."""
+    key: str
+    outputs: list[list[dict[str, Any]]]
+    execution_counts: list[int | None]
+    seconds: float
+    glue: list[str] = field(default_factory=list)
+
+
+class ExecutionCache:
+    """The saved outputs of the notebooks, one JSON file for each notebook."""
+    def __init__(self, directory: Path | str | None = None, env: str | None = None, root: Path = ROOT) -> None:
+        self.directory = Path(directory or os.environ.get("VBERTH_EXECUTION_CACHE", ".execution-cache"))
+        self.env = environment() if env is None else env
+        self.root = root.resolve()
+
+    def path(self, notebook: Path) -> Path:
+        """
+        The entry's file: the notebook's path relative to the book, so notebooks with the same name
+        in different directories have different entries. A notebook outside the book
+        is named by a hash of its absolute path.
+        """
+        notebook = notebook.resolve()
+        try:
+            relative = notebook.relative_to(self.root)
+        except ValueError:
+            digest = hashlib.sha256(str(notebook).encode("utf-8")).hexdigest()[:16]
+            relative = Path("_outside") / f"{notebook.stem}-{digest}"
+        return self.directory / relative.with_suffix(".json")
+
+    def load(self, notebook: Path) -> Entry | None:
+        try:
+            return Entry(**json.loads(self.path(notebook).read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, notebook: Path, entry: Entry) -> None:
+        """Write an entry atomically."""
+        path = self.path(notebook)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, delete=False, suffix=".tmp") as target:
+            json.dump(asdict(entry), target)
+        os.replace(target.name, path)
+
+    def status(self, notebook: Path) -> str:
+        """``"cached"``, ``"restored"`` if the saved outputs need to be put back, or ``"stale"``."""
+        document = json.loads(notebook.read_text())
+        entry = self.load(notebook)
+        if entry is None or entry.key != key(document, self.env):
+            return "stale"
+        current = [cell.get("outputs", []) for cell in code_cells(document)]
+        return "cached" if current == entry.outputs else "restored"
+
+    def restore(self, notebook: Path) -> None:
+        """Put the saved outputs into the notebook's code cells, leaving the rest of it as it is."""
+        document = json.loads(notebook.read_text())
+        entry = self.load(notebook)
+        for cell, outputs, count in zip(code_cells(document), entry.outputs, entry.execution_counts):
+            cell["outputs"] = outputs
+            cell["execution_count"] = count
+        write(notebook, document)
+
+
+def write(notebook: Path, document: dict[str, Any]) -> None:
+    """Save a notebook the way Jupyter does: one-space indents, and a final newline."""
+    notebook.write_text(json.dumps(document, indent=1, ensure_ascii=False) + "\n")
+
+
+def execute(notebook: Path) -> tuple[dict[str, Any], float]:
+    """
+    Run a notebook in a new kernel, from its own directory, and return it with its outputs.
+    This is what each worker process does.
+    """
+    import nbformat
+    from nbclient import NotebookClient
+
+    start = time.perf_counter()
+    document = nbformat.read(notebook, as_version=4)
+    client = NotebookClient(
+        document, timeout=TIMEOUT, resources={"metadata": {"path": str(notebook.parent)}}
+    )
+    client.execute()
+    return json.loads(nbformat.writes(document)), time.perf_counter() - start
+
+
+def notebooks(toc: Path = ROOT / "_toc.yml") -> list[Path]:
+    """The notebooks in the book's table of contents, in order."""
+    names = re.findall(r"file:\s*(\S+\.ipynb)", toc.read_text())
+    return [toc.parent / name for name in names]
+
+
+def run(
+    paths: list[Path], cache: ExecutionCache, workers: int | None = None, force: bool = False
+) -> dict[Path, str]:
+    """Bring each notebook's outputs up to date, print its status, and return the statuses."""
+    statuses = {path: "stale" if force else cache.status(path) for path in paths}
+    for path, status in statuses.items():
+        if status == "restored":
+            cache.restore(path)
+        if status != "stale":
+            entry = cache.load(path)
+            print(f"{path.name:24s} {status:9s} {entry.key[:12]}  {len(entry.glue):3d} glued")
+    stale = [path for path, status in statuses.items() if status == "stale"]
+    if not stale:
+        return statuses
+    with ProcessPoolExecutor(max_workers=workers or min(len(stale), os.cpu_count() or 1)) as pool:
+        futures = {pool.submit(execute, path): path for path in stale}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                document, seconds = future.result()
+            except Exception as error:
+                statuses[path] = "failed"
+                print(f"{path.name:24s} {'failed':9s} {type(error).__name__}: {error}")
+                continue
+            # The key is for the source that ran. If the notebook was edited while it ran,
+            # its outputs are left alone, and it's executed again next time.
+            outputs = [cell.get("outputs", []) for cell in code_cells(document)]
+            entry = Entry(
+                key(document, cache.env),
+                outputs,
+                [cell.get("execution_count") for cell in code_cells(document)],
+                seconds,
+                glued(outputs),
+            )
+            cache.save(path, entry)
+            if cache.status(path) != "stale":
+                cache.restore(path)
+            statuses[path] = "executed"
+            print(f"{path.name:24s} {'executed':9s} {entry.key[:12]}  {len(entry.glue):3d} glued  {seconds:6.1f} s")
+    return statuses
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Execute the book's notebooks that have changed")
+    parser.add_argument("notebooks", nargs="*", type=Path, help="default: the notebooks in _toc.yml")
+    parser.add_argument("--workers", type=int, help="worker processes; default, one per notebook, up to the CPUs")
+    parser.add_argument("--force", action="store_true", help="execute every notebook")
+    parser.add_argument("--build", action="store_true", help="then run jupyter-book build")
+    options = parser.parse_args(argv)
+    start = time.perf_counter()
+    statuses = run(options.notebooks or notebooks(), ExecutionCache(), options.workers, options.force)
+    print(f"{len(statuses)} notebooks in {time.perf_counter() - start:.1f} s")
+    if "failed" in statuses.values():
+        sys.exit(1)
+    if options.build:
+        subprocess.run(["jupyter-book", "build", str(ROOT)], check=True)
+
+
+if __name__ == "__main__":
+    main()
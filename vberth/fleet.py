@@ -0,0 +1,359 @@
+"""
+A columnar store of tank measurements for a fleet of boats, with every model's volume.
+
+A store is a directory. Each column is a NumPy ``.npy`` file, opened memory-mapped,
+so reading a column of a million rows doesn't create a million Python objects,
+or even read the parts of the file that aren't used. ``catalog.json`` has the number of rows,
+and the names of the boats and the tanks; the ``boat`` and ``tank`` columns are indexes into them.
+
+The columns are:
+
+-   ``boat`` and ``tank``, the identifiers.
+
+-   The five measurements, with the same names as the notebooks' ``measured``:
+    ``h_f``, ``w_f``, ``h_a``, ``w_a``, and ``l_fa``.
+
+-   The six tetrahedron edges, ``a_1`` to ``a_6``, when they were measured, or NaN.
+
+-   A column for each of the :data:`MODELS`, in gallons. ``tetrahedron_edges`` is
+    the regular tetrahedron from the measured edges, and NaN without them.
+
+-   ``dirty``: rows that were added or changed, and whose volumes are out of date.
+
+:meth:`Fleet.evaluate` computes the volumes of the dirty rows, and only those,
+with :mod:`vberth.formulas`, a chunk at a time. :meth:`Fleet.update` marks a row dirty
+only if a value actually changed. :meth:`Fleet.totals` adds up each model's volumes
+by boat with :func:`numpy.bincount`, also a chunk at a time, so memory use is the same
+for any number of rows. A store opened read-only can't evaluate; its totals leave out
+the dirty rows, and report how many there are.
+
+The files are preallocated, and grow by doubling, so appending a few rows at a time is cheap.
+Changes are visible to other processes as soon as they're made; :meth:`Fleet.flush`
+waits until they're on the disk.
+
+>>> import tempfile
+>>> with tempfile.TemporaryDirectory() as directory:
+...     fleet = Fleet.create(Path(directory) / "fleet")
+...     rows = fleet.append(
+...         boat=["Leeward", "Leeward", "Windward"], tank=["V-berth", "Aft", "V-berth"],
+...         h_f=[8, 6, 8], w_f=[10.5, 12, 10.5], h_a=[27, 20, 27], w_a=[48, 30, 48], l_fa=[46, 30, 46],
+...     )
+...     first = fleet.evaluate()
+...     totals = fleet.totals()
+...     same = fleet.update([2], h_f=[8])
+...     different = fleet.update([2], h_f=[9])
+...     repeated = fleet.update([0, 0], h_f=[7, 7.5])
+...     reader = Fleet(fleet.path, "r")
+...     unevaluated = reader.totals()
+...     second = fleet.evaluate()
+...     changed = fleet.totals()
+>>> rows, first, same, different, repeated, second
+(range(0, 3), 3, 0, 1, 1, 2)
+>>> totals.boats
+['Leeward', 'Windward']
+>>> totals.volumes["irregular_prism"].round(2).tolist(), round(totals.fleet("irregular_prism"), 2)
+([75.97, 56.88], 132.85)
+>>> unevaluated.stale.tolist(), unevaluated.counts["irregular_prism"].tolist()
+([1, 1], [1, 0])
+>>> changed.volumes["irregular_prism"].round(2).tolist(), changed.stale.tolist()
+([75.4, 58.02], [0, 0])
+"""
+import argparse
+import json
+import math
+import os
+import tempfile
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from vberth import formulas
+
+MEASUREMENTS = ("h_f", "w_f", "h_a", "w_a", "l_fa")
+
+EDGES = ("a_1", "a_2", "a_3", "a_4", "a_5", "a_6")
+
+#: The volume columns.
+MODELS = (
+    "midpoint_prism",
+    "regular_tetrahedron",
+    "tetrahedron_least",
+    "tetrahedron_greatest",
+    "tetrahedron_bracket",
+    "tetrahedron_edges",
+    "irregular_prism",
+)
+
+#: Every column, and its type.
+COLUMNS: dict[str, np.dtype] = {
+    "boat": np.dtype("<i4"),
+    "tank": np.dtype("<i4"),
+    **{name: np.dtype("<f8") for name in (*MEASUREMENTS, *EDGES, *MODELS)},
+    "dirty": np.dtype("?"),
+}
+
+#: Rows read or evaluated at a time.
+CHUNK = 262_144
+
+#: Rows allocated in a new store.
+CAPACITY = 1024
+
+
+def volumes(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """Every model's volume for arrays of the measurements, and the edges."""
+    m = {name: columns[name] for name in MEASUREMENTS}
+    result = {
+        "midpoint_prism": formulas.midpoint_prism(**m),
+        "regular_tetrahedron": formulas.regular_tetrahedron(**m),
+        "tetrahedron_least": formulas.tetrahedron_least(**m),
+        "tetrahedron_greatest": formulas.tetrahedron_greatest(**m),
+        "tetrahedron_edges": formulas.tetrahedron_edges(*(columns[name] for name in EDGES)),
+        "irregular_prism": formulas.irregular_prism(**m),
+    }
+    result["tetrahedron_bracket"] = (result["tetrahedron_least"] + result["tetrahedron_greatest"]) / 2
+    return result
+
+
+class Totals(NamedTuple):
+    """
+    The number of tanks on each boat, each model's total gallons for each boat,
+    the number of tanks that have a volume from that model,
+    and the number of tanks left out because their volumes are out of date.
+    """
+    boats: list[str]
+    tanks: np.ndarray
+    volumes: dict[str, np.ndarray]
+    counts: dict[str, np.ndarray]
+    stale: np.ndarray
+
+    def fleet(self, model: str) -> float:
+        return float(self.volumes[model].sum())
+
+
+class Fleet:
+    """A store, open for reading and writing."""
+    def __init__(self, path: Path | str, mode: str = "r+") -> None:
+        self.path = Path(path)
+        self.mode = mode
+        catalog = json.loads((self.path / "catalog.json").read_text())
+        self.rows: int = catalog["rows"]
+        self.boats: list[str] = catalog["boats"]
+        self.tanks: list[str] = catalog["tanks"]
+        self._codes = {"boat": {n: i for i, n in enumerate(self.boats)}, "tank": {n: i for i, n in enumerate(self.tanks)}}
+        self.columns = {name: np.load(self.path / f"{name}.npy", mmap_mode=mode) for name in COLUMNS}
+
+    @classmethod
+    def create(cls, path: Path | str, capacity: int = CAPACITY) -> "Fleet":
+        path = Path(path)
+        path.mkdir(parents=True)
+        for name, dtype in COLUMNS.items():
+            column = np.lib.format.open_memmap(path / f"{name}.npy", mode="w+", dtype=dtype, shape=(capacity,))
+            del column
+        _write_catalog(path, {"rows": 0, "boats": [], "tanks": []})
+        return cls(path)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.columns["dirty"])
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        """The rows of a column, memory-mapped."""
+        return self.columns[name][:self.rows]
+
+    def chunks(self, size: int = CHUNK) -> Iterator[slice]:
+        for start in range(0, self.rows, size):
+            yield slice(start, min(start + size, self.rows))
+
+    def _code(self, kind: str, names: ArrayLike) -> np.ndarray:
+        """Indexes for boat or tank names, adding new names to the catalog."""
+        unique, inverse = np.unique(np.asarray(names, dtype=str), return_inverse=True)
+        codes = self._codes[kind]
+        table = self.boats if kind == "boat" else self.tanks
+        for name in unique.tolist():
+            if name not in codes:
+                codes[name] = len(table)
+                table.append(name)
+        return np.array([codes[n] for n in unique.tolist()], dtype=np.int32)[inverse.ravel()]
+
+    def _grow(self, rows: int) -> None:
+        """Make room for at least ``rows`` rows, doubling the capacity."""
+        capacity = max(self.capacity * 2, rows)
+        for name, old in self.columns.items():
+            target = self.path / f"{name}.npy.new"
+            new = np.lib.format.open_memmap(target, mode="w+", dtype=old.dtype, shape=(capacity,))
+            for s in self.chunks():
+                new[s] = old[s]
+            new.flush()
+            del new
+            os.replace(target, self.path / f"{name}.npy")
+        self.columns = {name: np.load(self.path / f"{name}.npy", mmap_mode=self.mode) for name in COLUMNS}
+
+    def append(self, boat: ArrayLike, tank: ArrayLike, **values: ArrayLike) -> range:
+        """
+        Add measurement sets: arrays of boat and tank names, the five measurements,
+        and, optionally, the six edges. The new rows are dirty. Returns their indexes.
+        """
+        missing = [name for name in MEASUREMENTS if name not in values]
+        if missing:
+            raise ValueError(f"missing measurements: {missing}")
+        unknown = set(values) - set(MEASUREMENTS) - set(EDGES)
+        if unknown:
+            raise ValueError(f"unknown columns: {sorted(unknown)}")
+        boat = self._code("boat", boat)
+        n = len(boat)
+        if self.rows + n > self.capacity:
+            self._grow(self.rows + n)
+        rows = slice(self.rows, self.rows + n)
+        self.columns["boat"][rows] = boat
+        self.columns["tank"][rows] = np.broadcast_to(self._code("tank", tank), n)
+        for name in (*MEASUREMENTS, *EDGES):
+            self.columns[name][rows] = np.broadcast_to(np.asarray(values.get(name, math.nan), dtype=float), n)
+        self.columns["dirty"][rows] = True
+        self.rows += n
+        _write_catalog(self.path, {"rows": self.rows, "boats": self.boats, "tanks": self.tanks})
+        return range(rows.start, rows.stop)
+
+    def update(self, rows: ArrayLike, **values: ArrayLike) -> int:
+        """
+        Change measurements or edges of existing rows. Rows with a changed value become dirty; returns how many.
+        A row given more than once is counted once.
+
+        Every name and value is checked before anything is written; if one is wrong, nothing changes.
+
+        >>> import tempfile
+        >>> with tempfile.TemporaryDirectory() as directory:
+        ...     fleet = Fleet.create(Path(directory) / "fleet")
+        ...     _ = fleet.append(boat=["Leeward"], tank=["V-berth"], h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46)
+        ...     _ = fleet.evaluate()
+        ...     try:
+        ...         fleet.update([0], h_f=[20], bogus=[1])
+        ...     except ValueError as ex:
+        ...         print(ex)
+        ...     try:
+        ...         fleet.update([0], w_f=[20], h_a=[1, 2])
+        ...     except ValueError as ex:
+        ...         print(type(ex).__name__)
+        ...     unchanged = fleet.column("h_f").tolist(), fleet.column("w_f").tolist(), fleet.column("dirty").tolist()
+        not a measurement or edge: bogus
+        ValueError
+        >>> unchanged
+        ([8.0], [10.5], [False])
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size and (rows.min() < 0 or rows.max() >= self.rows):
+            raise IndexError("row out of range")
+        unknown = [name for name in values if name not in MEASUREMENTS and name not in EDGES]
+        if unknown:
+            raise ValueError(f"not a measurement or edge: {', '.join(unknown)}")
+        new = {name: np.broadcast_to(np.asarray(value, dtype=float), rows.shape) for name, value in values.items()}
+        changed = np.zeros(len(rows), dtype=bool)
+        for name, value in new.items():
+            old = self.columns[name][rows]
+            changed |= ~((old == value) | (np.isnan(old) & np.isnan(value)))
+        # Dirty first, so an interrupted write leaves the rows to be evaluated again.
+        self.columns["dirty"][rows[changed]] = True
+        for name, value in new.items():
+            self.columns[name][rows] = value
+        return int(np.unique(rows[changed]).size)
+
+    def evaluate(self, size: int = CHUNK) -> int:
+        """Compute the volumes of the dirty rows, a chunk at a time. Returns how many."""
+        count = 0
+        dirty_column = self.columns["dirty"]
+        for s in self.chunks(size):
+            dirty = s.start + np.flatnonzero(dirty_column[s])
+            if not len(dirty):
+                continue
+            results = volumes({name: self.columns[name][dirty] for name in (*MEASUREMENTS, *EDGES)})
+            for name, values in results.items():
+                self.columns[name][dirty] = values
+            dirty_column[dirty] = False
+            count += len(dirty)
+        return count
+
+    def totals(self, models: Sequence[str] = MODELS, size: int = CHUNK) -> Totals:
+        """
+        Each model's total gallons by boat. If the store is writable, dirty rows are evaluated first.
+        If it's read-only, they're left out of the volumes and counts, and counted in ``stale``.
+        """
+        if self.mode != "r" and self.columns["dirty"][:self.rows].any():
+            self.evaluate(size)
+        boats = len(self.boats)
+        volumes = {name: np.zeros(boats) for name in models}
+        counts = {name: np.zeros(boats, dtype=np.int64) for name in models}
+        tanks = np.zeros(boats, dtype=np.int64)
+        stale = np.zeros(boats, dtype=np.int64)
+        for s in self.chunks(size):
+            boat = self.columns["boat"][s]
+            dirty = self.columns["dirty"][s]
+            tanks += np.bincount(boat, minlength=boats)
+            stale += np.bincount(boat[dirty], minlength=boats)
+            for name in models:
+                gallons = self.columns[name][s]
+                known = ~np.isnan(gallons) & ~dirty
+                volumes[name] += np.bincount(boat[known], weights=gallons[known], minlength=boats)
+                counts[name] += np.bincount(boat[known], minlength=boats)
+        return Totals(list(self.boats), tanks, volumes, counts, stale)
+
+    def flush(self) -> None:
+        """Wait for the columns and the catalog to be written to disk."""
+        if self.mode == "r":
+            return
+        for column in self.columns.values():
+            column.flush()
+        _write_catalog(self.path, {"rows": self.rows, "boats": self.boats, "tanks": self.tanks})
+
+
+def _write_catalog(path: Path, catalog: dict[str, Any]) -> None:
+    with tempfile.NamedTemporaryFile("w", dir=path, delete=False, suffix=".tmp") as target:
+        json.dump(catalog, target)
+    os.replace(target.name, path / "catalog.json")
+
+
+def import_csv(fleet: Fleet, path: Path, size: int = CHUNK) -> int:
+    """Append the rows of a CSV file with ``boat``, ``tank``, the measurements, and optionally the edges."""
+    import csv
+    from itertools import islice
+
+    from vberth.batch import column
+
+    count = 0
+    with open(path, newline="") as source:
+        reader = csv.DictReader(source)
+        while rows := list(islice(reader, size)):
+            fields = rows[0].keys()
+            fleet.append(
+                [r["boat"] for r in rows], [r["tank"] for r in rows],
+                **{name: column(r[name] or "nan" for r in rows) for name in (*MEASUREMENTS, *EDGES) if name in fields},
+            )
+            count += len(rows)
+    return count
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="A store of tank measurements for a fleet")
+    parser.add_argument("store", type=Path)
+    parser.add_argument("--import", dest="source", type=Path, help="append the rows of a CSV file")
+    parser.add_argument("--model", choices=MODELS, action="append", help="models to total; default, all")
+    options = parser.parse_args(argv)
+    fleet = Fleet(options.store) if options.store.exists() else Fleet.create(options.store)
+    if options.source:
+        print(f"{import_csv(fleet, options.source):,} rows imported")
+    print(f"{fleet.evaluate():,} rows evaluated")
+    fleet.flush()
+    models = options.model or MODELS
+    totals = fleet.totals(models)
+    print(f"{'boat':24s} {'tanks':>6s} " + " ".join(f"{m:>20s}" for m in models))
+    for i, boat in enumerate(totals.boats):
+        print(f"{boat[:24]:24s} {totals.tanks[i]:6d} " + " ".join(f"{totals.volumes[m][i]:20.2f}" for m in models))
+    print(f"{'fleet':24s} {len(fleet):6d} " + " ".join(f"{totals.fleet(m):20.2f}" for m in models))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Closed-form volumes, in gallons, from the derivations in :mod:`vberth.symbolic`.
+
+Generated by ``python -m vberth.codegen``. Don't edit this file.
+
+Each function accepts numbers, or NumPy arrays, of the measurements, in inches.
+This module imports nothing but :mod:`math`; NumPy is imported only when
+a square root, minimum, or maximum of an array is needed.
+"""
+import math
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+
+def _sqrt(x):
+    try:
+        return math.sqrt(x)
+    except TypeError:
+        import numpy
+        return numpy.sqrt(x)
+
+
+def _minimum(*args):
+    try:
+        return min(args)
+    except (TypeError, ValueError):
+        import numpy
+        return numpy.minimum.reduce(numpy.broadcast_arrays(*args))
+
+
+def _maximum(*args):
+    try:
+        return max(args)
+    except (TypeError, ValueError):
+        import numpy
+        return numpy.maximum.reduce(numpy.broadcast_arrays(*args))
+
+
+def midpoint_prism(h_f, w_f, h_a, w_a, l_fa):
+    """Regular prism from the midpoint height and width, ``V_m`` from ``prism.ipynb``."""
+    return (1/462)*l_fa*((1/2)*h_a + (1/2)*h_f)*((1/2)*w_a + (1/2)*w_f)
+
+
+def irregular_prism(h_f, w_f, h_a, w_a, l_fa):
+    """Tapered prism, ``V_c`` from ``prism-irregular.ipynb``, without the ``evalf(3)`` rounding."""
+    return (1/2772)*l_fa*(2*h_a*w_a + h_a*w_f + h_f*w_a + 2*h_f*w_f)
+
+
+def matrix_prism(h_f, w_f, h_a, w_a, l_fa):
+    """Tapered prism from the outer product of heights and widths, ``V_m`` from ``prism-irregular.ipynb``."""
+    return (1/462)*l_fa*((1/3)*h_a*w_a + (1/6)*h_a*w_f + (1/6)*h_f*w_a + (1/3)*h_f*w_f)
+
+
+def regular_tetrahedron(h_f, w_f, h_a, w_a, l_fa):
+    """Regular tetrahedron with the mean of the six edges, ``V_r`` from ``tetrahedron.ipynb``."""
+    x0 = h_a**2
+    x1 = l_fa**2
+    x2 = (1/4)*w_a**2
+    return (1/2772)*_sqrt(2)*((1/6)*w_a + (1/6)*_sqrt(x0 + x1) + (1/3)*_sqrt(x0 + x2) + (1/3)*_sqrt(x1 + x2))**3
+
+
+def tetrahedron_least(h_f, w_f, h_a, w_a, l_fa):
+    """Regular tetrahedron with the least edge, ``V_l`` from ``tetrahedron.ipynb``."""
+    x0 = h_a**2
+    x1 = l_fa**2
+    x2 = (1/4)*w_a**2
+    return (1/2772)*_sqrt(2)*_minimum(w_a, _sqrt(x0 + x1), _sqrt(x0 + x2), _sqrt(x1 + x2))**3
+
+
+def tetrahedron_greatest(h_f, w_f, h_a, w_a, l_fa):
+    """Regular tetrahedron with the greatest edge, ``V_g`` from ``tetrahedron.ipynb``."""
+    x0 = h_a**2
+    x1 = l_fa**2
+    x2 = (1/4)*w_a**2
+    return (1/2772)*_sqrt(2)*_maximum(w_a, _sqrt(x0 + x1), _sqrt(x0 + x2), _sqrt(x1 + x2))**3
+
+
+def tetrahedron_edges(a_1, a_2, a_3, a_4, a_5, a_6):
+    """Regular tetrahedron with the mean of six given edges, :math:`a_1, \\ldots, a_6`."""
+    return (1/2772)*_sqrt(2)*((1/6)*a_1 + (1/6)*a_2 + (1/6)*a_3 + (1/6)*a_4 + (1/6)*a_5 + (1/6)*a_6)**3
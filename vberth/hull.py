@@ -0,0 +1,290 @@
+"""
+The volume of the convex hull of a cloud of measured points.
+
+``tetrahedron.ipynb`` reconstructs the edges from a few hand measurements.
+A probe, or a phone scan, gives thousands of 3-D points inside the tank instead.
+The smallest convex solid containing the points, their convex hull, is an estimate of the tank.
+
+The tank is convex only when the height and width taper in proportion. Otherwise,
+the sides twist a little, and the hull bridges the hollows: the hull of the six corners
+of the notebook's tank is 58.5 gallons, where the tank is 56.9. With points sampled
+densely through the tank, the hull is between the two.
+
+:func:`convex_hull` uses ``scipy.spatial.ConvexHull``, which is Qhull, when SciPy is installed,
+and :func:`quickhull` otherwise.
+
+:func:`quickhull` is QuickHull, in NumPy. It starts from a tetrahedron of extreme points.
+Every point outside the hull is assigned to a face it's above. Each step takes a face
+with points outside, and the point farthest above it, finds the connected faces that
+point can see, and connects it to the horizon -- the edges between the faces it can see
+and the faces it can't. Only the points that were assigned to the removed faces are tested
+against the new ones, with NumPy, so points deep inside are discarded at the start,
+and each step's work depends on the faces it changes, not on the size of the hull.
+
+But there's a step for each point on the hull, in Python, about a quarter of a millisecond each.
+Points inside are cheap; points on the surface aren't. The worst case is a cloud that's all surface:
+200,000 points on a sphere are 200,000 steps, nearly a minute. A scan of the inside of the tank
+is mostly surface. For more than a few thousand points, without SciPy, use ``voxel``.
+
+The hull is a :class:`vberth.mesh.Mesh`, so it has a volume, in gallons, an area,
+and can be saved as STL.
+
+With ``voxel``, the points are first reduced to one per cube of that size: the one
+farthest from the center of the cloud. This is much faster for dense scans, and
+loses at most a sliver about a voxel thick from the hull.
+
+>>> rng = np.random.default_rng(42)
+>>> corners = np.array([[0, 0, 0], [10, 0, 0], [0, 10, 0], [0, 0, 10]])
+>>> inside = rng.dirichlet(np.ones(4), 10_000) @ corners
+>>> hull = convex_hull(np.vstack([corners, inside]))
+>>> len(hull.faces), hull.closed()
+(4, True)
+>>> round(hull.volume() * GALLON, 6)
+166.666667
+
+Points sampled through the notebook's tank:
+
+>>> corners = mesh.from_stations(loft.from_measured(symbolic.MEASURED)).vertices
+>>> round(volume(corners), 2)
+58.55
+>>> cloud = sample_tank(symbolic.MEASURED, 20_000, rng)
+>>> 56.9 < volume(cloud) < 58.55
+True
+"""
+import argparse
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from vberth import loft, mesh, symbolic
+from vberth.mesh import GALLON, Mesh
+
+
+def downsample(points: np.ndarray, voxel: float) -> np.ndarray:
+    """One point in each voxel: the one farthest from the center of the cloud."""
+    center = points.mean(axis=0)
+    keys = np.floor((points - points.min(axis=0)) / voxel).astype(np.int64)
+    distance = np.einsum("ij,ij->i", points - center, points - center)
+    # Sort by voxel, farthest first within a voxel, and keep the first of each.
+    order = np.lexsort((-distance, keys[:, 2], keys[:, 1], keys[:, 0]))
+    sorted_keys = keys[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1)
+    return points[order[first]]
+
+
+def _plane(points: np.ndarray, face: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    a, b, c = points[face[:, 0]], points[face[:, 1]], points[face[:, 2]]
+    normal = np.cross(b - a, c - a)
+    normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+    return normal, np.einsum("ij,ij->i", normal, a)
+
+
+def _simplex(points: np.ndarray, eps: float) -> list[int]:
+    """Four points of the cloud that span a tetrahedron of substantial volume."""
+    extremes = np.concatenate([points.argmin(axis=0), points.argmax(axis=0)])
+    e = points[extremes]
+    i, j = np.unravel_index(np.argmax(np.linalg.norm(e[:, None] - e[None], axis=-1)), (6, 6))
+    p0, p1 = int(extremes[i]), int(extremes[j])
+    line = points[p1] - points[p0]
+    line /= np.linalg.norm(line)
+    offset = points - points[p0]
+    p2 = int(np.argmax(np.linalg.norm(offset - np.outer(offset @ line, line), axis=1)))
+    normal = np.cross(line, points[p2] - points[p0])
+    if np.linalg.norm(normal) <= eps:
+        raise ValueError("the points are collinear")
+    normal /= np.linalg.norm(normal)
+    height = offset @ normal
+    p3 = int(np.argmax(np.abs(height)))
+    if abs(height[p3]) <= eps:
+        raise ValueError("the points are coplanar")
+    return [p0, p1, p2, p3]
+
+
+class _Hull:
+    """The faces of a hull under construction, and the points outside each one."""
+    def __init__(self, points: np.ndarray, eps: float) -> None:
+        self.points = points
+        self.eps = eps
+        self.faces: list[tuple[int, int, int]] = []
+        self.normals: list[np.ndarray] = []
+        self.offsets: list[float] = []
+        self.alive: list[bool] = []
+        #: The face on the left of each directed edge.
+        self.edges: dict[tuple[int, int], int] = {}
+        #: The points outside each face, assigned to it.
+        self.outside: dict[int, np.ndarray] = {}
+        self.pending: list[int] = []
+
+    def add(self, faces: np.ndarray) -> list[int]:
+        normals, offsets = _plane(self.points, faces)
+        ids = list(range(len(self.faces), len(self.faces) + len(faces)))
+        for i, (a, b, c), n, o in zip(ids, faces.tolist(), normals, offsets.tolist()):
+            self.faces.append((a, b, c))
+            self.normals.append(n)
+            self.offsets.append(o)
+            self.alive.append(True)
+            self.edges[a, b] = self.edges[b, c] = self.edges[c, a] = i
+        return ids
+
+    def assign(self, candidates: np.ndarray, ids: list[int]) -> None:
+        """Assign each candidate to the face in ``ids`` it's farthest above; discard the rest."""
+        if not len(candidates):
+            return
+        normals = np.array([self.normals[i] for i in ids])
+        offsets = np.array([self.offsets[i] for i in ids])
+        heights = self.points[candidates] @ normals.T - offsets
+        best = np.argmax(heights, axis=1)
+        keep = heights[np.arange(len(candidates)), best] > self.eps
+        candidates, best = candidates[keep], best[keep]
+        order = np.argsort(best, kind="stable")
+        groups, starts = np.unique(best[order], return_index=True)
+        for g, chunk in zip(groups.tolist(), np.split(candidates[order], starts[1:])):
+            self.outside[ids[g]] = chunk
+            self.pending.append(ids[g])
+
+    def height(self, face: int, point: int) -> float:
+        return float(self.normals[face] @ self.points[point] - self.offsets[face])
+
+    def step(self, face: int) -> None:
+        """Add the point farthest above ``face``, replacing every face it can see."""
+        candidates = self.outside.pop(face)
+        heights = self.points[candidates] @ self.normals[face] - self.offsets[face]
+        apex = int(candidates[np.argmax(heights)])
+        # The faces the apex can see are connected; find them, and the horizon around them.
+        visible, stack, horizon = {face}, [face], []
+        while stack:
+            g = stack.pop()
+            a, b, c = self.faces[g]
+            for edge in ((a, b), (b, c), (c, a)):
+                neighbour = self.edges[edge[1], edge[0]]
+                if neighbour in visible:
+                    continue
+                if self.height(neighbour, apex) > self.eps:
+                    visible.add(neighbour)
+                    stack.append(neighbour)
+                else:
+                    horizon.append(edge)
+        orphans = [candidates]
+        for g in visible:
+            self.alive[g] = False
+            a, b, c = self.faces[g]
+            for edge in ((a, b), (b, c), (c, a)):
+                if self.edges.get(edge) == g:
+                    del self.edges[edge]
+            if g in self.outside:
+                orphans.append(self.outside.pop(g))
+        ids = self.add(np.array([(a, b, apex) for a, b in horizon]))
+        points = np.concatenate(orphans)
+        self.assign(points[points != apex], ids)
+
+    def mesh(self) -> Mesh:
+        faces = np.array([f for f, alive in zip(self.faces, self.alive) if alive])
+        used, faces = np.unique(faces, return_inverse=True)
+        return Mesh(self.points[used], faces.reshape(-1, 3).astype(np.int32))
+
+
+def convex_hull(points: ArrayLike, voxel: float | None = None) -> Mesh:
+    """The convex hull of the points, shape ``(n, 3)``, as a closed mesh: by Qhull, if SciPy is installed."""
+    points = np.asarray(points, dtype=float)
+    if voxel:
+        points = downsample(points, voxel)
+    try:
+        from scipy.spatial import ConvexHull
+    except ImportError:
+        return quickhull(points)
+    try:
+        qhull = ConvexHull(points)
+    except RuntimeError as ex:  # QhullError: too few points, or they're flat.
+        raise ValueError(f"the points don't span a volume: {ex}") from ex
+    faces = qhull.simplices.copy()
+    # Qhull's triangles aren't consistently ordered; its outward normals are.
+    a, b, c = points[faces[:, 0]], points[faces[:, 1]], points[faces[:, 2]]
+    inward = np.einsum("ij,ij->i", np.cross(b - a, c - a), qhull.equations[:, :3]) < 0
+    faces[inward] = faces[inward][:, ::-1]
+    used, faces = np.unique(faces, return_inverse=True)
+    return Mesh(points[used], faces.reshape(-1, 3).astype(np.int32))
+
+
+def quickhull(points: ArrayLike) -> Mesh:
+    """
+    The convex hull of the points, shape ``(n, 3)``, as a closed mesh, by QuickHull in NumPy.
+    This takes a Python step for each point on the hull.
+    """
+    points = np.asarray(points, dtype=float)
+    eps = 1e-10 * float(np.ptp(points, axis=0).max())
+    p0, p1, p2, p3 = _simplex(points, eps)
+    faces = np.array([[p0, p1, p2], [p0, p3, p1], [p1, p3, p2], [p2, p3, p0]])
+    normals, offsets = _plane(points, faces[:1])
+    if normals[0] @ points[p3] - offsets[0] > 0:
+        faces = faces[:, ::-1]
+    hull = _Hull(points, eps)
+    hull.assign(np.arange(len(points)), hull.add(faces))
+    while hull.pending:
+        face = hull.pending.pop()
+        if hull.alive[face] and face in hull.outside:
+            hull.step(face)
+    return hull.mesh()
+
+
+def volume(points: ArrayLike, voxel: float | None = None) -> float:
+    """Gallons in the convex hull of the points."""
+    return convex_hull(points, voxel).volume()
+
+
+def sample_tank(measured: Mapping[str, float], count: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Random points inside the tapered prism, in the coordinates of :mod:`vberth.mesh`:
+    a stand-in for a probe's measurements.
+    """
+    h_f, w_f, h_a, w_a, l_fa = (float(measured[n]) for n in ("h_f", "w_f", "h_a", "w_a", "l_fa"))
+    top = max(h_f, h_a)
+    z = rng.uniform(0, l_fa, count)
+    h = h_f + (h_a - h_f) * z / l_fa
+    w = w_f + (w_a - w_f) * z / l_fa
+    # A uniform point in the section's triangle, from two uniform coordinates.
+    u, v = rng.uniform(size=(2, count))
+    flip = u + v > 1
+    u[flip], v[flip] = 1 - u[flip], 1 - v[flip]
+    x = (u - v) * w / 2
+    y = top - h + (u + v) * h
+    return np.column_stack([x, y, z])
+
+
+def report(points: ArrayLike, measured: Mapping[str, float] = symbolic.MEASURED, voxel: float | None = None) -> str:
+    """The hull's volume and surface, with the measured models' volumes for comparison."""
+    from vberth import batch
+
+    hull = convex_hull(points, voxel)
+    values = {
+        name: float(value)
+        for name, value in batch.volumes({k: np.float64(measured[k]) for k in batch.MEASUREMENTS}).items()
+    }
+    values["convex_hull"] = hull.volume()
+    lines = [f"{name:22s} {value:8.2f} gallons" for name, value in values.items()]
+    lines.append(
+        f"convex hull of {len(np.asarray(points)):,} points: {len(hull.faces):,} faces, "
+        f"{hull.area():.1f} square inches"
+    )
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Volume of the convex hull of measured points")
+    parser.add_argument("points", type=Path, help="text file of x y z rows, in inches")
+    parser.add_argument("--voxel", type=float, help="downsample to one point per voxel of this size, in inches")
+    parser.add_argument("--stl", type=Path, help="write the hull as binary STL")
+    for name, value in symbolic.MEASURED.items():
+        parser.add_argument(f"--{name}", type=float, default=float(value))
+    options = parser.parse_args(argv)
+    points = np.loadtxt(options.points, delimiter=None if options.points.suffix != ".csv" else ",")
+    measured = {name: getattr(options, name) for name in symbolic.MEASURED}
+    print(report(points, measured, options.voxel))
+    if options.stl:
+        convex_hull(points, options.voxel).save_stl(options.stl)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Where does the time go when the book is built?
+
+When it's enabled, this wraps the ``sympy`` operations the notebooks spend their time in:
+``simplify()``, ``factor()``, ``radsimp()``, ``ratsimp()``, ``Integral.doit()``,
+``evalf()``, and ``latex()``, which is how ``glue()`` renders an expression.
+For each notebook cell, it records the wall time and number of calls of each operation,
+and the size of the expressions -- ``count_ops()`` -- before and after.
+
+Operations call each other: ``simplify()`` calls ``evalf()`` many times.
+Each operation's time is recorded with and without the time of the operations inside it,
+and sizes are measured only for the outermost operation, since counting is itself slow.
+
+The results are a report, sortable by any column, and a trace in the "folded stacks"
+format of flame graph tools, like ``flamegraph.pl`` or ``speedscope``: one line
+for each stack of cell and operations, with its own time in microseconds.
+
+When it isn't enabled, nothing is wrapped, and it costs nothing.
+
+While it's enabled, the derivation cache, :mod:`vberth.cache`, is disabled: a hit would
+load a pickle instead of calling the operation, and the profile would show neither.
+With ``cache=True``, or ``--cache``, the cache answers as it does when the book is built,
+and the report ends with the cache's hits and misses, so the operations that didn't run are accounted for.
+
+To profile the notebooks, run them with::
+
+    python -m vberth.instrument prism.ipynb prism-irregular.ipynb tetrahedron.ipynb -o _profile
+
+Or, in a running notebook, ``%load_ext vberth.instrument`` before the other imports,
+and ``%vberth_profile`` to see the report.
+
+>>> from sympy import symbols, factor, expand
+>>> x = symbols("x")
+>>> profiler = Profiler("example")
+>>> with profiler, profiler.cell("cell 1"):
+...     import sympy
+...     _ = sympy.factor(expand((x + 1)**3))
+>>> profiler.records[("cell 1", "factor")].calls
+1
+>>> profiler.records[("cell 1", "factor")].ops_before, profiler.records[("cell 1", "factor")].ops_after
+(7, 2)
+>>> sympy.factor is factor
+True
+>>> with profiler, profiler.cell("cell 2; a second statement"):
+...     _ = sympy.factor(expand((x + 2)**2))
+>>> sorted({line.rsplit(" ", 1)[0].split(";")[1] for line in profiler.trace().splitlines()})
+['cell 1', 'cell 2: a second statement']
+
+The derivation cache is off while the profiler is on, unless it's asked for.
+
+>>> from vberth.cache import derivations
+>>> with Profiler("example"):
+...     derivations.enabled
+False
+>>> with Profiler("example", cache=True):
+...     derivations.enabled
+True
+>>> derivations.enabled
+True
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any
+
+#: The operations, by name: the module or class, and the attribute to wrap.
+OPERATIONS: dict[str, tuple[str, str]] = {
+    "simplify": ("sympy.simplify.simplify", "simplify"),
+    "factor": ("sympy.polys.polytools", "factor"),
+    "radsimp": ("sympy.simplify.radsimp", "radsimp"),
+    "ratsimp": ("sympy.simplify.ratsimp", "ratsimp"),
+    "doit": ("sympy.integrals.integrals:Integral", "doit"),
+    "evalf": ("sympy.core.evalf:EvalfMixin", "evalf"),
+    "latex": ("sympy.printing.latex", "latex"),
+}
+
+
+@dataclass
+class Record:
+    """An operation's totals within a cell."""
+    cell: str
+    operation: str
+    calls: int = 0
+    seconds: float = 0.0
+    own_seconds: float = 0.0
+    ops_before: int = 0
+    ops_after: int = 0
+
+
+def _size(value: Any) -> int:
+    from sympy import Basic, count_ops
+    return int(count_ops(value)) if isinstance(value, Basic) else 0
+
+
+class Profiler:
+    """
+    Wraps the :data:`OPERATIONS` while it's enabled, and accumulates :class:`Record` objects.
+
+    ``cache`` is whether the derivation cache answers while it's enabled.
+    """
+    def __init__(self, name: str = "", cache: bool = False) -> None:
+        self.name = name
+        self.cache = cache
+        self.records: dict[tuple[str, str], Record] = {}
+        self.folded: Counter[str] = Counter()
+        self.cells: dict[str, float] = {}
+        self.current = "(no cell)"
+        self._frame = self.current
+        self._stack: list[list[Any]] = []
+        self._originals: list[tuple[Any, str, Any]] = []
+        self._cache_enabled = True
+
+    def _target(self, where: str) -> Any:
+        import importlib
+        module, _, cls = where.partition(":")
+        target = importlib.import_module(module)
+        return getattr(target, cls) if cls else target
+
+    def _wrap(self, name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        profiler = self
+
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            outermost = not profiler._stack
+            before = _size(args[0]) if outermost and args else 0
+            frame = [name, 0.0]
+            profiler._stack.append(frame)
+            start = time.perf_counter()
+            try:
+                result = function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                profiler._stack.pop()
+                if profiler._stack:
+                    profiler._stack[-1][1] += elapsed
+                path = ";".join([profiler._frame, *(f[0] for f in profiler._stack), name])
+                profiler.folded[path] += round((elapsed - frame[1]) * 1e6)
+                record = profiler.records.setdefault(
+                    (profiler.current, name), Record(profiler.current, name)
+                )
+                record.calls += 1
+                record.seconds += elapsed if name not in (f[0] for f in profiler._stack) else 0.0
+                record.own_seconds += elapsed - frame[1]
+            if outermost:
+                record.ops_before += before
+                record.ops_after += _size(result)
+            return result
+
+        wrapper.__wrapped__ = function  # type: ignore[attr-defined]
+        wrapper.__name__ = getattr(function, "__name__", name)
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+
+    def enable(self) -> None:
+        """Wrap the operations, in their modules and in the ``sympy`` namespace."""
+        if self._originals:
+            return
+        import sympy
+        from vberth.cache import derivations
+        self._cache_enabled, derivations.enabled = derivations.enabled, self.cache
+        for name, (where, attribute) in OPERATIONS.items():
+            target = self._target(where)
+            original = getattr(target, attribute)
+            wrapper = self._wrap(name, original)
+            self._originals.append((target, attribute, original))
+            setattr(target, attribute, wrapper)
+            if isinstance(target, type) and attribute == "evalf":
+                self._originals.append((target, "n", target.n))
+                setattr(target, "n", wrapper)
+            if getattr(sympy, attribute, None) is original:
+                self._originals.append((sympy, attribute, original))
+                setattr(sympy, attribute, wrapper)
+
+    def disable(self) -> None:
+        """Put the original operations back, and the cache as it was."""
+        if not self._originals:
+            return
+        for target, attribute, original in reversed(self._originals):
+            setattr(target, attribute, original)
+        self._originals.clear()
+        from vberth.cache import derivations
+        derivations.enabled = self._cache_enabled
+
+    def __enter__(self) -> "Profiler":
+        self.enable()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.disable()
+
+    @contextmanager
+    def cell(self, label: str) -> Iterator[None]:
+        """Attribute the operations inside to a cell."""
+        self.begin(label)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def begin(self, label: str) -> None:
+        self.current = label
+        self._frame = _frame(label)
+        self._cell_start = time.perf_counter()
+
+    def end(self) -> None:
+        elapsed = time.perf_counter() - self._cell_start
+        self.cells[self.current] = self.cells.get(self.current, 0.0) + elapsed
+        own = elapsed - sum(r.own_seconds for r in self.records.values() if r.cell == self.current)
+        self.folded[self._frame] += max(round(own * 1e6), 0)
+
+    def report(self, sort: str = "seconds", limit: int | None = None) -> str:
+        """
+        A table of the records, largest first by the ``sort`` column,
+        followed by the total for each cell, and, if the cache was used, its hits and misses.
+        """
+        columns = [f.name for f in fields(Record)]
+        if sort not in columns:
+            raise ValueError(f"sort must be one of {columns}")
+        rows = sorted(self.records.values(), key=lambda r: getattr(r, sort), reverse=sort not in ("cell", "operation"))
+        lines = [
+            f"{self.name}".strip(),
+            f"{'cell':32s} {'operation':10s} {'calls':>7s} {'seconds':>9s} {'own':>9s} {'ops before':>11s} {'ops after':>10s}",
+        ]
+        for r in rows[:limit]:
+            lines.append(
+                f"{r.cell[:32]:32s} {r.operation:10s} {r.calls:7d} {r.seconds:9.3f} {r.own_seconds:9.3f} "
+                f"{r.ops_before:11d} {r.ops_after:10d}"
+            )
+        if self.cells:
+            lines.append("")
+            lines.append(f"{'cell':32s} {'seconds':>9s}")
+            for label, seconds in sorted(self.cells.items(), key=lambda c: -c[1]):
+                lines.append(f"{label[:32]:32s} {seconds:9.3f}")
+        if self.cache:
+            from vberth.cache import derivations
+            lines.append("")
+            lines.append(derivations.report())
+        return "\n".join(line for line in lines if line)
+
+    def trace(self) -> str:
+        """The folded-stack trace, prefixed with the notebook name, for flame graph tools."""
+        prefix = f"{_frame(self.name)};" if self.name else ""
+        return "".join(f"{prefix}{path} {us}\n" for path, us in sorted(self.folded.items()) if us > 0)
+
+    def write(self, directory: Path | str, sort: str = "seconds") -> None:
+        """Save the report, as ``<name>.txt``, and the trace, as ``<name>.folded``."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"{self.name}.txt").write_text(self.report(sort) + "\n")
+        (directory / f"{self.name}.folded").write_text(self.trace())
+
+
+def _frame(label: str) -> str:
+    """
+    A label as one frame of a folded stack, where ``;`` separates frames and a newline ends the stack.
+
+    >>> _frame("[3] a; b = 1, 2")
+    '[3] a: b = 1, 2'
+    """
+    return label.replace(";", ":").replace("\n", " ")
+
+
+def label(index: int, source: str) -> str:
+    """A cell's label: its number, and its first line."""
+    first = next((line.strip() for line in source.splitlines() if line.strip()), "")
+    return f"[{index}] {first}"
+
+
+def run(notebook: Path, profiler: Profiler) -> None:
+    """Execute a notebook's code cells in an IPython shell, one profiled cell at a time."""
+    from IPython.core.interactiveshell import InteractiveShell
+
+    document = json.loads(notebook.read_text())
+    shell = InteractiveShell.instance()
+    shell.reset(new_session=True)
+    # The derivation cache outlives the shell's namespace; its report should be for this notebook only.
+    from vberth.cache import derivations
+    derivations.reset()
+    with profiler:
+        for index, cell in enumerate(document["cells"]):
+            if cell["cell_type"] != "code":
+                continue
+            source = "".join(cell["source"])
+            with profiler.cell(label(index, source)):
+                result = shell.run_cell(source, silent=True)
+            result.raise_error()
+
+
+# IPython extension: ``%load_ext vberth.instrument``
+
+_extension: Profiler | None = None
+
+
+def load_ipython_extension(ip: Any) -> None:
+    global _extension
+    _extension = Profiler()
+    _extension.enable()
+    counter = iter(range(1, sys.maxsize))
+
+    def pre_run_cell(info: Any) -> None:
+        _extension.begin(label(next(counter), info.raw_cell))
+
+    def post_run_cell(result: Any) -> None:
+        _extension.end()
+
+    ip.events.register("pre_run_cell", pre_run_cell)
+    ip.events.register("post_run_cell", post_run_cell)
+    ip.register_magic_function(lambda line: print(_extension.report(line.strip() or "seconds")), "line", "vberth_profile")
+    _extension._hooks = (pre_run_cell, post_run_cell)  # type: ignore[attr-defined]
+
+
+def unload_ipython_extension(ip: Any) -> None:
+    global _extension
+    if _extension is not None:
+        pre, post = _extension._hooks  # type: ignore[attr-defined]
+        ip.events.unregister("pre_run_cell", pre)
+        ip.events.unregister("post_run_cell", post)
+        _extension.disable()
+        _extension = None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Profile the sympy operations in notebooks, cell by cell")
+    parser.add_argument("notebooks", nargs="+", type=Path)
+    parser.add_argument("-o", "--output", type=Path, default=Path("_profile"), help="directory for reports and traces")
+    parser.add_argument("--sort", default="seconds", choices=[f.name for f in fields(Record)])
+    parser.add_argument("--limit", type=int, default=20, help="rows to print for each notebook")
+    parser.add_argument("--cache", action="store_true", help="let the derivation cache answer, and report its hits")
+    options = parser.parse_args(argv)
+    for notebook in options.notebooks:
+        profiler = Profiler(notebook.stem, cache=options.cache)
+        run(notebook, profiler)
+        profiler.write(options.output, options.sort)
+        print(profiler.report(options.sort, options.limit))
+        print()
+    print(f"Reports and flame graph traces are in {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+A lofted tank: the volume from any number of measured cross-sections.
+
+``prism-irregular.ipynb`` interpolates linearly between two triangles, forward and aft.
+The difference between that and the midpoint prism shows how much the result depends
+on the shape between the ends. With more stations measured along the keel,
+the tank is a sequence of tapered prisms, one for each pair of adjacent stations.
+
+Each station is a triple, :math:`(z, h, w)`: the distance from the forward end,
+and the height and width of the triangle there. Between two stations,
+:math:`h(z)` and :math:`w(z)` are linear, and :math:`A(z)` is the quadratic from the notebook.
+Integrating over a segment of length :math:`l` gives
+
+.. math::
+
+    V = \\frac{l}{12} (2 h_0 w_0 + h_0 w_1 + h_1 w_0 + 2 h_1 w_1)
+
+which is :func:`vberth.symbolic.irregular_prism` with the segment's ends as
+the forward and aft triangles.
+
+The stations are an array with shape ``(..., n, 3)``. Leading dimensions are a batch of tanks.
+The work is linear in the number of stations.
+
+>>> import numpy as np
+>>> two = from_measured(dict(h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46))
+>>> two
+array([[ 0. ,  8. , 10.5],
+       [46. , 27. , 48. ]])
+>>> round(float(volume(two)), 3)
+56.878
+
+Adding a station in the middle that's on the straight line between the ends doesn't change the volume.
+
+>>> three = np.array([[0, 8, 10.5], [23, 17.5, 29.25], [46, 27, 48]])
+>>> round(float(volume(three)), 3)
+56.878
+
+A batch of tanks has a leading dimension.
+
+>>> volume(np.stack([two, two * [1, 1, 2]])).round(3)
+array([ 56.878, 113.755])
+"""
+from collections.abc import Mapping
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+
+def as_stations(stations: ArrayLike) -> np.ndarray:
+    """
+    Validate an array of ``(z, h, w)`` stations.
+
+    There must be at least two stations, in order from forward to aft.
+    """
+    s = np.asarray(stations, dtype=float)
+    if s.ndim < 2 or s.shape[-1] != 3:
+        raise ValueError(f"stations must have shape (..., n, 3), not {s.shape}")
+    if s.shape[-2] < 2:
+        raise ValueError("at least two stations are required")
+    if np.any(np.diff(s[..., 0], axis=-1) < 0):
+        raise ValueError("stations must be ordered from forward to aft")
+    return s
+
+
+def from_measured(measured: Mapping[str, float]) -> np.ndarray:
+    """The two stations of the notebook's ``measured`` dictionary."""
+    return np.array([
+        [0.0, float(measured["h_f"]), float(measured["w_f"])],
+        [float(measured["l_fa"]), float(measured["h_a"]), float(measured["w_a"])],
+    ])
+
+
+def segment_volumes(stations: ArrayLike) -> np.ndarray:
+    """The volume, in gallons, between each pair of adjacent stations: shape ``(..., n-1)``."""
+    s = as_stations(stations)
+    z, h, w = s[..., 0], s[..., 1], s[..., 2]
+    l = np.diff(z, axis=-1)
+    h_0, h_1 = h[..., :-1], h[..., 1:]
+    w_0, w_1 = w[..., :-1], w[..., 1:]
+    return l * (2*h_0*w_0 + h_0*w_1 + h_1*w_0 + 2*h_1*w_1) / (12 * GALLON)
+
+
+def cumulative(stations: ArrayLike) -> np.ndarray:
+    """The volume, in gallons, from the forward end to each station: shape ``(..., n)``."""
+    v = segment_volumes(stations)
+    zero = np.zeros(v.shape[:-1] + (1,))
+    return np.concatenate([zero, np.cumsum(v, axis=-1)], axis=-1)
+
+
+def volume(stations: ArrayLike) -> np.ndarray:
+    """The total volume, in gallons, of each tank in the batch."""
+    return segment_volumes(stations).sum(axis=-1)
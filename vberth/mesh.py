@@ -0,0 +1,189 @@
+"""
+A triangle mesh of the tank, its volume, and binary STL for fabrication quotes.
+
+The sketch in ``index.md`` shows the tank as a triangle forward, a triangle aft,
+and three four-sided faces between them: the flat top, and the two sides that
+follow the hull down to the keel. :func:`from_stations` builds that surface
+from the stations of a loft (see :mod:`vberth.loft`), with ``slices`` stations
+interpolated between each measured pair. Coordinates are in inches: :math:`x` is athwartships,
+:math:`y` is up from the lowest point of the keel, and :math:`z` is aft from the forward end.
+
+Each four-sided face is split into two triangles. When the height and width don't taper
+in proportion, the side faces twist, and a split is only an approximation of the
+ruled surface the notebook integrates. The port and starboard faces are mirror images,
+but they're split along opposite diagonals: port from the corner to the next station's keel,
+starboard from the keel to the next station's corner. Where one side's split cuts inside
+the surface, the other's bulges outside it, by the same amount, so their errors cancel:
+the mesh encloses exactly the volume of the loft. That's the cross-check with the analytic
+prism, at any resolution.
+
+The volume, by the divergence theorem, is the sum of the signed volumes of the
+tetrahedra from a reference point to each face,
+:math:`\\frac{1}{6} \\sum (v_0 - o) \\cdot ((v_1 - o) \\times (v_2 - o))`.
+:meth:`Mesh.volume` computes it in fixed-size chunks of faces,
+into buffers allocated once, with ``out=`` for every step, so a mesh of millions of faces needs only a few megabytes
+beyond the mesh itself.
+
+>>> coarse = from_stations(loft.from_measured(symbolic.MEASURED))
+>>> len(coarse.faces), coarse.closed()
+(8, True)
+>>> round(coarse.volume(), 3)
+56.878
+>>> fine = from_stations(loft.from_measured(symbolic.MEASURED), slices=256)
+>>> len(fine.faces), round(fine.volume(), 3)
+(1538, 56.878)
+"""
+import argparse
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+from vberth import loft, symbolic
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+#: One binary STL facet: a normal, three vertices, and an unused attribute count.
+FACET = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+
+#: Faces processed at a time by :meth:`Mesh.volume` and :meth:`Mesh.save_stl`.
+CHUNK = 65_536
+
+
+class Mesh(NamedTuple):
+    """Vertices, shape ``(V, 3)``, and triangular faces, shape ``(F, 3)``, wound counter-clockwise seen from outside."""
+    vertices: np.ndarray
+    faces: np.ndarray
+
+    def volume(self, chunk: int = CHUNK) -> float:
+        """Enclosed volume, in gallons."""
+        origin = self.vertices[0]
+        a, b, c = (np.empty((chunk, 3)) for _ in range(3))
+        p, q = np.empty(chunk), np.empty(chunk)
+        total = 0.0
+        for start in range(0, len(self.faces), chunk):
+            f = self.faces[start:start + chunk]
+            n = len(f)
+            for buffer, column in zip((a, b, c), f.T):
+                np.take(self.vertices, column, axis=0, out=buffer[:n])
+                np.subtract(buffer[:n], origin, out=buffer[:n])
+            # (b x c)[i] = b[j] c[k] - b[k] c[j], one component at a time, into the spare buffers.
+            for i, j, k in ((0, 1, 2), (1, 2, 0), (2, 0, 1)):
+                np.multiply(b[:n, j], c[:n, k], out=p[:n])
+                np.multiply(b[:n, k], c[:n, j], out=q[:n])
+                total += np.dot(a[:n, i], np.subtract(p[:n], q[:n], out=p[:n]))
+        return float(total) / 6 / GALLON
+
+    def area(self) -> float:
+        """Surface area, in square inches."""
+        v = self.vertices[self.faces]
+        return float(np.linalg.norm(np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0]), axis=1).sum() / 2)
+
+    def closed(self) -> bool:
+        """
+        True if the mesh is watertight and consistently wound:
+        every directed edge appears once, and so does its reverse.
+        """
+        f = self.faces.astype(np.int64)
+        start = f.ravel()
+        end = np.roll(f, -1, axis=1).ravel()
+        n = len(self.vertices)
+        edges = start * n + end
+        reverse = end * n + start
+        unique = np.unique(edges)
+        return len(unique) == len(edges) and bool(np.all(np.isin(reverse, unique)))
+
+    def save_stl(self, path: Path | str, name: str = "vberth", chunk: int = CHUNK) -> None:
+        """Write binary STL, in inches."""
+        facets = np.zeros(min(chunk, len(self.faces)), dtype=FACET)
+        with open(path, "wb") as target:
+            target.write(f"{name} (inches)".encode("ascii")[:80].ljust(80, b"\0"))
+            target.write(np.uint32(len(self.faces)).astype("<u4").tobytes())
+            for start in range(0, len(self.faces), chunk):
+                v = self.vertices[self.faces[start:start + chunk]]
+                n = len(v)
+                normal = np.cross(v[:, 1] - v[:, 0], v[:, 2] - v[:, 0])
+                length = np.linalg.norm(normal, axis=1, keepdims=True)
+                facets["normal"][:n] = np.divide(normal, length, out=np.zeros_like(normal), where=length > 0)
+                facets["vertices"][:n] = v
+                target.write(facets[:n].tobytes())
+
+
+def load_stl(path: Path | str) -> Mesh:
+    """
+    Read binary STL. Vertices aren't merged; each face has its own three.
+
+    >>> import tempfile
+    >>> mesh = from_stations(loft.from_measured(symbolic.MEASURED), slices=4)
+    >>> with tempfile.TemporaryDirectory() as directory:
+    ...     mesh.save_stl(Path(directory) / "tank.stl")
+    ...     copy = load_stl(Path(directory) / "tank.stl")
+    >>> len(copy.faces) == len(mesh.faces), bool(abs(copy.volume() - mesh.volume()) < 1e-4)
+    (True, True)
+    """
+    with open(path, "rb") as source:
+        source.seek(80)
+        count = int(np.frombuffer(source.read(4), dtype="<u4")[0])
+        facets = np.frombuffer(source.read(count * FACET.itemsize), dtype=FACET)
+    vertices = facets["vertices"].reshape(-1, 3).astype(float)
+    return Mesh(vertices, np.arange(len(vertices)).reshape(-1, 3))
+
+
+def refine(stations: ArrayLike, slices: int) -> np.ndarray:
+    """Stations with ``slices - 1`` more, linearly interpolated, between each pair."""
+    s = loft.as_stations(stations)
+    t = np.arange(slices) / slices
+    between = s[:-1, np.newaxis, :] + t[:, np.newaxis] * (s[1:] - s[:-1])[:, np.newaxis, :]
+    return np.concatenate([between.reshape(-1, 3), s[-1:]])
+
+
+def from_stations(stations: ArrayLike, slices: int = 1) -> Mesh:
+    """
+    The closed surface of a loft: a triangle at each end, and three four-sided faces
+    -- top, port, and starboard -- between each pair of stations.
+    """
+    s = refine(stations, slices)
+    n = len(s)
+    z, h, w = s[:, 0], s[:, 1], s[:, 2]
+    top = h.max()
+    # Three vertices for each station: the keel, the port corner, and the starboard corner.
+    vertices = np.empty((n, 3, 3))
+    vertices[:, 0] = np.column_stack([np.zeros(n), top - h, z])
+    vertices[:, 1] = np.column_stack([-w / 2, np.full(n, top), z])
+    vertices[:, 2] = np.column_stack([w / 2, np.full(n, top), z])
+    keel, port, starboard = (3 * np.arange(n - 1) + i for i in range(3))
+    quads = [
+        (port, keel, keel + 3, port + 3),
+        (starboard, port, port + 3, starboard + 3),
+        (keel, starboard, starboard + 3, keel + 3),
+    ]
+    sides = np.concatenate([
+        np.stack([np.column_stack([a, b, c]), np.column_stack([a, c, d])], axis=1).reshape(-1, 3)
+        for a, b, c, d in quads
+    ])
+    last = 3 * (n - 1)
+    ends = np.array([[0, 1, 2], [last, last + 2, last + 1]])
+    faces = np.concatenate([ends[:1], sides, ends[1:]]).astype(np.int32 if 3 * n < 2**31 else np.int64)
+    return Mesh(vertices.reshape(-1, 3), faces)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Write an STL mesh of the tank")
+    parser.add_argument("output", type=Path)
+    for name, value in symbolic.MEASURED.items():
+        parser.add_argument(f"--{name}", type=float, default=float(value))
+    parser.add_argument("--slices", type=int, default=64, help="stations between the ends")
+    options = parser.parse_args(argv)
+    measured = {name: getattr(options, name) for name in symbolic.MEASURED}
+    mesh = from_stations(loft.from_measured(measured), options.slices)
+    mesh.save_stl(options.output)
+    print(
+        f"{options.output}: {len(mesh.faces):,} faces, {mesh.volume():.3f} gallons, "
+        f"loft {float(loft.volume(loft.from_measured(measured))):.3f} gallons"
+    )
+
+
+if __name__ == "__main__":
+    main()
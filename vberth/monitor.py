@@ -0,0 +1,323 @@
+"""
+Live gallons from a level sender.
+
+The service reads depths from a source, smooths them, converts them to gallons
+with a :class:`vberth.sounding.SoundingTable`, and publishes the result over HTTP.
+The table is computed once, at start-up, from the irregular prism's geometry
+-- or loaded from a file saved by :meth:`~vberth.sounding.SoundingTable.save` --
+so nothing here imports ``sympy``. Each reading is a median, an exponential average,
+and a binary search: a few microseconds.
+
+A source is any asynchronous iterable of :class:`Reading`. There are two here:
+:func:`simulate`, a tank draining slowly, with slosh and sensor noise, and
+:func:`replay`, the rows of a file of readings. A real sender is a few lines more:
+an ``async`` generator reading a serial port, or an NMEA 2000 gateway.
+
+Smoothing is in two steps. A running median of the last few readings
+removes spikes, like a wave slapping the float. An exponential average,
+with a time constant in seconds, removes the slosh. The time constant is applied to the
+interval between readings, so readings can arrive at any rate, or irregularly.
+
+The readings go from the source through a bounded queue to the consumer. The latency of
+each reading is from when it was put in the queue to when its gallons were published:
+time waiting behind other readings is included. :meth:`Monitor.stats` reports the
+50th and 99th percentiles of the recent readings, in microseconds.
+
+The HTTP endpoints are:
+
+``GET /``
+    The latest state and statistics, as JSON.
+
+``GET /stream``
+    The latest state, as a line of JSON, ``publish_rate`` times a second, until the client disconnects.
+
+To run it with the simulated sensor, at 5,000 readings a second::
+
+    python -m vberth.monitor --rate 5000 --port 8765
+    curl http://127.0.0.1:8765/
+
+>>> table = SoundingTable.build(MEASURED, 513)
+>>> monitor = Monitor(table, tau=5)
+>>> source = simulate(level=13.5, rate=0, count=20_000, drain=0, slosh=0.25, seed=42)
+>>> asyncio.run(monitor.run(source))
+>>> monitor.count
+20000
+>>> abs(monitor.gallons - table.gallons(13.5)) < 0.05
+True
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterable, AsyncIterator, Mapping
+from pathlib import Path
+from statistics import median
+from typing import Any, NamedTuple
+
+import numpy as np
+
+from vberth.sounding import SoundingTable
+
+#: The notebook's dimensions, in inches.
+MEASURED = dict(h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46)
+
+#: Readings kept for the latency percentiles.
+LATENCIES = 65_536
+
+
+class Reading(NamedTuple):
+    """A depth, in inches, and when it was read, in seconds."""
+    seconds: float
+    depth: float
+
+
+class Smoother:
+    """A running median of ``window`` readings, then an exponential average with time constant ``tau`` seconds."""
+    def __init__(self, tau: float = 2.0, window: int = 5) -> None:
+        self.tau = tau
+        self.recent: deque[float] = deque(maxlen=window)
+        self.value: float | None = None
+        self.seconds: float | None = None
+
+    def update(self, reading: Reading) -> float:
+        """
+        The smoothed depth, after this reading.
+
+        >>> s = Smoother(tau=1.0, window=3)
+        >>> [round(s.update(Reading(t, d)), 3) for t, d in [(0, 10), (1, 10), (2, 30), (3, 20), (4, 20)]]
+        [10.0, 10.0, 10.0, 16.321, 18.647]
+        """
+        self.recent.append(reading.depth)
+        depth = median(self.recent)
+        if self.value is None or self.tau <= 0:
+            self.value = float(depth)
+        else:
+            alpha = 1.0 - math.exp(-max(reading.seconds - self.seconds, 0.0) / self.tau)
+            self.value += alpha * (depth - self.value)
+        self.seconds = reading.seconds
+        return self.value
+
+
+async def simulate(
+    level: float = 13.5, rate: float = 1000, count: int | None = None,
+    drain: float = 0.001, slosh: float = 0.5, period: float = 4.0, noise: float = 0.05,
+    seed: int | None = None, tick: float = 0.001,
+) -> AsyncIterator[Reading]:
+    """
+    A level sender on a tank draining at ``drain`` inches a second, with a slosh of ``slosh`` inches
+    every ``period`` seconds, and sensor noise with standard deviation ``noise``.
+
+    Readings are produced ``rate`` a second, in bursts every ``tick`` seconds. With ``rate=0``,
+    as fast as they're consumed, a second's worth at a time, with the same simulated clock.
+    """
+    rng = np.random.default_rng(seed)
+    step = 1 / (rate or 1000)
+    burst = max(int(rate * tick), 1) if rate else 1000
+    produced = 0
+    start = time.perf_counter()
+    while count is None or produced < count:
+        n = burst if count is None else min(burst, count - produced)
+        t = (produced + np.arange(n)) * step
+        depth = level - drain * t + slosh * np.sin(2 * np.pi * t / period) + rng.normal(0.0, noise, n)
+        for reading in zip(t.tolist(), depth.tolist()):
+            yield Reading(*reading)
+        produced += n
+        if rate:
+            await asyncio.sleep(max(start + produced * step - time.perf_counter(), 0.0))
+        else:
+            await asyncio.sleep(0)
+
+
+async def replay(path: Path | str, speed: float = 1.0, rate: float = 10.0) -> AsyncIterator[Reading]:
+    """
+    Readings from a CSV file: rows of seconds and depth, or only depth, ``rate`` a second.
+    They're produced at ``speed`` times real time; with ``speed=0``, as fast as they're consumed.
+    """
+    start = time.perf_counter()
+    with open(path, newline="") as source:
+        for index, row in enumerate(csv.reader(source)):
+            try:
+                values = [float(v) for v in row]
+            except ValueError:
+                continue  # A heading.
+            reading = Reading(*values) if len(values) > 1 else Reading(index / rate, values[0])
+            if speed:
+                await asyncio.sleep(max(start + reading.seconds / speed - time.perf_counter(), 0.0))
+            elif index % 1000 == 0:
+                await asyncio.sleep(0)
+            yield reading
+
+
+class Monitor:
+    """The latest smoothed depth and gallons, and the latency of each reading."""
+    def __init__(self, table: SoundingTable, tau: float = 2.0, window: int = 5, queue: int = 10_000) -> None:
+        self.table = table
+        self.smoother = Smoother(tau, window)
+        self.queue_size = queue
+        self.count = 0
+        self.depth = math.nan
+        self.smoothed = math.nan
+        self.gallons = math.nan
+        self.started = time.perf_counter()
+        self.latencies = np.zeros(LATENCIES)
+
+    def update(self, reading: Reading, arrived: float) -> None:
+        self.depth = reading.depth
+        self.smoothed = self.smoother.update(reading)
+        self.gallons = self.table.gallons(self.smoothed)
+        self.latencies[self.count % LATENCIES] = time.perf_counter() - arrived
+        self.count += 1
+
+    async def run(self, source: AsyncIterable[Reading]) -> None:
+        """
+        Consume readings until the source ends. If the source raises an exception, so does this.
+
+        >>> async def failing():
+        ...     yield Reading(0.0, 13.5)
+        ...     raise OSError("sensor disconnected")
+        >>> monitor = Monitor(SoundingTable.build(MEASURED, 65))
+        >>> asyncio.run(monitor.run(failing()))
+        Traceback (most recent call last):
+        ...
+        OSError: sensor disconnected
+        >>> monitor.count
+        1
+        """
+        queue: asyncio.Queue[tuple[Reading, float] | None] = asyncio.Queue(self.queue_size)
+
+        async def produce() -> None:
+            try:
+                async for reading in source:
+                    await queue.put((reading, time.perf_counter()))
+            finally:
+                # Even when the source fails, so the consumer stops.
+                await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (item := await queue.get()) is not None:
+                self.update(*item)
+                # Take everything that's waiting before yielding to the other tasks.
+                while not queue.empty() and (item := queue.get_nowait()) is not None:
+                    self.update(*item)
+                if item is None:
+                    break
+        except BaseException:
+            producer.cancel()
+            raise
+        # The source's exception, if it had one.
+        await producer
+
+    def stats(self) -> dict[str, Any]:
+        """The latest state, the reading rate, and latency percentiles, in microseconds."""
+        recent = self.latencies[:min(self.count, LATENCIES)]
+        p50, p99 = np.percentile(recent, [50, 99]) * 1e6 if len(recent) else (math.nan, math.nan)
+        return {
+            "readings": self.count,
+            "per_second": self.count / max(time.perf_counter() - self.started, 1e-9),
+            "depth": self.depth,
+            "smoothed_depth": self.smoothed,
+            "gallons": self.gallons,
+            "capacity": self.table.capacity,
+            "p50_us": float(p50),
+            "p99_us": float(p99),
+            "max_us": float(recent.max() * 1e6) if len(recent) else math.nan,
+        }
+
+
+async def serve(monitor: Monitor, host: str, port: int, publish_rate: float = 10.0) -> asyncio.Server:
+    """Start the HTTP server for :meth:`Monitor.stats`."""
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = (await reader.readline()).decode("latin-1").split()
+            while (await reader.readline()).strip():
+                pass  # Headers.
+            target = request[1] if len(request) > 1 else ""
+            if target == "/":
+                body = json.dumps(monitor.stats()).encode("utf-8")
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: %d\r\nConnection: close\r\n\r\n%s" % (len(body), body)
+                )
+            elif target == "/stream":
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nConnection: close\r\n\r\n")
+                while True:
+                    writer.write(json.dumps(monitor.stats()).encode("utf-8") + b"\n")
+                    await writer.drain()
+                    await asyncio.sleep(1 / publish_rate)
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+def table_for(measured: Mapping[str, float], path: Path | None = None) -> SoundingTable:
+    return SoundingTable.load(path) if path else SoundingTable.build(measured)
+
+
+async def main_async(options: argparse.Namespace) -> Monitor:
+    measured = {name: getattr(options, name) for name in MEASURED}
+    monitor = Monitor(table_for(measured, options.table), options.tau, options.window)
+    if options.replay:
+        source = replay(options.replay, options.speed)
+    else:
+        count = int(options.rate * options.duration) if options.duration and options.rate else options.count
+        source = simulate(options.level, options.rate, count, seed=options.seed)
+    server = await serve(monitor, options.host, options.port, options.publish_rate) if options.port else None
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(options.report)
+            s = monitor.stats()
+            print(
+                f"{s['readings']:10,d} readings {s['per_second']:8.0f}/s  depth {s['smoothed_depth']:6.2f} in  "
+                f"{s['gallons']:6.2f} gal  p50 {s['p50_us']:7.1f} µs  p99 {s['p99_us']:7.1f} µs",
+                flush=True,
+            )
+
+    reporter = asyncio.create_task(report())
+    try:
+        await monitor.run(source)
+    finally:
+        reporter.cancel()
+        if server:
+            server.close()
+    return monitor
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Publish live gallons from a level sender")
+    parser.add_argument("--replay", type=Path, help="CSV of seconds,depth rows; default, the simulated sensor")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed; 0 is as fast as possible")
+    parser.add_argument("--rate", type=float, default=1000, help="simulated readings a second; 0 is as fast as possible")
+    parser.add_argument("--level", type=float, default=13.5, help="simulated depth, in inches")
+    parser.add_argument("--count", type=int, help="simulated readings; default, forever")
+    parser.add_argument("--duration", type=float, help="simulated seconds")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--tau", type=float, default=2.0, help="smoothing time constant, in seconds")
+    parser.add_argument("--window", type=int, default=5, help="readings in the running median")
+    parser.add_argument("--table", type=Path, help="a saved sounding table, instead of computing one")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 for no HTTP server")
+    parser.add_argument("--publish-rate", type=float, default=10.0, help="/stream updates a second")
+    parser.add_argument("--report", type=float, default=5.0, help="seconds between printed statistics")
+    for name, value in MEASURED.items():
+        parser.add_argument(f"--{name}", type=float, default=float(value))
+    options = parser.parse_args(argv)
+    try:
+        monitor = asyncio.run(main_async(options))
+    except KeyboardInterrupt:
+        return
+    print(json.dumps(monitor.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Monte Carlo estimates of the measurement uncertainty.
+
+The measurements are hand tape readings in an awkward space.
+Each one is better described as a range of plausible values than a single number.
+
+Each measurement can be given as
+
+-   a plain number, which is used as-is,
+
+-   a :class:`Tolerance`, a reading plus or minus some amount, sampled uniformly,
+
+-   a :class:`Normal` or :class:`Triangular` distribution,
+
+-   or anything else with a ``sample(rng, size)`` method.
+
+The :func:`simulate` function draws samples in chunks, evaluates the compiled
+models from :mod:`vberth.compiled` on each chunk, and accumulates running
+statistics and a histogram. Memory is bounded by the chunk size, no matter
+how many samples are drawn; percentiles come from a finely-binned histogram.
+
+>>> spec = {name: Tolerance(float(v), 0.25) for name, v in symbolic.MEASURED.items()}
+>>> results = simulate(spec, samples=200_000, seed=42)
+>>> round(results["irregular_prism"].mean, 1)
+56.9
+>>> s = results["midpoint_prism"]
+>>> s.percentile(5) < s.mean < s.percentile(95)
+True
+
+Run it from the command line with a tolerance, in inches, for all five measurements::
+
+    python -m vberth.montecarlo --tolerance 0.25 --samples 10000000
+"""
+import argparse
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import NamedTuple, Protocol, Union
+
+import numpy as np
+
+from vberth import compiled, symbolic
+
+
+class Distribution(Protocol):
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        ...
+
+
+class Tolerance(NamedTuple):
+    """A reading, plus or minus a tolerance, uniformly distributed."""
+    value: float
+    plus_minus: float
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.uniform(self.value - self.plus_minus, self.value + self.plus_minus, size)
+
+
+class Normal(NamedTuple):
+    """A reading with normally-distributed error."""
+    mean: float
+    sd: float
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.normal(self.mean, self.sd, size)
+
+
+class Triangular(NamedTuple):
+    """A reading that's most likely ``mode``, but could be anything from ``low`` to ``high``."""
+    low: float
+    mode: float
+    high: float
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.triangular(self.low, self.mode, self.high, size)
+
+
+Measurement = Union[float, Distribution]
+
+
+def draw(measurement: Measurement, rng: np.random.Generator, size: int) -> np.ndarray:
+    """Samples of one measurement. A plain number is a constant."""
+    if hasattr(measurement, "sample"):
+        return measurement.sample(rng, size)
+    return np.full(size, float(measurement))
+
+
+@dataclass
+class Summary:
+    """
+    Running statistics and a histogram of one model's volumes, in gallons.
+
+    The histogram range is set from the first chunk, widened on both sides.
+    Values outside the range are counted, and clamp the extreme percentiles
+    to the observed minimum and maximum.
+    """
+    model: str
+    low: float
+    high: float
+    bins: int = 4096
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+    minimum: float = float("inf")
+    maximum: float = float("-inf")
+    counts: np.ndarray = field(init=False)
+    underflow: int = 0
+    overflow: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+
+    @classmethod
+    def from_pilot(cls, model: str, volumes: np.ndarray, bins: int = 4096) -> "Summary":
+        lo, hi = float(volumes.min()), float(volumes.max())
+        margin = max(hi - lo, abs(hi) * 1e-9, 1e-9)
+        return cls(model, lo - margin, hi + margin, bins)
+
+    def update(self, volumes: np.ndarray) -> None:
+        v = volumes.ravel()
+        self.count += v.size
+        self.total += float(v.sum())
+        self.total_sq += float(np.dot(v, v))
+        self.minimum = min(self.minimum, float(v.min()))
+        self.maximum = max(self.maximum, float(v.max()))
+        self.underflow += int(np.count_nonzero(v < self.low))
+        self.overflow += int(np.count_nonzero(v >= self.high))
+        self.counts += np.histogram(v, self.bins, (self.low, self.high))[0]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count
+
+    @property
+    def std(self) -> float:
+        return max(self.total_sq / self.count - self.mean**2, 0.0) ** 0.5
+
+    @property
+    def edges(self) -> np.ndarray:
+        return np.linspace(self.low, self.high, self.bins + 1)
+
+    def percentile(self, q: float) -> float:
+        """The q-th percentile, interpolated within the histogram bins."""
+        target = q / 100 * self.count
+        if target <= self.underflow:
+            return self.minimum
+        cumulative = self.underflow + np.cumsum(self.counts)
+        if target > cumulative[-1]:
+            return self.maximum
+        i = int(np.searchsorted(cumulative, target))
+        before = cumulative[i] - self.counts[i]
+        fraction = (target - before) / self.counts[i]
+        width = (self.high - self.low) / self.bins
+        return float(self.low + (i + fraction) * width)
+
+    def histogram(self, bins: int = 32) -> tuple[np.ndarray, np.ndarray]:
+        """A coarser histogram, rebinned from the fine one: ``(counts, edges)``."""
+        group = self.bins // bins
+        counts = self.counts[: group * bins].reshape(bins, group).sum(axis=1)
+        return counts, self.edges[:: group][: bins + 1]
+
+    def report(self, percentiles: Iterable[float] = (2.5, 25, 50, 75, 97.5), bins: int = 16) -> str:
+        lines = [
+            f"{self.model}: {self.count:,d} samples",
+            f"  mean {self.mean:.2f} gal, sd {self.std:.2f}, range {self.minimum:.2f} to {self.maximum:.2f}",
+            "  " + ", ".join(f"p{q:g} {self.percentile(q):.2f}" for q in percentiles),
+        ]
+        counts, edges = self.histogram(bins)
+        scale = 40 / max(counts.max(), 1)
+        for c, lo, hi in zip(counts, edges, edges[1:]):
+            if c:
+                lines.append(f"  {lo:7.2f} - {hi:7.2f} {'#' * max(int(c * scale), 1)}")
+        return "\n".join(lines)
+
+
+def simulate(
+    spec: Mapping[str, Measurement],
+    samples: int = 1_000_000,
+    chunk: int = 250_000,
+    seed: int | None = None,
+    models: Iterable[str] | None = None,
+) -> dict[str, Summary]:
+    """
+    Draw ``samples`` sets of measurements and summarize each model's volumes.
+
+    If ``models`` isn't given, every model in :data:`vberth.compiled.MODELS`
+    whose measurements are all present in ``spec`` is evaluated.
+    """
+    if models is None:
+        models = [
+            name for name, model in compiled.MODELS.items()
+            if all(n in spec for n in model.names)
+        ]
+    models = list(models)
+    rng = np.random.default_rng(seed)
+    summaries: dict[str, Summary] = {}
+    remaining = samples
+    while remaining > 0:
+        size = min(chunk, remaining)
+        drawn = {name: draw(m, rng, size) for name, m in spec.items()}
+        for name in models:
+            volumes = np.broadcast_to(compiled.evaluate(name, **drawn), (size,))
+            if name not in summaries:
+                summaries[name] = Summary.from_pilot(name, volumes)
+            summaries[name].update(volumes)
+        remaining -= size
+    return summaries
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Monte Carlo volume uncertainty")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="inches, plus or minus")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--chunk", type=int, default=250_000)
+    parser.add_argument("--seed", type=int)
+    options = parser.parse_args(argv)
+    spec = {
+        name: Tolerance(float(value), options.tolerance)
+        for name, value in symbolic.MEASURED.items()
+    }
+    for summary in simulate(spec, options.samples, options.chunk, options.seed).values():
+        print(summary.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Sliders for the measurements, and every model's volume, as you drag.
+
+Changing ``measured["h_f"]`` in a notebook means editing a cell, and re-running the
+``subs()``, ``evalf()``, and ``glue()`` cells after it. :func:`panel` is the spreadsheet
+version: a slider for each measurement, bound to the notebook's ``measured`` dictionary,
+and a table of the models' volumes, and how they compare, that follows the sliders.
+
+The volumes come from :mod:`vberth.formulas`: plain arithmetic, a few microseconds for
+all of the models. The table is redrawn at most once a frame. A slider sends many
+changes while it's dragged; the first schedules a refresh at the start of the next frame,
+the rest only update ``measured``, and the one refresh sees all of them.
+Rendering the formula with ``sympy`` takes far longer than a frame, so it waits until the sliders
+have been still for ``settle`` seconds. Each change pushes it back.
+
+The timing doesn't depend on the widgets. :class:`Panel` schedules its work on the ``asyncio``
+loop, which is the kernel's loop in Jupyter, and calls ``on_table`` and ``on_formula``
+with the HTML and LaTeX to show; :func:`panel` connects them to ``ipywidgets``.
+In a notebook::
+
+    from vberth.panel import panel
+    panel(measured)
+
+>>> async def drag():
+...     p = Panel(dict(h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46), settle=0.05)
+...     for h_f in range(8, 15):
+...         p.set("h_f", h_f)
+...     await asyncio.sleep(0.03)
+...     during = (p.refreshes, p.renders)
+...     await asyncio.sleep(0.1)
+...     return during, (p.refreshes, p.renders), p.slowest < FRAME
+>>> asyncio.run(drag())
+((1, 0), (1, 1), True)
+>>> for name, gallons in Panel.volumes(dict(h_f=8, w_f=10.5, h_a=27, w_a=48, l_fa=46)).items():
+...     print(f"{name:32s} {gallons:6.2f}")
+Regular Triangular Prism          50.97
+Regular Tetrahedron               50.39
+Regular Tetrahedron, bracketed    50.73
+Irregular Triangular Prism        56.88
+"""
+import asyncio
+import html
+import time
+from collections.abc import Callable, MutableMapping
+from typing import Any
+
+from vberth import formulas
+
+#: Seconds in one display frame.
+FRAME = 1 / 60
+
+#: Seconds the sliders must be still before the formula is rendered.
+SETTLE = 0.25
+
+#: The measurements, with their descriptions.
+LABELS = {
+    "h_f": "Forward height",
+    "w_f": "Forward width",
+    "h_a": "Aft height",
+    "w_a": "Aft width",
+    "l_fa": "Length",
+}
+
+
+def _loop() -> asyncio.AbstractEventLoop:
+    """
+    The running loop -- the kernel's, in Jupyter. Outside of one, a new loop;
+    nothing is refreshed until the caller runs it.
+
+    >>> loop = _loop()
+    >>> loop.is_running()
+    False
+    >>> loop.close()
+    """
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.new_event_loop()
+
+
+class Panel:
+    """The measurements, and the scheduling of the table and formula that depend on them."""
+    def __init__(
+        self, measured: MutableMapping[str, Any], frame: float = FRAME, settle: float = SETTLE,
+        on_table: Callable[[str], None] | None = None, on_formula: Callable[[str], None] | None = None,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ) -> None:
+        self.measured = measured
+        self.frame = frame
+        self.settle = settle
+        self.on_table = on_table or (lambda text: None)
+        self.on_formula = on_formula or (lambda text: None)
+        self.loop = loop or _loop()
+        self._refresh: asyncio.TimerHandle | asyncio.Handle | None = None
+        self._render: asyncio.TimerHandle | None = None
+        self._last = 0.0
+        self.refreshes = 0
+        self.renders = 0
+        self.slowest = 0.0
+
+    def set(self, name: str, value: float) -> None:
+        """Change a measurement; the table follows within a frame, the formula when the changes stop."""
+        self.measured[name] = value
+        if self._refresh is None:
+            delay = max(self._last + self.frame - self.loop.time(), 0.0)
+            self._refresh = self.loop.call_later(delay, self.refresh)
+        if self._render is not None:
+            self._render.cancel()
+        self._render = self.loop.call_later(self.settle, self.render)
+
+    @staticmethod
+    def volumes(measured: MutableMapping[str, Any]) -> dict[str, float]:
+        """Gallons from each model, with the notebooks' names for them."""
+        m = {name: float(measured[name]) for name in LABELS}
+        return {
+            "Regular Triangular Prism": formulas.midpoint_prism(**m),
+            "Regular Tetrahedron": formulas.regular_tetrahedron(**m),
+            "Regular Tetrahedron, bracketed": (formulas.tetrahedron_least(**m) + formulas.tetrahedron_greatest(**m)) / 2,
+            "Irregular Triangular Prism": formulas.irregular_prism(**m),
+        }
+
+    def table(self) -> str:
+        """The volumes, as an HTML table, each compared with the irregular prism."""
+        volumes = self.volumes(self.measured)
+        reference = volumes["Irregular Triangular Prism"]
+        rows = "".join(
+            f"<tr><td>{html.escape(name)}</td><td>{gallons:.2f}</td>"
+            f"<td>{gallons - reference:+.2f}</td><td>{(gallons - reference) / reference:+.1%}</td></tr>"
+            for name, gallons in volumes.items()
+        )
+        return (
+            "<table><tr><th>Model</th><th>Gallons</th><th>Difference</th><th></th></tr>"
+            f"{rows}</table>"
+        )
+
+    def refresh(self) -> None:
+        """Redraw the table, once, for all the changes since the last frame."""
+        start = time.perf_counter()
+        self._refresh = None
+        self._last = self.loop.time()
+        self.on_table(self.table())
+        self.refreshes += 1
+        self.slowest = max(self.slowest, time.perf_counter() - start)
+
+    def formula(self) -> str:
+        """The irregular prism's formula, and its exact value for these measurements, in LaTeX."""
+        from sympy import Eq, Rational, Symbol, latex, nsimplify
+
+        from vberth import symbolic
+
+        V = symbolic.irregular_prism()
+        exact = V.subs({name: nsimplify(self.measured[name]) for name in LABELS})
+        return f"$${latex(Eq(Symbol('V'), V))} = {latex(Rational(exact))} \\approx {float(exact):.2f}$$"
+
+    def render(self) -> None:
+        """Render the formula; only after the sliders stop."""
+        self._render = None
+        self.on_formula(self.formula())
+        self.renders += 1
+
+
+def panel(measured: MutableMapping[str, Any], step: float = 1 / 16) -> Any:
+    """
+    A widget with a slider for each measurement, from half to one and a half times its value,
+    in steps of ``step`` inches, the table of volumes, and the formula.
+    Moving a slider changes ``measured``.
+    """
+    import ipywidgets as widgets
+
+    table = widgets.HTML()
+    formula = widgets.HTMLMath()
+    state = Panel(
+        measured,
+        on_table=lambda text: setattr(table, "value", text),
+        on_formula=lambda text: setattr(formula, "value", text),
+    )
+    sliders = []
+    for name, label in LABELS.items():
+        value = float(measured[name])
+        slider = widgets.FloatSlider(
+            value=value, min=value / 2, max=value * 3 / 2, step=step,
+            description=f"{label}, ${name}$", continuous_update=True,
+            style={"description_width": "initial"}, readout_format=".3f",
+        )
+        slider.observe(lambda change, name=name: state.set(name, change["new"]), names="value")
+        sliders.append(slider)
+    state.refresh()
+    state.render()
+    box = widgets.VBox([*sliders, table, formula])
+    box.panel = state
+    return box
@@ -0,0 +1,146 @@
+"""
+Simplification by polynomial arithmetic, instead of ``simplify()``.
+
+``prism-irregular.ipynb`` says "The generic ``simplify()`` is a poor choice",
+and it is: ``simplify()`` tries a long list of rewrites, and keeps the shortest result.
+It's slow, and what it returns depends on which rewrite happens to win.
+
+The expressions in these models are much simpler than that. The volumes are polynomials,
+or ratios of polynomials, in the measurements. The tetrahedron's edges add square roots,
+but each square root can be treated as one more variable. For these, the canonical form
+is direct:
+
+1.  Floats, like the ones from ``evalf(3)``, become the exact decimals they print as.
+    Square roots, and other rational powers, are treated as variables.
+
+2.  ``as_numer_denom()`` puts the expression over a common denominator.
+    The numerator and denominator are polynomials, with rational coefficients,
+    in the symbols and square roots.
+
+3.  ``factor_list()`` factors each of them over the integers: a constant,
+    and irreducible factors with their multiplicity. Factoring is unique,
+    so the factors they have in common are equal, and cancel.
+
+4.  The two constants become one coefficient in front.
+    If the input had floats, the coefficient is a float.
+
+That's :func:`canonical`. Each step is a polynomial operation, so the time depends only on
+the size of the polynomials, and the result is always the same, factored, form.
+It's the form ``factor()`` gives, for these expressions, without the attempts
+to simplify first.
+
+:func:`integral` integrates a polynomial in :math:`z` term by term, the way
+``Integral(...).doit()`` would, without searching for a method.
+:func:`collected` groups the terms by powers of one symbol, like the notebook's
+"terms based on :math:`l_{fa}`, :math:`l_{fa}^2`, and :math:`l_{fa}^3`".
+
+The notebook's rounded form, which ``factor(simplify(...))`` takes a third of a second for:
+
+>>> from sympy import Integral
+>>> A_z = symbolic.area()
+>>> canonical(integral((A_z / 231).evalf(3), symbolic.z, 0, symbolic.l_fa))
+1.0e-6*l_fa*(721*h_a*w_a + 361*h_a*w_f + 361*h_f*w_a + 722*h_f*w_f)
+
+Unlike ``simplify()``, it keeps the rounded coefficients as they are.
+The exact form is the same as :func:`vberth.symbolic.irregular_prism`:
+
+>>> canonical(integral(A_z, symbolic.z, 0, symbolic.l_fa) / 231)
+l_fa*(2*h_a*w_a + h_a*w_f + h_f*w_a + 2*h_f*w_f)/2772
+>>> collected(symbolic.midpoint_prism(), symbolic.h_a)
+h_a*l_fa*(w_a + w_f)/1848 + h_f*l_fa*(w_a + w_f)/1848
+
+Square roots, from ``tetrahedron.ipynb``:
+
+>>> canonical(symbolic.regular_tetrahedron(symbolic.tetrahedron_edges()))
+sqrt(2)*(w_a + sqrt(h_a**2 + l_fa**2) + sqrt(4*h_a**2 + w_a**2) + sqrt(4*l_fa**2 + w_a**2))**3/598752
+"""
+from collections import Counter
+
+from sympy import (
+    Add, Dummy, Expr, Float, Mul, Poly, Pow, Rational, Symbol,
+    factor_list, preorder_traversal, sympify,
+)
+
+from vberth import symbolic
+
+
+def _exact(expr: Expr) -> tuple[Expr, bool]:
+    """The expression with its floats replaced by exact decimals, and whether it had any."""
+    floats = expr.atoms(Float)
+    if not floats:
+        return expr, False
+    return expr.xreplace({f: Rational(str(f)) for f in floats}), True
+
+
+def _radicals(expr: Expr) -> tuple[Expr, dict[Dummy, Expr]]:
+    """
+    The expression with each radical replaced by a new variable, and the radicals, by variable.
+    Raise :exc:`ValueError` unless that leaves a ratio of polynomials.
+    """
+    def radical(p: Pow) -> bool:
+        return p.exp.is_Rational and not p.exp.is_Integer
+
+    # Canonical radicands, so equal radicals are the same variable, with the constants outside.
+    def outside(p: Pow) -> Expr:
+        constant, primitive = canonical(p.base).as_content_primitive()
+        return constant**p.exp * primitive**p.exp
+
+    expr = expr.xreplace({p: outside(p) for p in expr.atoms(Pow) if radical(p)})
+    radicals = {p: Dummy() for p in expr.atoms(Pow) if radical(p)}
+    expr = expr.xreplace(radicals)
+    for node in preorder_traversal(expr):
+        if not (node.is_Atom or node.is_Add or node.is_Mul or (node.is_Pow and node.exp.is_Integer)):
+            raise ValueError(f"not a ratio of polynomials in symbols and radicals: {node}")
+    return expr, {v: p for p, v in radicals.items()}
+
+
+def canonical(expr: Expr | str) -> Expr:
+    """
+    The factored form of a ratio of polynomials: a coefficient, times irreducible
+    factors with integer coefficients, in the symbols and square roots.
+
+    >>> from sympy import symbols
+    >>> x, y = symbols("x y")
+    >>> canonical((x**2 - y**2) / (2*x + 2*y))
+    x/2 - y/2
+    >>> canonical(0.5*x*y + 0.25*y**2)
+    0.25*y*(2*x + y)
+    """
+    expr, radicals = _radicals(sympify(expr))
+    expr, inexact = _exact(expr)
+    numerator, denominator = expr.as_numer_denom()
+    n_constant, n_factors = factor_list(numerator)
+    d_constant, d_factors = factor_list(denominator)
+    # The factors are irreducible, so the common ones are the same polynomials.
+    powers: Counter[Expr] = Counter()
+    for f, k in n_factors:
+        powers[f] += k
+    for f, k in d_factors:
+        powers[f] -= k
+    constant = n_constant / d_constant
+    if inexact:
+        constant = constant.evalf(15)
+    result = constant * Mul(*(f**k for f, k in powers.items()))
+    return result.xreplace(radicals)
+
+
+def integral(integrand: Expr, variable: Symbol, lower: Expr, upper: Expr) -> Expr:
+    """
+    The definite integral of a polynomial in ``variable``, term by term.
+
+    The coefficients can be anything that doesn't depend on ``variable``.
+
+    >>> from sympy import symbols
+    >>> x, a, b = symbols("x a b")
+    >>> integral(a*x**2 + b, x, 0, 3)
+    9*a + 3*b
+    """
+    poly = Poly(sympify(integrand), variable)
+    antiderivative = poly.integrate()
+    return (antiderivative.eval(upper) - antiderivative.eval(lower)).as_expr()
+
+
+def collected(expr: Expr, symbol: Symbol) -> Expr:
+    """The expression as a polynomial in ``symbol``, with each coefficient in :func:`canonical` form."""
+    poly = Poly(sympify(expr), symbol)
+    return Add(*(canonical(c) * symbol**k for (k,), c in poly.terms()))
@@ -0,0 +1,219 @@
+"""
+Numeric integration of :math:`A(z)` for curved hull tapers.
+
+``prism-irregular.ipynb`` has linear :math:`h(z)` and :math:`w(z)`, so :math:`A(z)`
+is a quadratic, and ``Integral(A_z, (z, 0, l_fa))`` is easy for ``sympy``.
+Real hulls curve. With a spline, or a higher-order curve, fit to the heights and widths,
+the symbolic integral is very slow, or impossible.
+
+:func:`volume` integrates :math:`A(z) = h(z) w(z) / 2` from :math:`0` to :math:`l` for
+many tanks at once. How it does that depends on the tapers:
+
+-   Polynomials -- arrays of coefficients, in increasing powers of :math:`z`,
+    or ``sympy`` expressions that are polynomials in :math:`z` -- are integrated exactly,
+    from the coefficients of their product. The error estimate is zero.
+
+-   Anything else -- a ``sympy`` expression, or a vectorized function -- uses
+    :func:`integrate`, adaptive Gauss-Legendre quadrature.
+
+The adaptive quadrature evaluates a fixed-order rule on every interval, and on
+its two halves. The difference is the error estimate for the interval.
+Intervals where it's too large are split and tried again. All of the open intervals,
+of all of the tanks, are evaluated together in each round.
+
+The notebook's linear tapers, exactly:
+
+>>> h = [8, 19 / 46]
+>>> w = [10.5, 37.5 / 46]
+>>> round(float(volume(h, w, 46).value), 3)
+56.878
+
+The same from ``sympy`` expressions:
+
+>>> m = symbolic.MEASURED
+>>> q = volume(symbolic.h_z().subs(m), symbolic.w_z().subs(m), 46)
+>>> round(float(q.value), 3), float(q.error)
+(56.878, 0.0)
+
+A hull that curves up toward the bow, integrated numerically:
+
+>>> from sympy import pi, sin
+>>> curved = 8 + 19 * sin(pi * symbolic.z / 92)
+>>> q = volume(curved, symbolic.w_z().subs(m), 46)
+>>> round(float(q.value), 3), bool(q.error < 1e-9)
+(64.696, True)
+"""
+from collections.abc import Callable
+from typing import NamedTuple, Union
+
+import numpy as np
+from numpy.typing import ArrayLike
+from sympy import Expr, Poly, PolynomialError, lambdify, sympify
+
+from vberth import symbolic
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+#: A vectorized function of ``z``, and the index of the tank for each row of ``z``.
+Integrand = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+#: A taper: polynomial coefficients, a ``sympy`` expression in ``z``, or a vectorized function.
+Taper = Union[ArrayLike, Expr, Integrand]
+
+
+class Quadrature(NamedTuple):
+    """Integrals for each tank, with estimates of their absolute error, and the number of points evaluated."""
+    value: np.ndarray
+    error: np.ndarray
+    evaluations: int
+
+
+def integrate(
+    f: Integrand, a: ArrayLike, b: ArrayLike,
+    order: int = 8, tolerance: float = 1e-10, relative: float = 1e-12,
+    max_rounds: int = 40, max_intervals: int = 1_000_000,
+) -> Quadrature:
+    """
+    Adaptive Gauss-Legendre quadrature of ``f`` from ``a`` to ``b``, for many tanks.
+
+    ``f(z, tank)`` gets an array of points, shape ``(m, order)``, and an array, shape ``(m, 1)``,
+    of which tank each row is for. The error allowed for each tank is the larger of ``tolerance``
+    and ``relative`` times the first estimate of its integral; each interval is allowed
+    its share, in proportion to its length. Refinement stops, with whatever error
+    remains, after ``max_rounds`` or when there are more than ``max_intervals`` to refine.
+
+    >>> q = integrate(lambda z, tank: np.exp(z), 0, [1, 2])
+    >>> (q.value - (np.exp([1, 2]) - 1)).round(12)
+    array([0., 0.])
+    """
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    shape = a.shape
+    nodes, weights = np.polynomial.legendre.leggauss(order)
+    length = np.abs(b - a).ravel()
+    value = np.zeros(length.size)
+    error = np.zeros(length.size)
+    evaluations = 0
+
+    def rule(lo: np.ndarray, hi: np.ndarray, owner: np.ndarray) -> np.ndarray:
+        nonlocal evaluations
+        half = (hi - lo) / 2
+        z = ((hi + lo) / 2)[:, np.newaxis] + half[:, np.newaxis] * nodes
+        evaluations += z.size
+        return np.broadcast_to(f(z, owner[:, np.newaxis]), z.shape) @ weights * half
+
+    lo, hi, owner = a.ravel(), b.ravel(), np.arange(length.size)
+    whole = rule(lo, hi, owner)
+    allowed = np.maximum(tolerance, relative * np.abs(whole))
+    for round_ in range(max_rounds):
+        mid = (lo + hi) / 2
+        left, right = rule(lo, mid, owner), rule(mid, hi, owner)
+        refined = left + right
+        estimate = np.abs(refined - whole)
+        share = np.divide(np.abs(hi - lo), length[owner], out=np.ones_like(lo), where=length[owner] > 0)
+        last = round_ == max_rounds - 1 or 2 * lo.size > max_intervals
+        done = (estimate <= allowed[owner] * share) | last
+        np.add.at(value, owner[done], refined[done])
+        np.add.at(error, owner[done], estimate[done])
+        open_ = ~done
+        if not open_.any():
+            break
+        lo, hi = np.concatenate([lo[open_], mid[open_]]), np.concatenate([mid[open_], hi[open_]])
+        owner = np.concatenate([owner[open_], owner[open_]])
+        whole = np.concatenate([left[open_], right[open_]])
+    return Quadrature(value.reshape(shape), error.reshape(shape), evaluations)
+
+
+def polynomial_area(h: ArrayLike, w: ArrayLike) -> np.ndarray:
+    """
+    Coefficients of :math:`h(z) w(z) / 2`, from the coefficients of the tapers, shape ``(..., p + 1)``
+    and ``(..., q + 1)``, in increasing powers of :math:`z`.
+    """
+    h = np.asarray(h, dtype=float)
+    w = np.asarray(w, dtype=float)
+    p, q = h.shape[-1], w.shape[-1]
+    area = np.zeros(np.broadcast_shapes(h.shape[:-1], w.shape[:-1]) + (p + q - 1,))
+    for i in range(p):
+        area[..., i:i + q] += h[..., i:i + 1] * w
+    return area / 2
+
+
+def exact(h: ArrayLike, w: ArrayLike, length: ArrayLike) -> np.ndarray:
+    """Gallons for polynomial tapers, from the antiderivative of the area's coefficients."""
+    area = polynomial_area(h, w)
+    k = np.arange(1, area.shape[-1] + 1)
+    L = np.asarray(length, dtype=float)[..., np.newaxis]
+    return np.sum(area * L**k / k, axis=-1) / GALLON
+
+
+def coefficients(taper: Expr) -> np.ndarray | None:
+    """The coefficients of a ``sympy`` expression, if it's a polynomial in :math:`z` with numeric coefficients."""
+    try:
+        poly = Poly(sympify(taper), symbolic.z)
+    except PolynomialError:
+        return None
+    if not all(c.is_number for c in poly.all_coeffs()):
+        return None
+    return np.array([float(c) for c in reversed(poly.all_coeffs())])
+
+
+def as_function(taper: Taper) -> Integrand:
+    """A taper as a vectorized function of ``z`` and the tank."""
+    if isinstance(taper, Expr):
+        function = lambdify(symbolic.z, taper, modules="numpy")
+        return lambda z, tank: function(z)
+    if callable(taper):
+        return taper
+    c = np.asarray(taper, dtype=float)
+    if c.ndim == 1:
+        return lambda z, tank: np.polynomial.polynomial.polyval(z, c)
+    # A batch of polynomials: the coefficients of each row's tank, by Horner's rule.
+    return lambda z, tank: _horner(c.reshape(-1, c.shape[-1])[tank.ravel()], z)
+
+
+def _horner(c: np.ndarray, z: np.ndarray) -> np.ndarray:
+    result = np.zeros_like(z)
+    for k in range(c.shape[-1] - 1, -1, -1):
+        result = result * z + c[:, k:k + 1]
+    return result
+
+
+def volume(
+    h: Taper, w: Taper, length: ArrayLike, order: int = 8, tolerance: float = 1e-10
+) -> Quadrature:
+    """
+    Gallons in tanks with sections :math:`A(z) = h(z) w(z) / 2`, from :math:`z = 0` to ``length``.
+
+    Polynomial tapers are integrated exactly; others with :func:`integrate`.
+    A batch of polynomial tapers has shape ``(tanks, degree + 1)``; a function
+    gets the tank index, as described in :func:`integrate`.
+
+    A batch of polynomials with a curved taper, and one length, gives a volume for each tank:
+
+    >>> h = [[8, 19 / 46], [16, 38 / 46]]
+    >>> w = [10.5, 37.5 / 46]
+    >>> q = volume(h, lambda z, tank: np.polynomial.polynomial.polyval(z, w), 46)
+    >>> q.value.round(3), exact(h, w, [46, 46]).round(3)
+    (array([ 56.878, 113.755]), array([ 56.878, 113.755]))
+    """
+    if isinstance(h, Expr) and (c := coefficients(h)) is not None:
+        h = c
+    if isinstance(w, Expr) and (c := coefficients(w)) is not None:
+        w = c
+    polynomial = all(not isinstance(t, Expr) and not callable(t) for t in (h, w))
+    if polynomial:
+        value = exact(h, w, length)
+        return Quadrature(value, np.zeros_like(value), 0)
+    # A batch of polynomials fixes the number of tanks; a scalar length is for all of them.
+    batches = [np.shape(t)[:-1] for t in (h, w) if not isinstance(t, Expr) and not callable(t)]
+    try:
+        length = np.broadcast_to(np.asarray(length, dtype=float), np.broadcast_shapes(np.shape(length), *batches))
+    except ValueError:
+        raise ValueError(f"length, shape {np.shape(length)}, doesn't match the tapers, {batches}") from None
+    h_f, w_f = as_function(h), as_function(w)
+
+    def area(z: np.ndarray, tank: np.ndarray) -> np.ndarray:
+        return h_f(z, tank) * w_f(z, tank) / 2
+
+    q = integrate(area, 0.0, length, order, tolerance * GALLON)
+    return Quadrature(q.value / GALLON, q.error / GALLON, q.evaluations)
@@ -0,0 +1,203 @@
+"""
+A small reactive engine: change a measurement, see the new volume.
+
+This is the spreadsheet part of the spreadsheet replacement. A :class:`Graph`
+has input cells, which hold values, and computed cells, which are functions
+of other cells. Setting an input invalidates the cells downstream of it;
+reading a cell recomputes it -- and anything stale it depends on -- but nothing else.
+
+Computed cells are either ``"symbolic"`` or ``"numeric"``. The distinction
+is only a label for reporting; what matters is the dependencies. The
+symbolic derivation of the irregular prism doesn't depend on any measured value,
+so it's computed once. Only the numeric substitutions depend on the measurements.
+
+:func:`irregular_prism` builds the chain from ``prism-irregular.ipynb``,
+``measured -> h_z/w_z -> A_z -> V -> V_r``.
+
+>>> tank = irregular_prism()
+>>> tank["V_r"]
+52555/924
+>>> sorted(tank.evaluated)
+['A_z', 'V', 'V_r', 'h_z', 'w_z']
+>>> tank["h_f"] = 9
+>>> sorted(tank.invalidated)
+['V_f', 'V_r']
+>>> tank["V_r"]
+2553/44
+>>> sorted(tank.evaluated)
+['V_r']
+"""
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from sympy import Integral, Rational, expand, factor
+
+from vberth import symbolic
+
+
+@dataclass
+class Cell:
+    """One cell of the graph: an input value, or a function of other cells."""
+    name: str
+    kind: str
+    function: Callable[..., Any] | None = None
+    depends: tuple[str, ...] = ()
+    value: Any = None
+    valid: bool = False
+    elapsed: float = 0.0
+    evaluations: int = 0
+
+
+class Graph:
+    """
+    A dependency graph of cells.
+
+    After each change, :attr:`invalidated` names the cells it invalidated.
+    After each read, :attr:`evaluated` names the cells that had to be recomputed.
+    Each cell keeps the time its last evaluation took.
+    """
+    def __init__(self) -> None:
+        self.cells: dict[str, Cell] = {}
+        self.dependents: defaultdict[str, set[str]] = defaultdict(set)
+        self.invalidated: set[str] = set()
+        self.evaluated: list[str] = []
+
+    def input(self, name: str, value: Any) -> None:
+        """Define an input cell."""
+        self.cells[name] = Cell(name, "input", value=value, valid=True)
+
+    def cell(
+        self, name: str, depends: Iterable[str], kind: str = "numeric"
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        Decorator to define a computed cell.
+        The function's positional arguments are the values of ``depends``, in order.
+        """
+        def decorator(function: Callable[..., Any]) -> Callable[..., Any]:
+            depends_on = tuple(depends)
+            missing = [d for d in depends_on if d not in self.cells]
+            if missing:
+                raise KeyError(f"{name} depends on undefined {missing}")
+            self.cells[name] = Cell(name, kind, function, depends_on)
+            for d in depends_on:
+                self.dependents[d].add(name)
+            return function
+        return decorator
+
+    def downstream(self, name: str) -> set[str]:
+        """All the cells that depend, directly or indirectly, on ``name``."""
+        found: set[str] = set()
+        pending = list(self.dependents[name])
+        while pending:
+            n = pending.pop()
+            if n not in found:
+                found.add(n)
+                pending.extend(self.dependents[n])
+        return found
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        self.update({name: value})
+
+    def update(self, changes: Mapping[str, Any]) -> None:
+        """
+        Set several inputs at once, invalidating the union of their downstream cells.
+        All the names are checked first; if any isn't an input, nothing changes.
+
+        >>> tank = irregular_prism()
+        >>> tank["V_r"]
+        52555/924
+        >>> tank.update({"h_f": 9, "V": 0})
+        Traceback (most recent call last):
+        ...
+        ValueError: V is computed, not an input
+        >>> tank["h_f"], tank["V_r"]
+        (8, 52555/924)
+        """
+        for name in changes:
+            if self.cells[name].kind != "input":
+                raise ValueError(f"{name} is computed, not an input")
+        self.invalidated = set()
+        for name, value in changes.items():
+            self.cells[name].value = value
+            self.invalidated |= self.downstream(name)
+        for name in self.invalidated:
+            self.cells[name].valid = False
+
+    def __getitem__(self, name: str) -> Any:
+        self.evaluated = []
+        return self._value(name)
+
+    def _value(self, name: str) -> Any:
+        cell = self.cells[name]
+        if not cell.valid:
+            args = [self._value(d) for d in cell.depends]
+            start = time.perf_counter()
+            cell.value = cell.function(*args)
+            cell.elapsed = time.perf_counter() - start
+            cell.evaluations += 1
+            cell.valid = True
+            self.evaluated.append(name)
+        return cell.value
+
+    def recompute(self) -> dict[str, float]:
+        """Bring every stale cell up to date. Returns the time taken by each one recomputed."""
+        evaluated: list[str] = []
+        for name, cell in self.cells.items():
+            if not cell.valid:
+                self[name]
+                evaluated.extend(self.evaluated)
+        self.evaluated = evaluated
+        return {name: self.cells[name].elapsed for name in evaluated}
+
+    def report(self) -> str:
+        lines = []
+        for cell in self.cells.values():
+            if cell.kind != "input":
+                state = "valid" if cell.valid else "stale"
+                lines.append(
+                    f"{cell.name:8s} {cell.kind:8s} {state:5s} "
+                    f"{cell.evaluations:3d} evaluations, last {cell.elapsed*1000:9.3f} ms"
+                )
+        return "\n".join(lines)
+
+
+def irregular_prism(measured: Mapping[str, Any] = symbolic.MEASURED) -> Graph:
+    """
+    The irregular prism computation from ``prism-irregular.ipynb`` as a graph.
+
+    ``h_z``, ``w_z``, ``A_z``, and ``V`` are symbolic. ``V_r``, the exact
+    volume in gallons, and ``V_f``, its float value, are numeric.
+    """
+    graph = Graph()
+    names = tuple(measured)
+    for name, value in measured.items():
+        graph.input(name, value)
+
+    @graph.cell("h_z", (), "symbolic")
+    def h_z() -> Any:
+        return symbolic.h_z()
+
+    @graph.cell("w_z", (), "symbolic")
+    def w_z() -> Any:
+        return symbolic.w_z()
+
+    @graph.cell("A_z", ("h_z", "w_z"), "symbolic")
+    def A_z(h_z: Any, w_z: Any) -> Any:
+        return factor(expand(Rational(1, 2) * h_z * w_z))
+
+    @graph.cell("V", ("A_z",), "symbolic")
+    def V(A_z: Any) -> Any:
+        return Integral(A_z, (symbolic.z, 0, symbolic.l_fa)).doit() / symbolic.GALLON
+
+    @graph.cell("V_r", ("V",) + names)
+    def V_r(V: Any, *values: Any) -> Any:
+        return V.subs(dict(zip(names, values)))
+
+    @graph.cell("V_f", ("V_r",))
+    def V_f(V_r: Any) -> float:
+        return float(V_r)
+
+    return graph
@@ -0,0 +1,129 @@
+"""
+Which measurement matters most?
+
+The partial derivative of a model's volume with respect to a measurement,
+:math:`\\partial V / \\partial h_f`, for example, is the change in gallons
+for each inch of error in that tape reading. Ranking these says which
+measurement is worth taking again, more carefully.
+
+Each model's gradient is derived symbolically, then compiled together with the volume
+into one NumPy function. The volume and its derivatives share most of their
+subexpressions, so these are computed once. One call replaces the separate ``subs()``
+of the volume and each derivative, and works on arrays of measurement sets.
+
+>>> m = {k: float(v) for k, v in symbolic.MEASURED.items()}
+>>> s = jacobian("irregular_prism", **m)
+>>> round(float(s.value), 3)
+56.878
+>>> {n: round(float(g), 3) for n, g in zip(s.names, s.gradient)}
+{'h_f': 1.145, 'w_f': 0.714, 'h_a': 1.767, 'w_a': 1.029, 'l_fa': 1.236}
+>>> [n for n, g in s.ranked()]
+['h_a', 'l_fa', 'h_f', 'w_a', 'w_f']
+
+The tetrahedron built from six edges uses :math:`a_1, \\ldots, a_6` instead.
+
+>>> e = jacobian("tetrahedron_edges", a_1=48, a_2=36, a_3=36, a_4=52, a_5=52, a_6=53)
+>>> round(float(e.gradient[0]), 3)
+0.544
+"""
+import argparse
+from collections.abc import Callable, Mapping
+from functools import cache
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+from sympy import Expr, diff, lambdify
+
+from vberth import symbolic
+from vberth.compiled import MODELS
+
+#: The models with a gradient: ``V_m``, ``V_c``, and the tetrahedron ``V_r``, from measurements and from edges.
+SENSITIVE = ("midpoint_prism", "irregular_prism", "regular_tetrahedron", "tetrahedron_edges")
+
+
+class Sensitivity(NamedTuple):
+    """A model's volume and its partial derivatives, in gallons per inch."""
+    value: np.ndarray
+    gradient: np.ndarray
+    names: tuple[str, ...]
+
+    def ranked(self) -> list[tuple[str, float]]:
+        """The measurements, most sensitive first, for a single measurement set."""
+        pairs = [(n, float(g)) for n, g in zip(self.names, self.gradient)]
+        return sorted(pairs, key=lambda p: abs(p[1]), reverse=True)
+
+
+@cache
+def gradient(name: str) -> tuple[Expr, ...]:
+    """The volume of one of the :data:`~vberth.compiled.MODELS`, followed by its partial derivatives."""
+    model = MODELS[name]
+    V = model.expression()
+    return (V, *(diff(V, a) for a in model.args))
+
+
+@cache
+def kernel(name: str) -> Callable[..., list[np.ndarray]]:
+    """The volume and its gradient compiled into one function, with common subexpressions shared."""
+    return lambdify(MODELS[name].args, list(gradient(name)), modules="numpy", cse=True)
+
+
+def jacobian(name: str, **measurements: ArrayLike) -> Sensitivity:
+    """
+    The volume and gradient for arrays of measurements.
+
+    The arrays are broadcast against each other. The gradient has the
+    measurement as its first axis: ``gradient[i]`` is the derivative with
+    respect to ``names[i]``, with the same shape as ``value``.
+    """
+    names = MODELS[name].names
+    arrays = np.broadcast_arrays(
+        *(np.asarray(measurements[n], dtype=float) for n in names)
+    )
+    # Some derivatives are constants; broadcast them to the shape of the inputs.
+    value, *partials = np.broadcast_arrays(*kernel(name)(*arrays), arrays[0])[:-1]
+    return Sensitivity(value, np.stack(partials), names)
+
+
+def measured_values(name: str, measured: Mapping[str, ArrayLike] = symbolic.MEASURED) -> dict[str, ArrayLike]:
+    """The arguments for ``name``: the measurements, or the six edges computed from them."""
+    if MODELS[name].args == symbolic.EDGES:
+        edges = symbolic.tetrahedron_edges()
+        return {a.name: float(e.subs(measured)) for a, e in zip(symbolic.EDGES, edges)}
+    return {k: float(v) for k, v in measured.items()}
+
+
+def report(measured: Mapping[str, ArrayLike] = symbolic.MEASURED, models: tuple[str, ...] = SENSITIVE) -> str:
+    """
+    A ranked table of sensitivities for one measurement set.
+
+    >>> print(report(models=("midpoint_prism",)))
+    midpoint_prism: 50.97 gallons
+      h_f       +1.456 gal/in
+      h_a       +1.456 gal/in
+      l_fa      +1.108 gal/in
+      w_f       +0.871 gal/in
+      w_a       +0.871 gal/in
+
+    The tetrahedron models don't use the forward measurements, so those rank last, with zero.
+    """
+    lines = []
+    for name in models:
+        s = jacobian(name, **measured_values(name, measured))
+        lines.append(f"{name}: {float(s.value):.2f} gallons")
+        lines.extend(f"  {n:8s} {g:+7.3f} gal/in" for n, g in s.ranked())
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Rank the measurements by their effect on the volume")
+    for name, value in symbolic.MEASURED.items():
+        parser.add_argument(f"--{name}", type=float, default=float(value))
+    parser.add_argument("--model", action="append", choices=SENSITIVE, help="default: all of them")
+    options = parser.parse_args(argv)
+    measured = {name: getattr(options, name) for name in symbolic.MEASURED}
+    print(report(measured, tuple(options.model or SENSITIVE)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Symbolic models of the V-berth tank volume.
+
+These are the derivations from the notebooks, restated as functions that
+return ``sympy`` expressions in terms of the measurement symbols.
+All of the volumes are in gallons.
+
+-   :func:`midpoint_prism` is ``V_m`` from ``prism.ipynb``.
+
+-   :func:`regular_tetrahedron` is ``V_r`` from ``tetrahedron.ipynb``,
+    and :func:`bracket_tetrahedron` is the ``V_l``, ``V_g`` pair.
+
+-   :func:`irregular_tetrahedron` is the exact volume of the tetrahedron
+    with all six edges, from the Cayley-Menger determinant,
+    and :func:`truncated_tetrahedron` is that volume less a similar tip at the forward end.
+
+-   :func:`irregular_prism` is the integral of ``A_z`` from ``prism-irregular.ipynb``.
+    The notebook's ``V_c`` rounds the coefficients with ``evalf(3)``;
+    this is the exact form the notebook integrates to before any rounding.
+
+-   :func:`wetted_area` extends :math:`A(z)` to the area below a liquid depth, :math:`d`.
+
+-   :func:`matrix_prism` is the matrix form, ``V_m``, from the end of ``prism-irregular.ipynb``.
+
+The tetrahedron notebook works from the same three measurements as the prisms:
+the aft width, :math:`w_a`, the aft height, :math:`h_a`, and the length
+of the top, :math:`l_{fa}`. :func:`tetrahedron_edges` computes the six edges from these.
+
+>>> midpoint_prism().subs(MEASURED)
+4485/88
+>>> irregular_prism().subs(MEASURED)
+52555/924
+"""
+from functools import cache
+
+from sympy import (
+    Expr, Matrix, Max, Min, Rational, S, Symbol, expand, factor, sqrt, symbols
+)
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+h_f, w_f, h_a, w_a, l_fa = symbols("h_f w_f h_a w_a l_fa")
+z = symbols("z")
+d = symbols("d", nonnegative=True)
+a_1, a_2, a_3, a_4, a_5, a_6 = symbols("a_1 a_2 a_3 a_4 a_5 a_6")
+
+#: The measurement symbols, in the order the compiled forms expect them.
+MEASUREMENTS: tuple[Symbol, ...] = (h_f, w_f, h_a, w_a, l_fa)
+
+#: The six tetrahedron edges, in the order of ``tetrahedron.ipynb``.
+EDGES: tuple[Symbol, ...] = (a_1, a_2, a_3, a_4, a_5, a_6)
+
+#: The actual dimensions, in inches, from the notebooks.
+MEASURED = {
+    # Forward triangle, in inches
+    "h_f": 8,
+    "w_f": 10 + Rational(1, 2),
+
+    # Aft triangle, in inches
+    "h_a": 27,
+    "w_a": 48,
+
+    # Overall length from forward to aft, in inches.
+    "l_fa": 46,
+}
+
+#: The small tetrahedron truncated from the forward tip, in inches.
+TRUNCATED_TIP = 9
+
+
+def midpoint_prism() -> Expr:
+    """
+    The volume of a regular prism built from the midpoint height and width.
+    """
+    h_m = Rational(1, 2)*(h_f + h_a)
+    w_m = Rational(1, 2)*(w_f + w_a)
+    return ((h_m * w_m)/2 * l_fa) / GALLON
+
+
+def h_z() -> Expr:
+    """Height as a function of distance from the forward end, :math:`h(z)`."""
+    return (h_a - h_f) / l_fa * z + h_f
+
+
+def w_z() -> Expr:
+    """Width as a function of distance from the forward end, :math:`w(z)`."""
+    return (w_a - w_f) / l_fa * z + w_f
+
+
+def area() -> Expr:
+    """Area of the triangular section at :math:`z`, :math:`A(z)`."""
+    return factor(expand(Rational(1, 2) * h_z() * w_z()))
+
+
+@cache
+def irregular_prism() -> Expr:
+    """
+    The volume of the tapered prism, :math:`\\int_0^{l_{fa}} A(z) dz`, in gallons.
+
+    This is cached because the integration is -- by far -- the slowest
+    part of any of these models. It's done term by term, and factored, with
+    :mod:`vberth.polysimp`: the same result as ``factor(Integral(...).doit())``.
+    """
+    from vberth import polysimp
+    return polysimp.canonical(polysimp.integral(area(), z, 0, l_fa) / GALLON)
+
+
+def wetted_area() -> Expr:
+    """
+    Area of the triangular section at :math:`z` below a liquid depth, :math:`d`.
+
+    The top of the tank is flat, and the keel is the apex of each triangle.
+    Depth is measured up from the lowest point of the keel, so the keel at :math:`z`
+    is :math:`\\max(h_f, h_a) - h(z)` above the bottom. The wetted part of the section is
+    a similar triangle; its height, :math:`e`, is clipped to :math:`[0, h(z)]`.
+
+    >>> wetted_area().subs({d: 27, z: 46}).subs(MEASURED)
+    648
+    >>> wetted_area().subs({d: 27, z: 46}).subs(MEASURED) == area().subs({z: 46}).subs(MEASURED)
+    True
+    """
+    e = Min(Max(d - (Max(h_f, h_a) - h_z()), 0), h_z())
+    return w_z() / h_z() * e**2 / 2
+
+
+def matrix_prism() -> Expr:
+    """
+    The volume of the tapered prism computed from the outer product of heights and widths.
+    """
+    M_h = Matrix([h_a, h_f])
+    M_w = Matrix([w_a, w_f])
+    weights = Matrix([S(1)/3, S(1)/6, S(1)/6, S(1)/3])
+    return l_fa*(M_h*M_w.transpose()).vec().dot(weights)/(2*GALLON)
+
+
+def tetrahedron_edges() -> tuple[Expr, ...]:
+    """
+    The six edges, :math:`a_1, \\ldots, a_6`, from the aft width and height and the length of the top.
+
+    >>> [e.subs(MEASURED) for e in tetrahedron_edges()]
+    [48, 3*sqrt(145), 3*sqrt(145), 2*sqrt(673), 2*sqrt(673), sqrt(2845)]
+    """
+    e_1 = w_a
+    e_2 = sqrt((Rational(1, 2)*w_a)**2 + h_a**2)
+    e_4 = sqrt((Rational(1, 2)*w_a)**2 + l_fa**2)
+    e_6 = sqrt(h_a**2 + l_fa**2)
+    return (e_1, e_2, e_2, e_4, e_4, e_6)
+
+
+def regular_volume(a: Expr) -> Expr:
+    """The volume of a regular tetrahedron with edge :math:`a`, in gallons."""
+    return a**3 / (6 * sqrt(2)) / GALLON
+
+
+def regular_tetrahedron(edges: tuple[Expr, ...] = EDGES) -> Expr:
+    """
+    The volume of a regular tetrahedron with the mean of the six edges.
+
+    >>> regular_tetrahedron(tetrahedron_edges()).subs(MEASURED).evalf(4)
+    50.40
+    """
+    m = sum(edges) / 6
+    return regular_volume(m)
+
+
+def bracket_tetrahedron(edges: tuple[Expr, ...] = EDGES) -> tuple[Expr, Expr]:
+    """
+    The volumes of regular tetrahedra with the least and greatest edges, :math:`V_l` and :math:`V_g`.
+    """
+    return regular_volume(Min(*edges)), regular_volume(Max(*edges))
+
+
+def cayley_menger(edges: tuple[Expr, ...] = EDGES) -> Expr:
+    """
+    The Cayley-Menger determinant of a tetrahedron, :math:`288 V^2`, in terms of the six edges.
+
+    The vertices are the forward tip, the two aft top corners, and the aft end of the keel.
+    :math:`a_1`, :math:`a_2`, and :math:`a_3` are the edges of the aft face;
+    :math:`a_4` and :math:`a_5` run from the aft corners to the forward tip;
+    :math:`a_6` is the keel seam.
+    """
+    e_1, e_2, e_3, e_4, e_5, e_6 = edges
+    distance = {(0, 1): e_4, (0, 2): e_5, (0, 3): e_6, (1, 2): e_1, (1, 3): e_2, (2, 3): e_3}
+    M = Matrix(5, 5, lambda i, j: (
+        0 if i == j
+        else 1 if i == 0 or j == 0
+        else distance[min(i, j) - 1, max(i, j) - 1]**2
+    ))
+    return M.det()
+
+
+def irregular_tetrahedron(edges: tuple[Expr, ...] = EDGES) -> Expr:
+    """
+    The exact volume of a tetrahedron with six given edges, in gallons.
+
+    >>> irregular_tetrahedron(tetrahedron_edges()).subs(MEASURED)
+    3312/77
+    """
+    return sqrt(cayley_menger(edges) / 288) / GALLON
+
+
+def truncated_tip() -> Expr:
+    """
+    The volume of the small tetrahedron at the forward tip, :math:`V_t`,
+    as the notebook has it: a regular tetrahedron with an edge of :data:`TRUNCATED_TIP` inches.
+    """
+    return regular_volume(S(TRUNCATED_TIP))
+
+
+def truncated_tetrahedron(edges: tuple[Expr, ...] = EDGES, scale: Expr = w_f / w_a) -> Expr:
+    """
+    The exact volume of a tetrahedron with six given edges, less a similar tip truncated from the forward end.
+
+    ``scale`` is the ratio of the tip's edges to the whole tetrahedron's.
+    This is the exact path for :func:`vberth.tetrahedron.truncated_volume`.
+
+    >>> V = truncated_tetrahedron(tetrahedron_edges()).subs(MEASURED)
+    >>> V, V.evalf(5)
+    (6711975/157696, 42.563)
+
+    It's the same as the NumPy path.
+
+    >>> from vberth import tetrahedron
+    >>> edges = [float(a.subs(MEASURED)) for a in tetrahedron_edges()]
+    >>> numeric = tetrahedron.truncated_volume(*edges, scale=10.5/48)
+    >>> abs(float(numeric.gallons) - float(V)) < 1e-9
+    True
+    """
+    return irregular_tetrahedron(edges) * (1 - scale**3)
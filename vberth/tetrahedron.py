@@ -0,0 +1,106 @@
+"""
+The exact volume of an irregular tetrahedron from its six edges.
+
+``tetrahedron.ipynb`` computes the six edges, :math:`a_1, \\ldots, a_6`, and then averages
+them into a regular tetrahedron. The six edges determine the tetrahedron, though, and
+the Cayley-Menger determinant gives its volume directly.
+With :math:`(a, A)`, :math:`(b, B)`, and :math:`(c, C)` the three pairs of opposite edges,
+
+.. math::
+
+    144 V^2 = \\sum a^2 A^2 (b^2 + B^2 + c^2 + C^2 - a^2 - A^2) - \\sum_{\\text{faces}} x^2 y^2 z^2
+
+The edges are labelled as in :func:`vberth.symbolic.cayley_menger`:
+:math:`a_1, a_2, a_3` are the aft face, :math:`a_4` is opposite :math:`a_3`,
+:math:`a_5` is opposite :math:`a_2`, and the keel seam, :math:`a_6`, is opposite :math:`a_1`.
+This expression is the determinant from :func:`vberth.symbolic.irregular_tetrahedron`,
+which is the exact path; this module is the NumPy path.
+
+Not every six lengths can be assembled into a tetrahedron. Each face must satisfy
+the triangle inequality, and the determinant must be positive.
+:func:`irregular_volume` returns a ``valid`` flag along with the volumes;
+the volume of an invalid edge set is zero, not NaN.
+
+>>> import numpy as np
+>>> edges = [48, 3*np.sqrt(145), 3*np.sqrt(145), 2*np.sqrt(673), 2*np.sqrt(673), np.sqrt(2845)]
+>>> v = irregular_volume(*edges)
+>>> round(float(v.gallons), 3), bool(v.valid)
+(43.013, True)
+>>> irregular_volume(*np.array([edges, [1, 1, 1, 1, 1, 5]]).T)
+Volumes(gallons=array([43.01298701,  0.        ]), valid=array([ True, False]))
+"""
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+#: Cubic inches per US gallon.
+GALLON = 231
+
+#: The four faces, as indices into the six edges.
+FACES = ((0, 1, 2), (0, 3, 4), (1, 3, 5), (2, 4, 5))
+
+#: The three pairs of opposite edges, as indices into the six edges.
+OPPOSITE = ((0, 5), (1, 4), (2, 3))
+
+
+class Volumes(NamedTuple):
+    """Volumes in gallons, and a flag for the edge sets that form a tetrahedron."""
+    gallons: np.ndarray
+    valid: np.ndarray
+
+
+def squared_edges(*edges: ArrayLike) -> list[np.ndarray]:
+    if len(edges) != 6:
+        raise TypeError(f"six edges are required, not {len(edges)}")
+    return [np.square(e) for e in np.broadcast_arrays(*(np.asarray(e, dtype=float) for e in edges))]
+
+
+def cayley_menger(*edges: ArrayLike) -> np.ndarray:
+    """:math:`144 V^2`, in inches to the sixth, for arrays of the six edges."""
+    sq = squared_edges(*edges)
+    total = sum(sq)
+    result = np.zeros_like(sq[0])
+    for i, j in OPPOSITE:
+        pair = sq[i] + sq[j]
+        result += sq[i] * sq[j] * (total - 2 * pair)
+    for i, j, k in FACES:
+        result -= sq[i] * sq[j] * sq[k]
+    return result
+
+
+def faces_valid(*edges: ArrayLike) -> np.ndarray:
+    """True where all four faces satisfy the (strict) triangle inequality."""
+    e = np.broadcast_arrays(*(np.asarray(e, dtype=float) for e in edges))
+    valid = np.ones(e[0].shape, dtype=bool)
+    for i, j, k in FACES:
+        valid &= (e[i] + e[j] > e[k]) & (e[j] + e[k] > e[i]) & (e[k] + e[i] > e[j])
+    return valid
+
+
+def irregular_volume(*edges: ArrayLike) -> Volumes:
+    """
+    The volume, in gallons, of the tetrahedron with edges :math:`a_1, \\ldots, a_6`.
+
+    Edge sets that can't form a tetrahedron have a volume of zero and ``valid`` false.
+    """
+    v_sq = cayley_menger(*edges)
+    valid = faces_valid(*edges) & (v_sq > 0)
+    gallons = np.sqrt(np.where(valid, v_sq, 0.0)) / 12 / GALLON
+    return Volumes(gallons, valid)
+
+
+def truncated_volume(*edges: ArrayLike, scale: ArrayLike) -> Volumes:
+    """
+    The volume of the tetrahedron, less a similar tip truncated from the forward end.
+
+    ``scale`` is the ratio of the tip's edges to the whole tetrahedron's.
+    For the tank, the cut across the top at the forward end is parallel to :math:`a_1`,
+    so the scale is :math:`w_f / w_a`.
+
+    >>> edges = [48, 3*np.sqrt(145), 3*np.sqrt(145), 2*np.sqrt(673), 2*np.sqrt(673), np.sqrt(2845)]
+    >>> round(float(truncated_volume(*edges, scale=10.5/48).gallons), 3)
+    42.563
+    """
+    whole = irregular_volume(*edges)
+    return Volumes(whole.gallons * (1 - np.asarray(scale, dtype=float)**3), whole.valid)